@@ -0,0 +1,227 @@
+# analytics.py
+
+import csv
+from collections import Counter
+
+from config import IDLE_THRESHOLD_SECONDS, GAP_BUCKETS_SECONDS
+from scan_events import outcome_counts_by_operator, OUTCOME_OK, OUTCOME_DUPLICATE
+from queries import OPERATOR_REPORT_ROWS
+
+UNKNOWN_OPERATOR = "(sem operador)"
+
+
+def _seconds(hora):
+    """
+    Converte 'HH:MM:SS' em segundos desde a meia-noite.
+    """
+    h, m, s = hora.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def _percentile(counter, total, fraction):
+    """
+    Calcula o percentil de uma distribuição guardada como Counter {valor: ocorrências}.
+    """
+    if total == 0:
+        return None
+    target = fraction * (total - 1)
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen > target:
+            return value
+    return None
+
+
+class OperatorStats:
+    """
+    Acumula as métricas de um operador durante a varredura das bipagens.
+    """
+    __slots__ = ("operator", "scans", "hours", "gaps", "gap_count",
+                 "idle_periods", "idle_seconds", "by_carrier", "outcomes")
+
+    def __init__(self, operator):
+        self.operator = operator
+        self.scans = 0
+        self.hours = Counter()       # (data, hora cheia) -> bipagens
+        self.gaps = Counter()        # intervalo em segundos -> ocorrências
+        self.gap_count = 0
+        self.idle_periods = 0
+        self.idle_seconds = 0
+        self.by_carrier = Counter()
+        self.outcomes = Counter()    # resultado da tentativa (scan_events) -> ocorrências
+
+    @property
+    def active_hours(self):
+        return len(self.hours)
+
+    @property
+    def scans_per_hour(self):
+        return self.scans / self.active_hours if self.active_hours else 0.0
+
+    @property
+    def median_gap(self):
+        return _percentile(self.gaps, self.gap_count, 0.5)
+
+    @property
+    def p90_gap(self):
+        return _percentile(self.gaps, self.gap_count, 0.9)
+
+    @property
+    def attempts(self):
+        return sum(self.outcomes.values())
+
+    @property
+    def duplicates(self):
+        return self.outcomes[OUTCOME_DUPLICATE]
+
+    @property
+    def errors(self):
+        return self.attempts - self.outcomes[OUTCOME_OK] - self.duplicates
+
+    @property
+    def reject_rate(self):
+        if not self.attempts:
+            return 0.0
+        return 100.0 * (self.attempts - self.outcomes[OUTCOME_OK]) / self.attempts
+
+    def gap_histogram(self):
+        """
+        Retorna a contagem de intervalos em cada faixa de GAP_BUCKETS_SECONDS (mais uma faixa final aberta).
+        """
+        buckets = [0] * (len(GAP_BUCKETS_SECONDS) + 1)
+        for gap, count in self.gaps.items():
+            for i, limit in enumerate(GAP_BUCKETS_SECONDS):
+                if gap <= limit:
+                    buckets[i] += count
+                    break
+            else:
+                buckets[-1] += count
+        return buckets
+
+
+def compute_operator_stats(cursor, start_date, end_date):
+    """
+    Calcula as métricas de produtividade por operador no período [start_date, end_date].
+    Faz uma única passagem pelas bipagens ordenadas por (data, operador, hora), servida
+    diretamente pelo índice idx_packages_data_operador_hora, sem consultas por operador.
+    As tentativas rejeitadas (duplicados e erros) vêm do registro scan_events, agrupadas
+    em uma única consulta. Retorna um dicionário {operador: OperatorStats}.
+    """
+    cursor.execute(OPERATOR_REPORT_ROWS, (start_date, end_date))
+
+    stats = {}
+    current_key = None
+    previous_seconds = None
+
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        for data, bipped_by, hora, transportadora in rows:
+            operator = bipped_by or UNKNOWN_OPERATOR
+            operator_stats = stats.get(operator)
+            if operator_stats is None:
+                operator_stats = stats[operator] = OperatorStats(operator)
+
+            seconds = _seconds(hora)
+            key = (data, operator)
+            if key != current_key:
+                # Intervalos só são medidos dentro do mesmo dia e do mesmo operador
+                current_key = key
+                previous_seconds = None
+
+            if previous_seconds is not None:
+                gap = seconds - previous_seconds
+                operator_stats.gaps[gap] += 1
+                operator_stats.gap_count += 1
+                if gap >= IDLE_THRESHOLD_SECONDS:
+                    operator_stats.idle_periods += 1
+                    operator_stats.idle_seconds += gap
+            previous_seconds = seconds
+
+            operator_stats.scans += 1
+            operator_stats.hours[(data, hora[:2])] += 1
+            operator_stats.by_carrier[transportadora] += 1
+
+    for operator, outcomes in outcome_counts_by_operator(cursor, start_date, end_date).items():
+        operator = operator or UNKNOWN_OPERATOR
+        operator_stats = stats.get(operator)
+        if operator_stats is None:
+            operator_stats = stats[operator] = OperatorStats(operator)
+        operator_stats.outcomes.update(outcomes)
+
+    return stats
+
+
+def hourly_rows(stats):
+    """
+    Retorna linhas (operador, hora do dia, bipagens, média por dia) somando todos os dias do período.
+    """
+    rows = []
+    for operator in sorted(stats):
+        per_hour = Counter()
+        days_per_hour = Counter()
+        for (data, hour), count in stats[operator].hours.items():
+            per_hour[hour] += count
+            days_per_hour[hour] += 1
+        for hour in sorted(per_hour):
+            rows.append((operator, f"{hour}:00", per_hour[hour], round(per_hour[hour] / days_per_hour[hour], 1)))
+    return rows
+
+
+def summary_rows(stats):
+    """
+    Retorna uma linha de resumo por operador, na ordem das colunas do relatório.
+    """
+    rows = []
+    for operator in sorted(stats):
+        s = stats[operator]
+        rows.append((
+            operator,
+            s.scans,
+            s.active_hours,
+            round(s.scans_per_hour, 1),
+            s.median_gap if s.median_gap is not None else "",
+            s.p90_gap if s.p90_gap is not None else "",
+            s.idle_periods,
+            round(s.idle_seconds / 60, 1),
+            s.duplicates,
+            s.errors,
+            round(s.reject_rate, 1),
+        ))
+    return rows
+
+
+SUMMARY_HEADERS = [
+    "Operador", "Pacotes", "Horas Ativas", "Pacotes/Hora",
+    "Intervalo Mediano (s)", "Intervalo P90 (s)", "Ociosidades", "Tempo Ocioso (min)",
+    "Duplicados", "Erros", "Taxa de Rejeição (%)"
+]
+HOURLY_HEADERS = ["Operador", "Hora", "Pacotes", "Média por Dia"]
+
+
+def gap_headers():
+    """
+    Cabeçalhos das faixas do histograma de intervalos.
+    """
+    headers = [f"<= {limit}s" for limit in GAP_BUCKETS_SECONDS]
+    headers.append(f"> {GAP_BUCKETS_SECONDS[-1]}s")
+    return headers
+
+
+def write_report_csv(file_path, stats):
+    """
+    Grava o relatório em CSV com as seções de resumo, histograma de intervalos e bipagens por hora.
+    """
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(SUMMARY_HEADERS)
+        writer.writerows(summary_rows(stats))
+        writer.writerow([])
+        writer.writerow(["Operador"] + gap_headers())
+        for operator in sorted(stats):
+            writer.writerow([operator] + stats[operator].gap_histogram())
+        writer.writerow([])
+        writer.writerow(HOURLY_HEADERS)
+        writer.writerows(hourly_rows(stats))
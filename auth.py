@@ -0,0 +1,115 @@
+# auth.py
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, DB_PATH, UNLOCK_CACHE_ENABLED, UNLOCK_CACHE_TTL_SECONDS, logging
+from database import get_database_connection
+from queries import USER_BY_USERNAME, USER_SET_PASSWORD
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    """
+    Gera o hash bcrypt da senha com o custo configurado.
+    """
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def hash_rounds(hashed):
+    """
+    Custo de um hash bcrypt no formato $2b$12$..., ou None se não for possível lê-lo.
+    """
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class UnlockCache:
+    """
+    Cache de credenciais recém-verificadas, apenas em memória, para desbloquear a tela sem
+    refazer o bcrypt. A chave é um HMAC de usuário e senha com um segredo aleatório do processo,
+    então nem a senha nem um hash reutilizável ficam guardados. As entradas expiram após `ttl`
+    segundos e são descartadas quando o usuário é alterado ou removido.
+    """
+    def __init__(self, ttl=UNLOCK_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.secret = os.urandom(32)
+        self.lock = threading.Lock()
+        self.entries = {}   # chave -> (usuário, expira em)
+
+    def _key(self, username, password):
+        message = username.encode('utf-8') + b"\0" + password.encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).digest()
+
+    def get(self, username, password):
+        key = self._key(username, password)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                return None
+            return dict(user)
+
+    def put(self, username, password, user):
+        with self.lock:
+            self.entries[self._key(username, password)] = (dict(user), time.monotonic() + self.ttl)
+
+    def invalidate(self, username):
+        with self.lock:
+            self.entries = {
+                key: entry for key, entry in self.entries.items() if entry[0]['username'] != username
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Cache da estação (None se desativado em config.py)
+unlock_cache = UnlockCache() if UNLOCK_CACHE_ENABLED else None
+
+
+def authenticate(username, password, db_path=DB_PATH, cache=unlock_cache):
+    """
+    Verifica usuário e senha. Retorna o dicionário do usuário ({'id', 'username', 'role'})
+    ou None se as credenciais forem inválidas.
+    Pode levar centenas de milissegundos (bcrypt): chame fora da thread da interface.
+    Hashes com custo diferente de BCRYPT_ROUNDS são regravados com o custo atual.
+    """
+    if cache is not None:
+        user = cache.get(username, password)
+        if user is not None:
+            return user
+
+    conn, cursor = get_database_connection(db_path=db_path)
+    try:
+        cursor.execute(USER_BY_USERNAME, (username,))
+        row = cursor.fetchone()
+        if not row or not bcrypt.checkpw(password.encode('utf-8'), row[2].encode('utf-8')):
+            return None
+
+        user = {'id': row[0], 'username': row[1], 'role': row[3]}
+        if hash_rounds(row[2]) != BCRYPT_ROUNDS:
+            try:
+                cursor.execute(USER_SET_PASSWORD, (hash_password(password), row[0]))
+                conn.commit()
+                logging.info("Senha do usuário %s regravada com custo bcrypt %s.", username, BCRYPT_ROUNDS)
+            except Exception as e:
+                # O login continua válido; a regravação fica para a próxima vez
+                conn.rollback()
+                logging.error("Erro ao regravar a senha do usuário %s: %s", username, e)
+
+        if cache is not None:
+            cache.put(username, password, user)
+        return user
+    finally:
+        conn.close()
@@ -0,0 +1,92 @@
+# bloom.py
+
+import hashlib
+import math
+import struct
+
+from config import BLOOM_FALSE_POSITIVE_RATE
+
+
+# Cabeçalho do arquivo: assinatura, tamanho em bits, hashes, quantidade, capacidade, taxa de falsos positivos
+_HEADER = struct.Struct("<8sQIQQd")
+_MAGIC = b"CTBLOOM1"
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom para códigos de pacote.
+    `codigo in filtro` retorna False apenas para códigos que certamente nunca foram adicionados;
+    True pode ser um falso positivo, com taxa próxima de `fp_rate` enquanto a quantidade
+    de códigos não passar de `capacity`.
+    """
+    __slots__ = ("capacity", "fp_rate", "size", "hashes", "bits", "count")
+
+    def __init__(self, capacity, fp_rate=BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, codigo):
+        # Duplo hashing (Kirsch-Mitzenmacher): um único digest gera as k posições
+        digest = hashlib.blake2b(codigo.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, codigo):
+        bits = self.bits
+        for position in self._positions(codigo):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, codigos):
+        for codigo in codigos:
+            self.add(codigo)
+
+    def __contains__(self, codigo):
+        bits = self.bits
+        for position in self._positions(codigo):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def saturated(self):
+        """
+        Indica que o filtro recebeu mais códigos que sua capacidade e a taxa de falsos positivos subiu.
+        """
+        return self.count > self.capacity
+
+    def dump(self, file):
+        """
+        Grava o filtro em um arquivo binário aberto.
+        """
+        file.write(_HEADER.pack(_MAGIC, self.size, self.hashes, self.count, self.capacity, self.fp_rate))
+        file.write(self.bits)
+
+    @classmethod
+    def load(cls, file):
+        """
+        Lê um filtro gravado por `dump`. Lança ValueError se o arquivo não for um filtro válido.
+        """
+        header = file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("Arquivo de filtro incompleto")
+        magic, size, hashes, count, capacity, fp_rate = _HEADER.unpack(header)
+        if magic != _MAGIC:
+            raise ValueError("Arquivo não é um filtro de Bloom")
+        bloom = cls.__new__(cls)
+        bloom.size = size
+        bloom.hashes = hashes
+        bloom.count = count
+        bloom.capacity = capacity
+        bloom.fp_rate = fp_rate
+        bloom.bits = bytearray(file.read())
+        if len(bloom.bits) != (size + 7) // 8:
+            raise ValueError("Arquivo de filtro incompleto")
+        return bloom
@@ -0,0 +1,259 @@
+# coletas.py
+
+import datetime
+
+from config import STATUS_PENDING, STATUS_COLLECTED
+from queries import (
+    COLETA_FIND_OPEN, COLETA_NEXT_NUMERO, COLETA_INSERT, COLETA_ADD_COUNT, COLETA_SET_STATUS,
+    COLETAS_TO_CLOSE, COLETA_LAST_CLOSED, COLETA_FIND_PENDING_NUMERO, COLETAS_PENDING_COUNT, PACKAGE_INSERT,
+    PACKAGE_PENDING_COLETA, PACKAGE_DELETE, PACKAGE_LAST_ID
+)
+from events import EVENT_SCAN, EVENT_REMOVE, EVENT_CLOSE, EVENT_REOPEN
+from outbox import record_events
+
+
+def _now():
+    return datetime.datetime.now()
+
+
+def begin_immediate(conn):
+    """
+    Inicia uma transação de escrita, reservando o banco antes das leituras que decidem
+    o número da coleta. Assim duas estações não criam a mesma coleta ao mesmo tempo.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def find_open_coleta(cursor, transportadora, data):
+    """
+    Retorna (id, numero) da coleta aberta atual da transportadora no dia, ou None.
+    Quando há mais de uma aberta (após uma reabertura), a atual é a de maior número.
+    """
+    cursor.execute(COLETA_FIND_OPEN, (transportadora, data, STATUS_PENDING))
+    return cursor.fetchone()
+
+
+def get_or_open_coleta(cursor, transportadora, data, opened_at=None):
+    """
+    Retorna (id, numero) da coleta aberta atual, criando a próxima coleta do dia se não houver.
+    Deve ser chamada dentro de uma transação iniciada por `begin_immediate`.
+    """
+    coleta = find_open_coleta(cursor, transportadora, data)
+    if coleta:
+        return coleta
+
+    cursor.execute(COLETA_NEXT_NUMERO, (transportadora, data))
+    numero = cursor.fetchone()[0]
+    opened_at = opened_at or _now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute(COLETA_INSERT, (transportadora, data, numero, STATUS_PENDING, opened_at))
+    return cursor.lastrowid, numero
+
+
+def register_package(conn, transportadora, codigo_pacote, bipped_by, now=None):
+    """
+    Grava um pacote na coleta aberta atual da transportadora e atualiza o contador da coleta,
+    em uma única transação. Retorna (id do pacote, número da coleta).
+    """
+    now = now or _now()
+    data = now.date().isoformat()
+    hora = now.strftime("%H:%M:%S")
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        coleta_id, numero = get_or_open_coleta(cursor, transportadora, data, f"{data} {hora}")
+        # packages.status é mantido apenas por compatibilidade; o status vale o da coleta
+        cursor.execute(
+            PACKAGE_INSERT, (transportadora, codigo_pacote, data, hora, STATUS_PENDING, numero, bipped_by, coleta_id)
+        )
+        package_id = cursor.lastrowid
+        cursor.execute(COLETA_ADD_COUNT, (1, coleta_id))
+        record_events(cursor, EVENT_SCAN, [{
+            "package_id": package_id, "transportadora": transportadora, "codigo": codigo_pacote,
+            "data": data, "hora": hora, "coleta_numero": numero, "operator": bipped_by,
+        }])
+        conn.commit()
+        return package_id, numero
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def register_packages(conn, transportadora, codigos, bipped_by, now=None):
+    """
+    Grava vários pacotes na coleta aberta atual da transportadora em uma única transação
+    (importação em lote). Retorna o número da coleta.
+    """
+    now = now or _now()
+    data = now.date().isoformat()
+    hora = now.strftime("%H:%M:%S")
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        coleta_id, numero = get_or_open_coleta(cursor, transportadora, data, f"{data} {hora}")
+        cursor.executemany(PACKAGE_INSERT, [
+            (transportadora, codigo, data, hora, STATUS_PENDING, numero, bipped_by, coleta_id)
+            for codigo in codigos
+        ])
+        cursor.execute(COLETA_ADD_COUNT, (len(codigos), coleta_id))
+        # Na mesma transação os ids são consecutivos: o último é o do último código
+        last_id = cursor.execute(PACKAGE_LAST_ID).fetchone()[0]
+        first_id = last_id - len(codigos) + 1
+        record_events(cursor, EVENT_SCAN, [{
+            "package_id": first_id + offset, "transportadora": transportadora, "codigo": codigo,
+            "data": data, "hora": hora, "coleta_numero": numero, "operator": bipped_by,
+        } for offset, codigo in enumerate(codigos)])
+        conn.commit()
+        return numero
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def remove_pending_package(conn, package_id, codigo_pacote):
+    """
+    Remove um pacote de uma coleta ainda aberta e atualiza o contador da coleta.
+    Retorna True se o pacote foi removido.
+    """
+    return bool(remove_pending_packages(conn, [(package_id, codigo_pacote)]))
+
+
+def remove_pending_packages(conn, packages):
+    """
+    Remove vários pacotes (pares (id, código)) de coletas ainda abertas em uma única transação,
+    atualizando o contador de cada coleta uma vez. Pacotes que já não estão em uma coleta aberta
+    são ignorados. Retorna os ids removidos.
+    """
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        removed = []
+        counts = {}
+        payloads = []
+        for package_id, codigo_pacote in packages:
+            cursor.execute(PACKAGE_PENDING_COLETA, (package_id, codigo_pacote, STATUS_PENDING))
+            row = cursor.fetchone()
+            if not row:
+                continue
+            coleta_id, transportadora, data, numero = row
+            cursor.execute(PACKAGE_DELETE, (package_id,))
+            counts[coleta_id] = counts.get(coleta_id, 0) + 1
+            removed.append(package_id)
+            payloads.append({
+                "package_id": package_id, "transportadora": transportadora, "codigo": codigo_pacote,
+                "data": data, "coleta_numero": numero,
+            })
+        if not removed:
+            conn.rollback()
+            return []
+        cursor.executemany(COLETA_ADD_COUNT, [(-count, coleta_id) for coleta_id, count in counts.items()])
+        record_events(cursor, EVENT_REMOVE, payloads)
+        conn.commit()
+        return removed
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def restore_packages(conn, packages):
+    """
+    Devolve pacotes removidos por engano às coletas de onde saíram, com a data, a hora e o operador
+    da bipagem original, em uma única transação. `packages` são tuplas (transportadora, código,
+    data, hora, número da coleta, operador). Pacotes cuja coleta já foi fechada ficam de fora.
+    Retorna [(posição em `packages`, novo id)] dos pacotes devolvidos.
+    """
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        coletas = {}
+        restored = []
+        payloads = []
+        for position, (transportadora, codigo, data, hora, numero, bipped_by) in enumerate(packages):
+            key = (transportadora, data, numero)
+            if key not in coletas:
+                cursor.execute(COLETA_FIND_PENDING_NUMERO, (transportadora, data, STATUS_PENDING, numero))
+                row = cursor.fetchone()
+                coletas[key] = [row[0], 0] if row else None
+            coleta = coletas[key]
+            if coleta is None:
+                continue
+            cursor.execute(
+                PACKAGE_INSERT, (transportadora, codigo, data, hora, STATUS_PENDING, numero, bipped_by, coleta[0])
+            )
+            coleta[1] += 1
+            restored.append((position, cursor.lastrowid))
+            payloads.append({
+                "package_id": cursor.lastrowid, "transportadora": transportadora, "codigo": codigo,
+                "data": data, "hora": hora, "coleta_numero": numero, "operator": bipped_by, "restored": True,
+            })
+        cursor.executemany(COLETA_ADD_COUNT, [
+            (count, coleta_id) for coleta_id, count in filter(None, coletas.values()) if count
+        ])
+        record_events(cursor, EVENT_SCAN, payloads)
+        conn.commit()
+        return restored
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def close_open_coletas(conn, transportadora, data, before_commit=None):
+    """
+    Fecha as coletas abertas (com pacotes) da transportadora no dia.
+    É uma transição de estado na tabela coletas; as linhas de pacotes não são reescritas.
+    `before_commit(cursor, coletas, closed_at)`, se informado, roda dentro da mesma transação
+    com a lista de (id, numero, package_count); uma exceção nele desfaz o fechamento.
+    Retorna a lista de (numero, package_count) das coletas fechadas.
+    """
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        cursor.execute(COLETAS_TO_CLOSE, (transportadora, data, STATUS_PENDING))
+        coletas = cursor.fetchall()
+        closed_at = _now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.executemany(
+            COLETA_SET_STATUS, [(STATUS_COLLECTED, closed_at, coleta_id) for coleta_id, _, _ in coletas]
+        )
+        record_events(cursor, EVENT_CLOSE, [{
+            "transportadora": transportadora, "data": data, "coleta_numero": numero,
+            "package_count": package_count, "closed_at": closed_at,
+        } for _, numero, package_count in coletas])
+        if before_commit is not None and coletas:
+            before_commit(cursor, coletas, closed_at)
+        conn.commit()
+        return [(numero, package_count) for _, numero, package_count in coletas]
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def reopen_last_coleta(conn, transportadora, data):
+    """
+    Reabre a última coleta fechada da transportadora no dia.
+    Retorna (numero, package_count) da coleta reaberta, ou None se não houver coleta fechada.
+    """
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        cursor.execute(COLETA_LAST_CLOSED, (transportadora, data, STATUS_COLLECTED))
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return None
+        cursor.execute(COLETA_SET_STATUS, (STATUS_PENDING, None, row[0]))
+        record_events(cursor, EVENT_REOPEN, [{
+            "transportadora": transportadora, "data": data, "coleta_numero": row[1], "package_count": row[2],
+        }])
+        conn.commit()
+        return row[1], row[2]
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def pending_count(cursor, transportadora, data):
+    """
+    Total de pacotes nas coletas abertas da transportadora no dia, lido dos contadores das coletas.
+    """
+    cursor.execute(COLETAS_PENDING_COUNT, (transportadora, data, STATUS_PENDING))
+    return cursor.fetchone()[0]
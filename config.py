@@ -1,6 +1,7 @@
 import os
 import sys
 import re
+import socket
 import logging
 
 # Determinar o caminho base da aplicação
@@ -22,8 +23,8 @@ LOG_DIR = os.path.join(DATA_DIR, 'logs')
 os.makedirs(DB_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# Caminhos para os bancos de dados
-DB_PATH = os.path.join(DB_DIR, 'packages.db')
+# Caminhos para os bancos de dados (CONTADOR_DB_PATH permite usar um banco em pasta compartilhada)
+DB_PATH = os.environ.get("CONTADOR_DB_PATH") or os.path.join(DB_DIR, 'packages.db')
 TEST_DB_PATH = os.path.join(DB_DIR, 'packagestest.db')  # Banco de dados para testes
 
 # Caminho para o arquivo de áudio personalizado
@@ -50,5 +51,129 @@ TRANSPORTADORA_PADRAO = "Selecione a Transportadora"
 STATUS_PENDING = "pending"
 STATUS_COLLECTED = "collected"
 
-# Expressão regular para validação de códigos de pacote
-PACKAGE_CODE_REGEX = re.compile(r'^(GC|AJ)\d{16}$|^BR\w{13}$|^44\d{9}$|\d{15,}$')
+# Expressão regular para validação de códigos de pacote (apenas ASCII: \d e \w não aceitam
+# dígitos e letras de outros alfabetos; \Z não aceita quebra de linha no final)
+PACKAGE_CODE_REGEX = re.compile(r'^(GC|AJ)\d{16}\Z|^BR\w{13}\Z|^44\d{9}\Z|\d{15,}\Z', re.ASCII)
+
+# Busca de códigos por trecho (janela de verificação e consulta de coletas)
+SEARCH_MIN_LENGTH = 2
+SEARCH_RESULT_LIMIT = 50
+SEARCH_DEBOUNCE_MS = 150
+
+# Análise de produtividade dos operadores
+IDLE_THRESHOLD_SECONDS = 300  # Intervalo entre bipagens considerado ociosidade
+GAP_BUCKETS_SECONDS = [5, 10, 30, 60, 300]  # Faixas do histograma de intervalos
+
+# Identificação da estação (computador) que está bipando
+STATION_ID = os.environ.get("CONTADOR_STATION") or socket.gethostname()
+
+# Registro de todas as tentativas de bipagem (aceitas e rejeitadas)
+SCAN_EVENT_RETENTION_DAYS = 90
+SCAN_EVENT_BATCH_SIZE = 200
+SCAN_EVENT_FLUSH_SECONDS = 0.5
+
+# Diário local de bipagens: a estação confirma a bipagem no disco local e replica no banco central
+JOURNAL_ENABLED = True
+JOURNAL_DIR = os.path.join(DATA_DIR, 'journal')
+JOURNAL_FSYNC_SECONDS = 0.2
+JOURNAL_RETRY_SECONDS = 5
+JOURNAL_COMPACT_BYTES = 1_000_000
+JOURNAL_STATUS_REFRESH_MS = 1000
+
+# Política de duplicados: same_day (mesmo dia e transportadora), same_coleta (coleta aberta),
+# last_n_days (qualquer transportadora nos últimos DUPLICATE_WINDOW_DAYS dias) ou ever (todo o histórico)
+DUPLICATE_POLICY = "same_day"
+DUPLICATE_WINDOW_DAYS = 30
+# Filtro de Bloom com todos os códigos já registrados, para responder "nunca visto" sem consultar o banco
+DUPLICATE_BLOOM_ENABLED = True
+BLOOM_FALSE_POSITIVE_RATE = 0.001
+REGISTERED_CODES_DIR = os.path.join(DATA_DIR, 'cache')
+REGISTERED_CODES_REFRESH_SECONDS = 1.0
+
+# Exportação: leitura do cursor em lotes e grupos de linhas do Parquet
+EXPORT_FETCH_SIZE = 10_000
+PARQUET_ROW_GROUP_SIZE = 100_000
+# Snapshot noturno em Parquet, uma partição por data (data=AAAA-MM-DD)
+SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshots')
+
+# Linha de comando (python -m contador): códigos por transação na importação em lote
+IMPORT_BATCH_SIZE = 10_000
+
+# Autenticação: custo do bcrypt (senhas com outro custo são regravadas no próximo login)
+BCRYPT_ROUNDS = 12
+# Cache de desbloqueio da estação: apenas em memória, evita refazer o bcrypt ao desbloquear a tela
+UNLOCK_CACHE_ENABLED = True
+UNLOCK_CACHE_TTL_SECONDS = 600
+
+# Painel ao vivo: redesenho da tela, leitura das outras estações, ressincronização completa
+DASHBOARD_REFRESH_MS = 250
+DASHBOARD_REMOTE_SECONDS = 0.5
+DASHBOARD_RESYNC_SECONDS = 60
+DASHBOARD_RATE_WINDOW_SECONDS = 300  # Janela do cálculo de bipagens por minuto
+
+# Manifestos gerados no fechamento de cada coleta (CSV, resumo HTML para impressão e checksum)
+MANIFEST_DIR = os.path.join(DATA_DIR, 'manifests')
+TEST_MANIFEST_DIR = os.path.join(MANIFEST_DIR, 'teste')
+
+# Cache em memória das linhas do dia por transportadora (troca de transportadora sem reconsultar o banco)
+ROW_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Filtro da lista da tela principal (início ou final do código): tempo acima do qual a filtragem é registrada no log
+ROW_FILTER_BUDGET_MS = 16
+# Remoção por bipagem: a fila é confirmada (uma transação) ao chegar a este número de pacotes, e os
+# últimos lotes confirmados podem ser desfeitos enquanto a janela estiver aberta
+REMOVAL_BATCH_SIZE = 50
+REMOVAL_UNDO_BATCHES = 10
+
+# Modo de teste: banco descartável em memória, criado ao abrir a tela de teste (nada é gravado em disco)
+SANDBOX_SAMPLE_DAYS = 3  # Dias de dados reais copiados quando solicitado
+TRAINING_LOAD_OPTIONS = [0, 1_000, 5_000, 20_000, 50_000]  # Pacotes sintéticos pré-carregados
+
+# Captura de desempenho (menu do administrador): perfil por amostragem, tracemalloc e tempos de SQL gravados em LOG_DIR
+PROFILE_DEFAULT_SECONDS = 60
+PROFILE_MAX_SECONDS = 600
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_TRACEMALLOC_FRAMES = 10  # Profundidade das pilhas de alocação
+PROFILE_TOP_ALLOCATIONS = 50
+
+# Manutenção automática do banco (maintenance.py), apenas nos períodos sem bipagens em nenhuma estação
+MAINTENANCE_ENABLED = True
+MAINTENANCE_IDLE_SECONDS = 300       # Sem bipagens há este tempo: período ocioso
+MAINTENANCE_POLL_SECONDS = 30
+MAINTENANCE_STEP_SECONDS = 1.5       # Cada etapa segura o banco por no máximo isto (as outras estações esperam até 5 s)
+MAINTENANCE_JOB_SECONDS = 60         # Tempo total de cada tarefa em uma janela ociosa
+MAINTENANCE_RETRY_SECONDS = 600      # Espera antes de repetir uma tarefa interrompida (ou em andamento em outra estação)
+MAINTENANCE_VACUUM_PAGES = 256       # Páginas devolvidas ao sistema por etapa do incremental_vacuum
+MAINTENANCE_CONVERT_FREE_RATIO = 0.10  # Fração de páginas livres que justifica converter o banco para auto_vacuum incremental
+MAINTENANCE_ANALYSIS_LIMIT = 1000    # PRAGMA analysis_limit: linhas amostradas por índice no ANALYZE
+MAINTENANCE_INTERVALS = {            # Intervalo mínimo entre execuções de cada tarefa, em segundos
+    "incremental_vacuum": 3600,
+    "optimize": 6 * 3600,
+    "wal_checkpoint": 3600,
+    "quick_check": 24 * 3600,
+}
+
+# Importação de fotos de etiquetas (python -m contador photos): decodificação em vários processos
+PHOTO_WORKERS = None                 # Processos de decodificação (None: um por núcleo)
+PHOTO_MAX_PIXELS = 4_000_000         # Fotos maiores são reduzidas na primeira tentativa de leitura
+PHOTO_PROGRESS_EVERY = 50            # Imagens entre as mensagens de progresso
+
+# Vários sites (galpões): cada site grava apenas no seu próprio banco (DB_PATH); as consultas de
+# todos os sites (relatórios, exportação, verificação) abrem os bancos dos outros sites somente para leitura
+SITE_ID = os.environ.get("CONTADOR_SITE") or "local"
+# JSON {"nome do site": "caminho do banco"}, ex.: pastas compartilhadas ou cópias sincronizadas
+SITES_FILE = os.environ.get("CONTADOR_SITES_FILE") or os.path.join(DATA_DIR, 'sites.json')
+SHARD_WORKERS = 4                    # Bancos consultados ao mesmo tempo (uma thread e uma conexão por banco)
+SHARD_TIMEOUT_SECONDS = 10           # Espera por um banco bloqueado antes de considerá-lo indisponível
+SHARD_QUEUE_BATCHES = 4              # Lotes lidos à frente por banco na exportação de todos os sites
+
+# Eventos para outros sistemas (ERP, portais): bipagens, remoções, fechamentos e reaberturas gravados
+# na tabela outbox na mesma transação e entregues em segundo plano (outbox.py). Ligue em todas as estações.
+OUTBOX_ENABLED = False
+OUTBOX_URL = os.environ.get("CONTADOR_OUTBOX_URL")  # POST JSON em lotes; sem URL, grava em OUTBOX_FILE
+OUTBOX_FILE = os.path.join(DATA_DIR, 'outbox', 'events.jsonl')
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_SECONDS = 0.5
+OUTBOX_HTTP_TIMEOUT_SECONDS = 10
+OUTBOX_RETRY_BASE_SECONDS = 1        # Primeira espera após uma falha; dobra a cada falha seguida
+OUTBOX_RETRY_MAX_SECONDS = 300
+OUTBOX_LEASE_SECONDS = 30            # Reserva da entrega: outra estação assume se esta parar de renovar
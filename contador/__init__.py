@@ -0,0 +1,5 @@
+# contador/__init__.py
+"""
+Linha de comando do Contador de Pacotes para operações em lote sem interface gráfica.
+Uso: python -m contador --help
+"""
@@ -0,0 +1,7 @@
+# contador/__main__.py
+
+import sys
+
+from contador.cli import main
+
+sys.exit(main())
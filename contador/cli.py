@@ -0,0 +1,460 @@
+# contador/cli.py
+"""
+Operações em lote pela linha de comando, sem Tk nem login:
+
+    python -m contador export --start 2024-01-01 --end 2024-01-31 > janeiro.csv
+    python -m contador close SHEIN Shopee
+    python -m contador verify codigos.txt
+    python -m contador import codigos.txt --transportadora SHEIN --operator importacao
+    python -m contador photos fotos/ --operator importacao
+    python -m contador totals --start 2024-01-01
+    python -m contador maintenance --convert
+    python -m contador totals --start 2024-01-01 --all-sites
+    python -m contador reconcile --start 2024-01-01 --end 2024-01-31
+    python -m contador outbox --deliver --url http://127.0.0.1:8080/eventos
+
+A saída é escrita em TSV/CSV à medida que as linhas são lidas; mensagens e resumos vão para a
+saída de erro. Códigos de saída: 0 sucesso, 1 itens não encontrados ou rejeitados,
+2 argumentos inválidos, 3 erro de banco de dados ou de arquivo.
+"""
+
+import argparse
+import csv
+import datetime
+import getpass
+import itertools
+import os
+import sqlite3
+import sys
+
+from config import DB_PATH, SITES_FILE, STATUS_PENDING, STATUS_COLLECTED, PHOTO_PROGRESS_EVERY, logging
+from database import initialize_database
+from coletas import close_open_coletas
+from manifest import ManifestBuilder
+from exporters import PARQUET_AVAILABLE, export_query, iter_batches, write_csv, write_csv_rows, write_parquet
+from queries import CLI_OPEN_CARRIERS, CLI_DAILY_TOTALS
+from repository import PackageRepository
+from importer import BatchImporter
+from photo_ingest import DECODER_AVAILABLE, PhotoIngest, list_images
+from maintenance import JOBS, JOB_VACUUM, run_job, record_finished
+from shards import ShardSet, load_shards
+from outbox import DeliveryError, OutboxDispatcher, HttpSink, FileSink, default_sink, outbox_status
+from scan_events import OUTCOME_OK, OUTCOME_LABELS
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_ERROR = 3
+
+# Códigos por consulta na verificação (abaixo do limite de parâmetros do SQLite)
+VERIFY_CHUNK_SIZE = 500
+
+
+class CommandError(Exception):
+    """
+    Erro de uso detectado depois da leitura dos argumentos.
+    """
+
+
+def open_database(db_path):
+    conn = sqlite3.connect(db_path, timeout=10)
+    initialize_database(conn, conn.cursor())
+    return conn
+
+
+def read_codes(file):
+    """
+    Lê um código por linha, ignorando linhas em branco.
+    """
+    for line in file:
+        codigo = line.strip()
+        if codigo:
+            yield codigo
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def tsv_writer(out):
+    return csv.writer(out, delimiter="\t", lineterminator="\n")
+
+
+def today():
+    return datetime.date.today().isoformat()
+
+
+def site_shards(args):
+    """
+    Bancos de todos os sites (--sites), com o banco de --db como o deste site.
+    """
+    return ShardSet(load_shards(args.sites, local_path=args.db))
+
+
+def report_failed_sites(shards):
+    """
+    Avisa na saída de erro os sites cujo banco não pôde ser lido. Retorna True se houve algum.
+    """
+    for site, error in shards.failed.items():
+        print(f"Aviso: banco do site {site} indisponível, fora do resultado: {error}", file=sys.stderr)
+    return bool(shards.failed)
+
+
+def cmd_export(conn, args, out):
+    query, params = export_query(args.start, args.end, args.transportadora, args.status)
+    to_stdout = args.output in (None, "-")
+
+    if args.format == "parquet":
+        if not PARQUET_AVAILABLE:
+            raise CommandError("a exportação em Parquet requer o pacote pyarrow")
+        if to_stdout:
+            raise CommandError("a exportação em Parquet requer --output")
+
+    shards = None
+    if args.all_sites:
+        # Todos os bancos lidos ao mesmo tempo; cada linha ganha a coluna Site
+        shards = site_shards(args)
+        batches = shards.iter_batches(query, params)
+    else:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        batches = iter_batches(cursor)
+
+    if args.format == "parquet":
+        count = write_parquet(batches, args.output, with_site=args.all_sites)
+    elif to_stdout:
+        count = write_csv_rows(batches, out, with_site=args.all_sites)
+    else:
+        count = write_csv(batches, args.output, with_site=args.all_sites)
+
+    print(f"{count} pacotes exportados.", file=sys.stderr)
+    if shards is not None and report_failed_sites(shards):
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def cmd_close(conn, args, out):
+    data = args.date or today()
+    transportadoras = args.transportadora
+    if not transportadoras:
+        cursor = conn.cursor()
+        cursor.execute(CLI_OPEN_CARRIERS, (data, STATUS_PENDING))
+        transportadoras = [row[0] for row in cursor.fetchall()]
+
+    writer = tsv_writer(out)
+    writer.writerow(["Transportadora", "Data", "Número da Coleta", "Pacotes", "Manifesto"])
+    closed_total = 0
+    for transportadora in transportadoras:
+        manifests = ManifestBuilder(transportadora, data)
+        try:
+            closed = close_open_coletas(conn, transportadora, data, before_commit=manifests)
+        except Exception:
+            manifests.discard()
+            raise
+        for (numero, package_count), html_path in zip(closed, manifests.publish()):
+            writer.writerow([transportadora, data, numero, package_count, html_path])
+            closed_total += 1
+
+    if not closed_total:
+        print(f"Nenhuma coleta aberta com pacotes em {data}.", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_verify(conn, args, out):
+    packages = PackageRepository(conn)
+    shards = site_shards(args) if args.all_sites else None
+    writer = tsv_writer(out)
+    headers = [
+        "Código do Pacote", "Encontrado", "Transportadora", "Data", "Hora", "Status",
+        "Número da Coleta", "Bipado Por"
+    ]
+    writer.writerow(headers + ["Site"] if shards else headers)
+    checked = missing = 0
+    failed_sites = False
+    for chunk in chunked(read_codes(args.file), VERIFY_CHUNK_SIZE):
+        if shards:
+            # Bipagem mais recente entre todos os sites, com o site na última coluna
+            latest = shards.latest_many(chunk)
+            failed_sites = report_failed_sites(shards) or failed_sites
+        else:
+            latest = {codigo: (None, record) for codigo, record in packages.get_many(chunk).items()}
+        for codigo in chunk:
+            site, record = latest.get(codigo, (None, None))
+            if record:
+                row = (
+                    codigo, "sim", record.transportadora, record.data, record.hora, record.status,
+                    record.coleta_numero, record.bipped_by
+                )
+                writer.writerow(row + (site,) if shards else row)
+            else:
+                writer.writerow((codigo, "não"))
+                missing += 1
+        checked += len(chunk)
+
+    print(f"{checked} códigos verificados, {missing} não encontrados.", file=sys.stderr)
+    if failed_sites:
+        return EXIT_ERROR
+    return EXIT_FAILURES if missing else EXIT_OK
+
+
+def cmd_import(conn, args, out):
+    """
+    Importa códigos com as mesmas validações e a mesma política de duplicados da tela de bipagem.
+    Os códigos rejeitados são escritos na saída com o motivo.
+    """
+    importer = BatchImporter(conn, args.operator, args.transportadora, dry_run=args.dry_run)
+    writer = tsv_writer(out)
+    writer.writerow(["Código do Pacote", "Motivo"])
+
+    for codigo in read_codes(args.file):
+        outcome, _ = importer.add(codigo)
+        if outcome != OUTCOME_OK:
+            writer.writerow([codigo, OUTCOME_LABELS[outcome]])
+    importer.flush()
+
+    action = "seriam importados" if args.dry_run else "importados"
+    print(f"{importer.imported} códigos {action}, {importer.rejected} rejeitados.", file=sys.stderr)
+    return EXIT_FAILURES if importer.rejected else EXIT_OK
+
+
+def cmd_photos(conn, args, out):
+    """
+    Importa os códigos de barras de uma pasta de fotos de etiquetas. Escreve na saída as fotos
+    e os códigos recusados, com o motivo; o progresso (imagens/s) vai para a saída de erro.
+    """
+    if not DECODER_AVAILABLE:
+        raise CommandError("a leitura de fotos requer os pacotes pillow e zxing-cpp (ou pyzbar com a biblioteca zbar)")
+    if not os.path.isdir(args.folder):
+        raise CommandError(f"pasta não encontrada: {args.folder}")
+    paths = list_images(args.folder)
+    if not paths:
+        print(f"Nenhuma imagem em {args.folder}.", file=sys.stderr)
+        return EXIT_OK
+
+    importer = BatchImporter(conn, args.operator, args.transportadora, dry_run=args.dry_run)
+    ingest = PhotoIngest(importer, workers=args.workers)
+    writer = tsv_writer(out)
+    writer.writerow(["Arquivo", "Código do Pacote", "Motivo"])
+
+    def progress(done, total):
+        if done % PHOTO_PROGRESS_EVERY == 0 or done == total:
+            print(f"{done}/{total} imagens, {ingest.images_per_second:.1f} imagens/s", file=sys.stderr)
+
+    for row in ingest.run(paths, progress):
+        writer.writerow(row)
+
+    action = "seriam importados" if args.dry_run else "importados"
+    print(
+        f"{ingest.images} imagens em {ingest.elapsed:.1f} s ({ingest.images_per_second:.1f} imagens/s), "
+        f"{ingest.unreadable} sem código de pacote; {importer.imported} códigos {action}, "
+        f"{importer.rejected} recusados.",
+        file=sys.stderr
+    )
+    return EXIT_FAILURES if ingest.unreadable or importer.rejected else EXIT_OK
+
+
+def cmd_totals(conn, args, out):
+    start = args.start or today()
+    end = args.end or start
+    writer = tsv_writer(out)
+    counts = ["Coletas", "Pacotes", "Em Aberto", "Coletados"]
+
+    if args.all_sites or args.by_site:
+        shards = site_shards(args)
+        rows = shards.daily_totals(start, end, by_site=args.by_site)
+        writer.writerow(["Data", "Transportadora"] + (["Site"] if args.by_site else []) + counts)
+        writer.writerows(rows)
+        return EXIT_ERROR if report_failed_sites(shards) else EXIT_OK
+
+    cursor = conn.cursor()
+    cursor.execute(CLI_DAILY_TOTALS, (STATUS_PENDING, STATUS_COLLECTED, start, end))
+    writer.writerow(["Data", "Transportadora"] + counts)
+    for rows in iter_batches(cursor):
+        writer.writerows(rows)
+    return EXIT_OK
+
+
+def cmd_reconcile(conn, args, out):
+    """
+    Lista os códigos bipados em mais de um site no período, uma linha por site em que o código
+    aparece. Sai com 1 quando há algum.
+    """
+    start = args.start or today()
+    end = args.end or start
+    shards = site_shards(args)
+    if len(shards) < 2:
+        raise CommandError(f"nenhum outro site configurado em {args.sites}")
+
+    writer = tsv_writer(out)
+    writer.writerow(["Código do Pacote", "Site", "Transportadora", "Primeira Bipagem"])
+    found = 0
+    for rows in shards.reconcile(start, end):
+        writer.writerows(rows)
+        found += 1
+
+    print(f"{found} códigos bipados em mais de um site.", file=sys.stderr)
+    if report_failed_sites(shards):
+        return EXIT_ERROR
+    return EXIT_FAILURES if found else EXIT_OK
+
+
+def cmd_maintenance(conn, args, out):
+    """
+    Roda as tarefas de manutenção do banco até o fim, sem limite de tempo nem espera por período ocioso
+    (use fora do expediente: cada etapa bloqueia as estações enquanto roda).
+    """
+    unknown = [job for job in args.jobs if job not in JOBS]
+    if unknown:
+        raise CommandError(f"tarefa desconhecida: {', '.join(unknown)} (use: {', '.join(JOBS)})")
+    writer = tsv_writer(out)
+    writer.writerow(["Tarefa", "Concluída", "Resultado"])
+    failed = 0
+    for job in args.jobs or list(JOBS):
+        options = {"convert": args.convert} if job == JOB_VACUUM else {}
+        completed, result = run_job(conn, job, step_seconds=None, job_seconds=None, **options)
+        if completed:
+            record_finished(conn, job, result)
+        writer.writerow([job, "sim" if completed else "não", result])
+        failed += not completed
+    return EXIT_FAILURES if failed else EXIT_OK
+
+
+def cmd_outbox(conn, args, out):
+    """
+    Mostra os eventos aguardando entrega na tabela outbox; com --deliver, entrega todos ao destino
+    (--url, --file ou o configurado) e sai, sem novas tentativas em caso de falha.
+    """
+    if args.url and args.file:
+        raise CommandError("use apenas um destino: --url ou --file")
+    if args.deliver:
+        sink = HttpSink(args.url) if args.url else FileSink(args.file) if args.file else default_sink()
+        dispatcher = OutboxDispatcher(args.db, sink=sink)
+        try:
+            delivered = dispatcher.drain(conn)
+        except DeliveryError as e:
+            print(f"Erro ao entregar os eventos para {sink}: {e} ({dispatcher.delivered} entregues)", file=sys.stderr)
+            return EXIT_ERROR
+        if delivered is False:
+            print("Outra estação está entregando os eventos agora.", file=sys.stderr)
+            return EXIT_FAILURES
+        print(f"{delivered} eventos entregues para {sink}.", file=sys.stderr)
+
+    pending, oldest, attempts = outbox_status(conn)
+    writer = tsv_writer(out)
+    writer.writerow(["Pendentes", "Mais Antigo", "Tentativas"])
+    writer.writerow([pending, oldest or "", attempts or 0])
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m contador", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--db", default=DB_PATH, help="banco de dados (padrão: %(default)s)")
+    parser.add_argument("--sites", default=SITES_FILE,
+                        help="lista de sites e seus bancos, para --all-sites e reconcile (padrão: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="exporta os pacotes de um período")
+    export.add_argument("--start", required=True, help="data inicial (AAAA-MM-DD)")
+    export.add_argument("--end", required=True, help="data final (AAAA-MM-DD)")
+    export.add_argument("--transportadora")
+    export.add_argument("--status", choices=[STATUS_PENDING, STATUS_COLLECTED])
+    export.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export.add_argument("--output", "-o", help="arquivo de saída (padrão: saída padrão, apenas CSV)")
+    export.add_argument("--all-sites", action="store_true", help="exporta os pacotes de todos os sites, com a coluna Site")
+    export.set_defaults(func=cmd_export)
+
+    close = subparsers.add_parser(
+        "close", help="fecha as coletas abertas (bipagens ainda no diário local das estações não entram)"
+    )
+    close.add_argument("transportadora", nargs="*", help="transportadoras (padrão: todas com coleta aberta)")
+    close.add_argument("--date", help="data das coletas (padrão: hoje)")
+    close.set_defaults(func=cmd_close)
+
+    verify = subparsers.add_parser("verify", help="verifica uma lista de códigos, um por linha")
+    verify.add_argument("file", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default="-",
+                        help="arquivo de códigos (padrão: entrada padrão)")
+    verify.add_argument("--all-sites", action="store_true", help="procura em todos os sites, com a coluna Site")
+    verify.set_defaults(func=cmd_verify)
+
+    import_ = subparsers.add_parser("import", help="registra os códigos de um arquivo, um por linha")
+    import_.add_argument("file", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default="-",
+                         help="arquivo de códigos (padrão: entrada padrão)")
+    import_.add_argument("--transportadora", help="exige esta transportadora (padrão: a detectada pelo código)")
+    import_.add_argument("--operator", default=getpass.getuser(), help="gravado como Bipado Por (padrão: %(default)s)")
+    import_.add_argument("--dry-run", action="store_true", help="apenas valida, sem gravar")
+    import_.set_defaults(func=cmd_import)
+
+    photos = subparsers.add_parser("photos", help="registra os códigos de barras de uma pasta de fotos de etiquetas")
+    photos.add_argument("folder", help="pasta com as fotos (JPEG, PNG...)")
+    photos.add_argument("--transportadora", help="exige esta transportadora (padrão: a detectada pelo código)")
+    photos.add_argument("--operator", default=getpass.getuser(), help="gravado como Bipado Por (padrão: %(default)s)")
+    photos.add_argument("--workers", type=int, help="processos de decodificação (padrão: um por núcleo)")
+    photos.add_argument("--dry-run", action="store_true", help="apenas lê e valida, sem gravar")
+    photos.set_defaults(func=cmd_photos)
+
+    totals = subparsers.add_parser("totals", help="totais diários por transportadora")
+    totals.add_argument("--start", help="data inicial (padrão: hoje)")
+    totals.add_argument("--end", help="data final (padrão: a data inicial)")
+    totals.add_argument("--all-sites", action="store_true", help="soma os totais de todos os sites")
+    totals.add_argument("--by-site", action="store_true", help="totais de todos os sites, uma linha por site")
+    totals.set_defaults(func=cmd_totals)
+
+    reconcile = subparsers.add_parser("reconcile", help="códigos bipados em mais de um site no período")
+    reconcile.add_argument("--start", help="data inicial (padrão: hoje)")
+    reconcile.add_argument("--end", help="data final (padrão: a data inicial)")
+    reconcile.set_defaults(func=cmd_reconcile)
+
+    maintenance = subparsers.add_parser(
+        "maintenance", help="vacuum, estatísticas, checkpoint e verificação do banco (fora do expediente)"
+    )
+    maintenance.add_argument("jobs", nargs="*", metavar="tarefa",
+                             help=f"tarefas a rodar (padrão: todas): {', '.join(JOBS)}")
+    maintenance.add_argument("--convert", action="store_true",
+                             help="converte o banco para auto_vacuum incremental (VACUUM completo)")
+    maintenance.set_defaults(func=cmd_maintenance)
+
+    outbox = subparsers.add_parser("outbox", help="eventos aguardando entrega ao ERP e aos portais")
+    outbox.add_argument("--deliver", action="store_true", help="entrega todos os eventos pendentes agora")
+    outbox.add_argument("--url", help="endpoint HTTP que recebe os lotes (padrão: o configurado)")
+    outbox.add_argument("--file", help="arquivo JSON Lines de destino (padrão: o configurado)")
+    outbox.set_defaults(func=cmd_outbox)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # O módulo csv controla as quebras de linha
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(newline="")
+
+    try:
+        conn = open_database(args.db)
+    except Exception as e:
+        print(f"Erro ao abrir o banco de dados {args.db}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    try:
+        return args.func(conn, args, sys.stdout)
+    except CommandError as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # Saída fechada antes do fim (ex.: | head): descarta o restante sem erro
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return EXIT_OK
+    except (sqlite3.Error, OSError) as e:
+        logging.error("Erro no comando %s: %s", args.command, e)
+        print(f"Erro: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        conn.close()
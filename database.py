@@ -1,16 +1,32 @@
 import sqlite3
-from config import DB_PATH, TEST_DB_PATH, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, DEFAULT_ROLE, logging
+import threading
+from config import (
+    DB_PATH, TEST_DB_PATH, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, DEFAULT_ROLE, BCRYPT_ROUNDS, logging
+)
 import bcrypt
 
-def get_database_connection(test=False):
+from profiler import TimedConnection
+
+# Versão do esquema gravada em PRAGMA user_version; cada migração roda uma única vez
+SCHEMA_VERSION = 2
+
+# Bancos já inicializados neste processo: o esquema é verificado na primeira conexão apenas
+_initialized_paths = set()
+_initialized_lock = threading.Lock()
+
+def get_database_connection(test=False, db_path=None):
     """
     Retorna uma conexão e cursor para o banco de dados.
     Se `test` for True, retorna a conexão para o banco de dados de teste.
+    A inicialização do esquema roda na primeira conexão a cada banco no processo.
     """
-    db_path = TEST_DB_PATH if test else DB_PATH
-    conn = sqlite3.connect(db_path)
+    db_path = db_path or (TEST_DB_PATH if test else DB_PATH)
+    conn = sqlite3.connect(db_path, uri=True, factory=TimedConnection)
     cursor = conn.cursor()
-    initialize_database(conn, cursor)
+    with _initialized_lock:
+        if db_path not in _initialized_paths:
+            initialize_database(conn, cursor)
+            _initialized_paths.add(db_path)
     return conn, cursor
 
 def initialize_database(conn, cursor):
@@ -18,6 +34,9 @@ def initialize_database(conn, cursor):
     Cria as tabelas necessárias se não existirem e adiciona um usuário admin padrão.
     """
     try:
+        # Só tem efeito em um banco novo (antes da primeira tabela); bancos existentes são convertidos
+        # pela manutenção (maintenance.py)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,7 +49,7 @@ def initialize_database(conn, cursor):
             CREATE TABLE IF NOT EXISTS packages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 transportadora TEXT NOT NULL,
-                codigo_pacote TEXT UNIQUE NOT NULL,
+                codigo_pacote TEXT NOT NULL,
                 data TEXT NOT NULL,
                 hora TEXT NOT NULL,
                 status TEXT NOT NULL,
@@ -44,12 +63,101 @@ def initialize_database(conn, cursor):
         except:
             pass
 
+        # Coletas como entidade própria: fechar/reabrir muda apenas a linha da coleta.
+        # O status que vale para um pacote é o da sua coleta (packages.status é legado).
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS coletas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                transportadora TEXT NOT NULL,
+                data TEXT NOT NULL,
+                numero INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                opened_at TEXT NOT NULL,
+                closed_at TEXT,
+                package_count INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (transportadora, data, numero)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_coletas_estado
+            ON coletas (transportadora, data, status, numero)
+        ''')
+        # Coletas do dia de todas as transportadoras (painel ao vivo, linha de comando)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_coletas_data ON coletas (data)')
+
+        try:
+            cursor.execute('ALTER TABLE packages ADD COLUMN coleta_id INTEGER REFERENCES coletas (id)')
+        except sqlite3.OperationalError:
+            pass
+
+        migrate_database(conn, cursor)
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_packages_coleta ON packages (coleta_id)')
+
+        # Código de pacote não é único: a repetição é decidida pela política de duplicados
+        # (duplicates.py). Este índice atende buscas exatas, por prefixo e por janela de datas.
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_packages_codigo ON packages (codigo_pacote, data)')
+
+        # Índice para relatórios por período percorrerem o dia em ordem de operador e hora
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_packages_data_operador_hora
+            ON packages (data, bipped_by, hora, transportadora)
+        ''')
+
+        # Registro de todas as tentativas de bipagem; outcome é um código inteiro (ver scan_events.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_events (
+                id INTEGER PRIMARY KEY,
+                ts_us INTEGER NOT NULL,
+                outcome INTEGER NOT NULL,
+                codigo TEXT,
+                transportadora TEXT,
+                operator TEXT,
+                station TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_events_ts ON scan_events (ts_us)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_events_codigo ON scan_events (codigo)')
+
+        # Última execução de cada tarefa de manutenção, compartilhada entre as estações
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_runs (
+                job TEXT PRIMARY KEY,
+                started_at TEXT,
+                finished_at TEXT,
+                station TEXT,
+                result TEXT
+            )
+        ''')
+
+        # Eventos a entregar a outros sistemas (outbox.py), gravados na mesma transação da operação
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                station TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                station TEXT,
+                until REAL
+            )
+        ''')
+
+        initialize_search_index(conn, cursor)
+
         # Verifica se há usuários no banco
         cursor.execute("SELECT COUNT(*) FROM users")
         user_count = cursor.fetchone()[0]
         if user_count == 0:
             # Adiciona o usuário admin padrão
-            hashed_password = bcrypt.hashpw(DEFAULT_ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = bcrypt.hashpw(DEFAULT_ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS))
             cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
                            (DEFAULT_ADMIN_USERNAME, hashed_password.decode('utf-8'), DEFAULT_ROLE))
             conn.commit()
@@ -57,3 +165,139 @@ def initialize_database(conn, cursor):
     except Exception as e:
         logging.error(f"Erro ao inicializar o banco de dados: {e}")
         raise
+
+def migrate_database(conn, cursor):
+    """
+    Aplica as migrações de dados pendentes conforme PRAGMA user_version.
+    """
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    # Transação única para a migração; relê a versão caso outra estação tenha migrado antes
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        conn.rollback()
+        return
+
+    if version < 1:
+        migrate_coletas(cursor)
+    if version < 2:
+        drop_codigo_unique_constraint(cursor)
+
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    logging.info(f"Banco de dados migrado da versão {version} para {SCHEMA_VERSION}.")
+
+def migrate_coletas(cursor):
+    """
+    Cria as linhas da tabela coletas a partir dos pacotes existentes e liga cada pacote à sua coleta.
+    Uma coleta com algum pacote pendente é considerada aberta.
+    """
+    cursor.execute('''
+        INSERT OR IGNORE INTO coletas (transportadora, data, numero, status, opened_at, closed_at, package_count)
+        SELECT
+            transportadora,
+            data,
+            coleta_number,
+            CASE WHEN SUM(status = 'pending') > 0 THEN 'pending' ELSE 'collected' END,
+            data || ' ' || MIN(hora),
+            CASE WHEN SUM(status = 'pending') > 0 THEN NULL ELSE data || ' ' || MAX(hora) END,
+            COUNT(*)
+        FROM packages
+        WHERE coleta_id IS NULL
+        GROUP BY transportadora, data, coleta_number
+    ''')
+    cursor.execute('''
+        UPDATE packages SET coleta_id = (
+            SELECT c.id FROM coletas c
+            WHERE c.transportadora = packages.transportadora
+              AND c.data = packages.data
+              AND c.numero = packages.coleta_number
+        )
+        WHERE coleta_id IS NULL
+    ''')
+
+def drop_codigo_unique_constraint(cursor):
+    """
+    Recria a tabela packages sem a restrição UNIQUE em codigo_pacote, preservando os ids
+    (o índice de busca usa o id como rowid). Índices e triggers são recriados em seguida
+    por initialize_database.
+    """
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = 'packages' AND name LIKE 'sqlite_autoindex_packages_%'"
+    )
+    if not cursor.fetchone():
+        return
+
+    cursor.execute('''
+        CREATE TABLE packages_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transportadora TEXT NOT NULL,
+            codigo_pacote TEXT NOT NULL,
+            data TEXT NOT NULL,
+            hora TEXT NOT NULL,
+            status TEXT NOT NULL,
+            coleta_number INTEGER NOT NULL,
+            bipped_by TEXT,
+            coleta_id INTEGER REFERENCES coletas (id)
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO packages_new (id, transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id)
+        SELECT id, transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id
+        FROM packages
+    ''')
+    cursor.execute('DROP TABLE packages')
+    cursor.execute('ALTER TABLE packages_new RENAME TO packages')
+    logging.info("Restrição UNIQUE de codigo_pacote removida.")
+
+def initialize_search_index(conn, cursor):
+    """
+    Cria o índice de busca por trigramas (FTS5) sobre os códigos de pacote.
+    O índice é mantido por triggers e populado uma única vez para os dados existentes.
+    Se o SQLite não tiver suporte a FTS5, a busca usa o caminho lento (LIKE).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'packages_search'")
+    created = cursor.fetchone() is None
+    if created:
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE packages_search USING fts5(
+                    codigo_pacote,
+                    content='packages',
+                    content_rowid='id',
+                    tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Índice de busca FTS5 indisponível: {e}")
+            return
+
+    # Os triggers são recriados se a tabela packages for reconstruída por uma migração
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS packages_search_ai AFTER INSERT ON packages BEGIN
+            INSERT INTO packages_search(rowid, codigo_pacote) VALUES (new.id, new.codigo_pacote);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS packages_search_ad AFTER DELETE ON packages BEGIN
+            INSERT INTO packages_search(packages_search, rowid, codigo_pacote) VALUES ('delete', old.id, old.codigo_pacote);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS packages_search_au AFTER UPDATE OF codigo_pacote ON packages BEGIN
+            INSERT INTO packages_search(packages_search, rowid, codigo_pacote) VALUES ('delete', old.id, old.codigo_pacote);
+            INSERT INTO packages_search(rowid, codigo_pacote) VALUES (new.id, new.codigo_pacote);
+        END
+    """)
+    if created:
+        cursor.execute("INSERT INTO packages_search(packages_search) VALUES ('rebuild')")
+        conn.commit()
+        logging.info("Índice de busca de códigos criado.")
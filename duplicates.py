@@ -0,0 +1,76 @@
+# duplicates.py
+
+import datetime
+
+from config import DUPLICATE_POLICY, DUPLICATE_WINDOW_DAYS, DUPLICATE_BLOOM_ENABLED, STATUS_PENDING
+from queries import DUPLICATE_SAME_DAY, DUPLICATE_SAME_COLETA, DUPLICATE_SINCE, DUPLICATE_EVER
+
+POLICY_SAME_DAY = "same_day"
+POLICY_SAME_COLETA = "same_coleta"
+POLICY_LAST_N_DAYS = "last_n_days"
+POLICY_EVER = "ever"
+
+# Políticas cuja janela cobre o histórico e se beneficiam do filtro de códigos registrados
+HISTORY_POLICIES = (POLICY_LAST_N_DAYS, POLICY_EVER)
+
+
+class DuplicatePolicy:
+    """
+    Decide se um código bipado é duplicado conforme a janela configurada:
+    mesmo dia e transportadora, mesma coleta aberta, últimos N dias ou todo o histórico.
+    Todas as consultas usam o índice idx_packages_codigo (codigo_pacote, data).
+    Nas janelas de histórico, o filtro de códigos registrados (registered_codes.py) responde
+    "nunca visto" em memória, sem consultar o banco, no caso mais comum.
+    """
+    def __init__(self, codes_filter=None, mode=DUPLICATE_POLICY, window_days=DUPLICATE_WINDOW_DAYS,
+                 use_bloom=DUPLICATE_BLOOM_ENABLED):
+        if mode not in (POLICY_SAME_DAY, POLICY_SAME_COLETA, POLICY_LAST_N_DAYS, POLICY_EVER):
+            raise ValueError(f"Política de duplicados desconhecida: {mode}")
+        self.mode = mode
+        self.window_days = window_days
+        self.codes_filter = codes_filter if use_bloom else None
+
+    def remember(self, codigo):
+        """
+        Acrescenta ao filtro um código recém-gravado por esta estação.
+        """
+        if self.codes_filter is not None:
+            self.codes_filter.add(codigo)
+
+    def find_duplicate(self, cursor, transportadora, codigo, data=None):
+        """
+        Retorna (transportadora, data, hora, bipped_by) do registro anterior que torna o código
+        duplicado dentro da janela da política, ou None.
+        """
+        data = data or datetime.date.today().isoformat()
+
+        if self.mode == POLICY_SAME_DAY:
+            cursor.execute(DUPLICATE_SAME_DAY, (codigo, data, transportadora))
+            return cursor.fetchone()
+
+        if self.mode == POLICY_SAME_COLETA:
+            cursor.execute(DUPLICATE_SAME_COLETA, (codigo, data, transportadora, STATUS_PENDING))
+            return cursor.fetchone()
+
+        if self.codes_filter is not None and not self.codes_filter.might_contain(codigo):
+            return None
+
+        if self.mode == POLICY_LAST_N_DAYS:
+            start = (datetime.date.fromisoformat(data) - datetime.timedelta(days=self.window_days)).isoformat()
+            cursor.execute(DUPLICATE_SINCE, (codigo, start))
+            return cursor.fetchone()
+
+        cursor.execute(DUPLICATE_EVER, (codigo,))
+        return cursor.fetchone()
+
+    def describe(self, existing):
+        """
+        Mensagem para o operador sobre o registro anterior encontrado.
+        """
+        if self.mode == POLICY_SAME_DAY:
+            return "Este pacote já foi registrado hoje para esta transportadora."
+        if self.mode == POLICY_SAME_COLETA:
+            return "Este pacote já foi registrado na coleta aberta desta transportadora."
+        transportadora, data, hora, _ = existing
+        return f"Este pacote já foi registrado em {data} às {hora} ({transportadora})."
+
@@ -0,0 +1,47 @@
+# events.py
+
+import collections
+import threading
+import time
+
+from config import STATION_ID, logging
+
+# Tipos de evento publicados pelas operações de bipagem e coleta
+EVENT_SCAN = "scan"         # transportadora, codigo, operator, numero (None se ainda no diário local)
+EVENT_REMOVE = "remove"     # transportadora, codigo, numero
+EVENT_CLOSE = "close"       # transportadora, data, coletas [(numero, package_count)]
+EVENT_REOPEN = "reopen"     # transportadora, data, numero, package_count
+
+Event = collections.namedtuple("Event", "kind station ts data")
+
+
+class EventBus:
+    """
+    Barramento de eventos em processo. `publish` chama os assinantes na thread de quem publica,
+    então os assinantes devem apenas enfileirar o evento (ex.: em um queue.Queue) e retornar.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers = self.subscribers + [callback]
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [cb for cb in self.subscribers if cb is not callback]
+
+    def publish(self, kind, station=STATION_ID, ts=None, **data):
+        event = Event(kind, station, ts if ts is not None else time.time(), data)
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error("Erro em assinante do evento %s: %s", kind, e)
+        return event
+
+
+# Barramento do processo, usado pela tela de bipagem e pelo painel ao vivo
+bus = EventBus()
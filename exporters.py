@@ -0,0 +1,200 @@
+# exporters.py
+
+import csv
+import datetime
+import os
+
+from config import EXPORT_FETCH_SIZE, PARQUET_ROW_GROUP_SIZE, SNAPSHOT_DIR, logging
+from queries import SNAPSHOT_DATES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele, apenas a exportação CSV fica disponível
+    pa = pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+# Colunas exportadas: (nome no Parquet, cabeçalho do CSV, expressão SQL)
+EXPORT_COLUMNS = [
+    ("transportadora", "Transportadora", "p.transportadora"),
+    ("codigo_pacote", "Código do Pacote", "p.codigo_pacote"),
+    ("data", "Data", "p.data"),
+    ("hora", "Hora", "p.hora"),
+    ("status", "Status", "c.status"),
+    ("coleta_numero", "Número da Coleta", "c.numero"),
+    ("bipped_by", "Bipado Por", "p.bipped_by"),
+]
+
+# O CSV mantém o layout de sempre, sem a coluna do operador
+CSV_COLUMN_COUNT = 6
+
+# Coluna acrescentada ao final de cada linha na exportação de vários sites (shards.ShardSet)
+SITE_COLUMN = ("site", "Site")
+
+SNAPSHOT_FILE_NAME = "packages.parquet"
+
+
+def export_query(start_date, end_date, transportadora=None, status=None):
+    """
+    Monta a consulta de exportação. O status de cada pacote é o status da sua coleta.
+    Retorna (sql, parâmetros).
+    """
+    query = f"""
+        SELECT {", ".join(expr for _, _, expr in EXPORT_COLUMNS)}
+        FROM packages p
+        JOIN coletas c ON c.id = p.coleta_id
+        WHERE p.data BETWEEN ? AND ?
+    """
+    params = [start_date, end_date]
+    if transportadora is not None:
+        query += " AND p.transportadora = ?"
+        params.append(transportadora)
+    if status is not None:
+        query += " AND c.status = ?"
+        params.append(status)
+    return query, params
+
+
+def iter_batches(cursor, size=EXPORT_FETCH_SIZE):
+    """
+    Lê o resultado de uma consulta já executada em lotes, sem carregar tudo na memória.
+    """
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv_rows(batches, file, with_site=False):
+    """
+    Escreve os lotes de linhas em CSV, com os cabeçalhos em português, em um arquivo já aberto
+    (ex.: sys.stdout). Com `with_site`, as linhas trazem o site na última posição e o CSV ganha
+    a coluna Site. Retorna a quantidade de linhas.
+    """
+    total = 0
+    writer = csv.writer(file)
+    headers = [header for _, header, _ in EXPORT_COLUMNS[:CSV_COLUMN_COUNT]]
+    if with_site:
+        writer.writerow(headers + [SITE_COLUMN[1]])
+        for rows in batches:
+            writer.writerows(row[:CSV_COLUMN_COUNT] + row[-1:] for row in rows)
+            total += len(rows)
+        return total
+    writer.writerow(headers)
+    for rows in batches:
+        writer.writerows(row[:CSV_COLUMN_COUNT] for row in rows)
+        total += len(rows)
+    return total
+
+
+def write_csv(batches, file_path, with_site=False):
+    """
+    Grava os lotes de linhas em um arquivo CSV. Retorna a quantidade de linhas.
+    """
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        return write_csv_rows(batches, file, with_site)
+
+
+def parquet_schema(with_site=False):
+    """
+    Esquema tipado do Parquet: transportadora, status e operador codificados em dicionário,
+    data como date32 e hora como time32 (o Parquet grava a hora em milissegundos).
+    Com `with_site`, acrescenta o site, também em dicionário.
+    """
+    fields = [
+        ("transportadora", pa.dictionary(pa.int32(), pa.string())),
+        ("codigo_pacote", pa.string()),
+        ("data", pa.date32()),
+        ("hora", pa.time32("s")),
+        ("status", pa.dictionary(pa.int32(), pa.string())),
+        ("coleta_numero", pa.int32()),
+        ("bipped_by", pa.dictionary(pa.int32(), pa.string())),
+    ]
+    if with_site:
+        fields.append((SITE_COLUMN[0], pa.dictionary(pa.int32(), pa.string())))
+    return pa.schema(fields)
+
+
+def _seconds(hora):
+    return int(hora[0:2]) * 3600 + int(hora[3:5]) * 60 + int(hora[6:8])
+
+
+def rows_to_table(rows, schema):
+    """
+    Converte um lote de linhas da consulta de exportação em uma tabela Arrow.
+    """
+    columns = list(zip(*rows))
+    transportadora, codigo, data, hora, status, numero, bipped_by = columns[:7]
+    arrays = [
+        pa.array(transportadora, pa.string()).dictionary_encode(),
+        pa.array(codigo, pa.string()),
+        pa.array(data, pa.string()).cast(pa.date32()),
+        pa.array([_seconds(h) for h in hora], pa.int32()).cast(pa.time32("s")),
+        pa.array(status, pa.string()).dictionary_encode(),
+        pa.array(numero, pa.int32()),
+        pa.array(bipped_by, pa.string()).dictionary_encode(),
+    ]
+    if len(schema) > len(arrays):
+        arrays.append(pa.array(columns[-1], pa.string()).dictionary_encode())
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(batches, file_path, row_group_size=PARQUET_ROW_GROUP_SIZE, with_site=False):
+    """
+    Grava os lotes de linhas em Parquet, um grupo de linhas a cada `row_group_size` linhas,
+    sem montar a tabela inteira na memória. Retorna a quantidade de linhas.
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("A exportação em Parquet requer o pacote pyarrow.")
+
+    schema = parquet_schema(with_site)
+    total = 0
+    pending = []
+    pending_count = 0
+    with pq.ParquetWriter(file_path, schema, compression="zstd") as writer:
+        for rows in batches:
+            pending.extend(rows)
+            pending_count += len(rows)
+            if pending_count >= row_group_size:
+                writer.write_table(rows_to_table(pending, schema), row_group_size=row_group_size)
+                total += pending_count
+                pending, pending_count = [], 0
+        if pending:
+            writer.write_table(rows_to_table(pending, schema), row_group_size=row_group_size)
+            total += pending_count
+    return total
+
+
+def snapshot_partition_path(snapshot_dir, data):
+    return os.path.join(snapshot_dir, f"data={data}", SNAPSHOT_FILE_NAME)
+
+
+def write_snapshot(conn, snapshot_dir=SNAPSHOT_DIR, until=None, rewrite=False):
+    """
+    Snapshot incremental em Parquet particionado por data (data=AAAA-MM-DD/packages.parquet).
+    Grava apenas as datas anteriores a `until` (padrão: hoje, que ainda está em andamento)
+    cuja partição ainda não existe; `rewrite` regrava todas. Cada partição é gravada em um
+    arquivo temporário e renomeada, então uma execução interrompida não deixa partição parcial.
+    Retorna a lista de (data, quantidade de linhas) das partições gravadas.
+    """
+    until = until or datetime.date.today().isoformat()
+    cursor = conn.cursor()
+    cursor.execute(SNAPSHOT_DATES, (until,))
+    dates = [row[0] for row in cursor.fetchall()]
+
+    written = []
+    for data in dates:
+        path = snapshot_partition_path(snapshot_dir, data)
+        if not rewrite and os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        query, params = export_query(data, data)
+        cursor.execute(query, params)
+        tmp_path = path + ".tmp"
+        count = write_parquet(iter_batches(cursor), tmp_path)
+        os.replace(tmp_path, path)
+        logging.info("Snapshot Parquet: partição %s gravada com %s pacotes.", data, count)
+        written.append((data, count))
+    return written
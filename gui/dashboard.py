@@ -0,0 +1,177 @@
+# gui/dashboard.py
+
+import tkinter as tk
+from tkinter import ttk
+import datetime
+import queue
+import time
+
+from utils import center_window
+from config import DASHBOARD_REFRESH_MS, DASHBOARD_RESYNC_SECONDS, logging
+from events import bus
+from live_stats import DashboardModel, RemoteFeed
+
+class DashboardWindow:
+    """
+    Painel ao vivo para supervisores: pacotes por transportadora e coleta e bipagens por operador.
+    Os eventos do barramento (estação local e outras estações, via RemoteFeed) são enfileirados
+    e aplicados a cada DASHBOARD_REFRESH_MS, redesenhando apenas o que mudou.
+    """
+    def __init__(self, parent_app):
+        self.parent_app = parent_app
+        self.conn = parent_app.conn
+        self.cursor = self.conn.cursor()
+        self.events = queue.Queue()
+        self.model = DashboardModel()
+        self.carrier_widgets = {}
+        self.last_resync = 0.0
+
+        self.window = tk.Toplevel(self.parent_app.root)
+        self.window.title("Painel ao Vivo")
+        self.window.geometry("1100x700")
+        self.window.resizable(True, True)
+
+        main_frame = tk.Frame(self.window, bg="#f0f0f0")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        header_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        header_frame.pack(fill=tk.X)
+        tk.Label(
+            header_frame,
+            text="Painel ao Vivo",
+            font=("Helvetica", 24, "bold"),
+            bg="#f0f0f0"
+        ).pack(side=tk.LEFT)
+        self.rate_label = tk.Label(header_frame, text="", font=("Helvetica", 16), bg="#f0f0f0")
+        self.rate_label.pack(side=tk.RIGHT)
+
+        cards_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        cards_frame.pack(fill=tk.X, pady=20)
+        for column, transportadora in enumerate(self.parent_app.transportadoras):
+            color = self.parent_app.transportadora_colors.get(transportadora, "#ffffff")
+            card = tk.Frame(cards_frame, bg=color, bd=2, relief=tk.RIDGE, padx=20, pady=10)
+            card.grid(row=0, column=column, padx=10, sticky="nsew")
+            cards_frame.grid_columnconfigure(column, weight=1)
+            tk.Label(card, text=transportadora, font=("Helvetica", 18, "bold"), bg=color).pack()
+            pending_label = tk.Label(card, text="0", font=("Helvetica", 60, "bold"), bg=color)
+            pending_label.pack()
+            coleta_label = tk.Label(card, text="", font=("Helvetica", 14), bg=color)
+            coleta_label.pack()
+            collected_label = tk.Label(card, text="", font=("Helvetica", 14), bg=color)
+            collected_label.pack()
+            self.carrier_widgets[transportadora] = (pending_label, coleta_label, collected_label)
+
+        columns = ("operador", "bipagens", "ultima", "taxa")
+        self.operator_treeview = ttk.Treeview(main_frame, columns=columns, show='headings')
+        self.operator_treeview.heading('operador', text='Operador')
+        self.operator_treeview.heading('bipagens', text='Bipagens Hoje')
+        self.operator_treeview.heading('ultima', text='Última Bipagem')
+        self.operator_treeview.heading('taxa', text='Bipagens/min')
+        for column in columns:
+            self.operator_treeview.column(column, width=150, anchor='center')
+        self.operator_treeview.pack(fill=tk.BOTH, expand=True)
+
+        # O barramento pode publicar de outras threads: os eventos só são enfileirados aqui
+        self.subscriber = bus.subscribe(self.events.put)
+        self.resync()
+        self.feed = RemoteFeed(self.parent_app.db_path, bus).start()
+
+        self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+        center_window(self.window)
+        self.after_id = self.window.after(DASHBOARD_REFRESH_MS, self.refresh)
+
+    def resync(self):
+        """
+        Recarrega os contadores do banco (na abertura, a cada DASHBOARD_RESYNC_SECONDS e na virada do dia),
+        corrigindo o que os eventos não cobrem, como remoções feitas em outras estações.
+        """
+        # Eventos já enfileirados estão refletidos no banco (ou no diário local) lido a seguir
+        while True:
+            try:
+                self.events.get_nowait()
+            except queue.Empty:
+                break
+
+        journal = getattr(self.parent_app, 'journal', None)
+        model = DashboardModel()
+        try:
+            model.load(self.cursor, journal.pending_records() if journal is not None else ())
+        except Exception as e:
+            logging.error("Painel ao vivo: erro ao carregar os contadores: %s", e)
+            return
+        self.model = model
+        self.last_resync = time.monotonic()
+        self.render_all()
+
+    def refresh(self):
+        """
+        Aplica os eventos acumulados desde o último redesenho.
+        """
+        try:
+            if (time.monotonic() - self.last_resync >= DASHBOARD_RESYNC_SECONDS
+                    or self.model.data != datetime.date.today().isoformat()):
+                self.resync()
+
+            changed = set()
+            while True:
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                changed |= self.model.apply(event)
+
+            for kind, key in changed:
+                if kind == "carrier":
+                    self.render_carrier(key)
+                else:
+                    self.render_operator(key)
+            self.render_rates()
+        except Exception as e:
+            logging.error("Painel ao vivo: erro ao atualizar: %s", e)
+        self.after_id = self.window.after(DASHBOARD_REFRESH_MS, self.refresh)
+
+    def render_all(self):
+        for transportadora in self.carrier_widgets:
+            self.render_carrier(transportadora)
+        for operator in self.model.operators:
+            self.render_operator(operator)
+        self.render_rates()
+
+    def render_carrier(self, transportadora):
+        widgets = self.carrier_widgets.get(transportadora)
+        if widgets is None:
+            return
+        pending_label, coleta_label, collected_label = widgets
+        pending, collected, numero = self.model.carrier_summary(transportadora)
+        pending_label.config(text=str(pending))
+        coleta_label.config(text=f"Coleta {numero} aberta" if numero else "Nenhuma coleta aberta")
+        collected_label.config(text=f"Coletados hoje: {collected}")
+
+    def render_operator(self, operator):
+        live = self.model.operators.get(operator)
+        if live is None:
+            return
+        iid = f"op:{operator}"
+        last = datetime.datetime.fromtimestamp(live.last_ts).strftime("%H:%M:%S") if live.last_ts else ""
+        values = (operator or "(desconhecido)", live.scans, last, "")
+        if self.operator_treeview.exists(iid):
+            self.operator_treeview.item(iid, values=values)
+        else:
+            self.operator_treeview.insert('', tk.END, iid=iid, values=values)
+
+    def render_rates(self):
+        """
+        As taxas mudam com o tempo mesmo sem eventos, então são recalculadas a cada redesenho.
+        """
+        now = time.time()
+        for operator in self.model.operators:
+            iid = f"op:{operator}"
+            if self.operator_treeview.exists(iid):
+                self.operator_treeview.set(iid, 'taxa', f"{self.model.scans_per_minute(operator, now):.1f}")
+        self.rate_label.config(text=f"{self.model.scans_per_minute(now=now):.1f} bipagens/min")
+
+    def on_closing(self):
+        self.window.after_cancel(self.after_id)
+        bus.unsubscribe(self.subscriber)
+        self.feed.close()
+        self.window.destroy()
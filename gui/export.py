@@ -4,14 +4,18 @@ import tkinter as tk
 from tkinter import messagebox, filedialog, Toplevel
 from tkinter import ttk
 from tkcalendar import DateEntry
-import csv
 import datetime
+import itertools
 import logging
 
 from utils import center_window
+from exporters import PARQUET_AVAILABLE, export_query, iter_batches, write_csv, write_parquet
 
 from config import STATUS_PENDING, STATUS_COLLECTED, TRANSPORTADORA_PADRAO
 
+FORMAT_CSV = "CSV"
+FORMAT_PARQUET = "Parquet"
+
 class ExportWindow:
     """
     Classe para a janela de exportação de coleta.
@@ -24,7 +28,7 @@ class ExportWindow:
         export_window.transient(self.app.root)
         export_window.grab_set()
         export_window.title("Exportar Coleta")
-        export_window.geometry("600x500")  # Aumentar o tamanho da janela para acomodar melhor os widgets
+        export_window.geometry("600x620")  # Aumentar o tamanho da janela para acomodar melhor os widgets
 
         # Frame principal
         main_frame = tk.Frame(export_window, bg="#f0f0f0", padx=20, pady=20)
@@ -85,6 +89,32 @@ class ExportWindow:
         )
         end_date_entry.pack(pady=5, fill=tk.X)
 
+        # Seleção do formato (Parquet apenas se o pyarrow estiver instalado)
+        tk.Label(main_frame, text="Formato:", font=("Helvetica", 14), bg="#f0f0f0").pack(pady=5)
+        format_var = tk.StringVar()
+        format_var.set(FORMAT_CSV)
+        format_options = [FORMAT_CSV] + ([FORMAT_PARQUET] if PARQUET_AVAILABLE else [])
+        format_menu = ttk.Combobox(
+            main_frame,
+            textvariable=format_var,
+            values=format_options,
+            font=("Helvetica", 12),
+            state="readonly"
+        )
+        format_menu.pack(pady=5, fill=tk.X)
+
+        # Exportação de todos os sites (apenas com outros sites configurados), com a coluna Site
+        all_sites_var = tk.BooleanVar(value=False)
+        shards = getattr(self.app, "shards", None)
+        if shards is not None and len(shards) > 1:
+            tk.Checkbutton(
+                main_frame,
+                text=f"Incluir todos os sites ({', '.join(shards.sites)})",
+                variable=all_sites_var,
+                font=("Helvetica", 12),
+                bg="#f0f0f0"
+            ).pack(pady=5)
+
         # Botão para confirmar a exportação
         export_button = tk.Button(
             main_frame,
@@ -93,7 +123,9 @@ class ExportWindow:
                 transportadora_var.get(),
                 status_var.get(),
                 start_date_entry.get_date().isoformat(),
-                end_date_entry.get_date().isoformat()
+                end_date_entry.get_date().isoformat(),
+                format_var.get(),
+                all_sites_var.get()
             ),
             font=("Helvetica", 14, "bold"),
             bg="#4CAF50",
@@ -109,9 +141,12 @@ class ExportWindow:
         # Centralizar a janela de exportação
         center_window(export_window)
 
-    def confirm_export(self, selected_transportadora, selected_status, start_date, end_date):
+    def confirm_export(self, selected_transportadora, selected_status, start_date, end_date, export_format=FORMAT_CSV,
+                       all_sites=False):
         """
         Confirma e realiza a exportação dos dados com base nos parâmetros selecionados.
+        As linhas são lidas do banco e gravadas no arquivo em lotes; com `all_sites`, dos bancos
+        de todos os sites ao mesmo tempo.
         """
         # Verificar se a data inicial não é maior que a data final
         if start_date > end_date:
@@ -119,51 +154,61 @@ class ExportWindow:
             return
 
         # Construir a consulta SQL com base nos parâmetros
-        query = "SELECT transportadora, codigo_pacote, data, hora, status, coleta_number FROM packages WHERE data BETWEEN ? AND ?"
-        params = [start_date, end_date]
-
-        if selected_transportadora != "Todas":
-            query += " AND transportadora = ?"
-            params.append(selected_transportadora)
-
-        if selected_status != "Todos":
-            query += " AND status = ?"  # Comparação exata
-            params.append(selected_status)
+        query, params = export_query(
+            start_date,
+            end_date,
+            transportadora=selected_transportadora if selected_transportadora != "Todas" else None,
+            status=selected_status if selected_status != "Todos" else None
+        )
 
         # Log para depuração
         logging.debug(f"Export Query: {query}")
         logging.debug(f"Export Params: {params}")
 
+        batches = None
         try:
-            self.app.cursor.execute(query, params)
-            packages = self.app.cursor.fetchall()
-
-            if not packages:
+            if all_sites:
+                batches = self.app.shards.iter_batches(query, params)
+            else:
+                # Cursor próprio: o da janela principal é usado pelas atualizações periódicas da tela
+                cursor = self.app.conn.cursor()
+                cursor.execute(query, params)
+                batches = iter_batches(cursor)
+            first_batch = next(batches, None)
+
+            if not first_batch:
                 messagebox.showwarning("Aviso", "Nenhum pacote registrado para exportar neste período.")
                 return
 
-            # Melhorar o nome do arquivo CSV com timestamp e transportadora
+            if export_format == FORMAT_PARQUET:
+                extension, file_types, writer = ".parquet", [("Parquet files", "*.parquet")], write_parquet
+            else:
+                extension, file_types, writer = ".csv", [("CSV files", "*.csv")], write_csv
+
+            # Melhorar o nome do arquivo com timestamp e transportadora
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             transportadora_suffix = selected_transportadora.replace(" ", "_") if selected_transportadora != "Todas" else "Todas_Transportadoras"
-            file_name = f"coleta_{transportadora_suffix}_{start_date}_a_{end_date}_{timestamp}.csv"
+            file_name = f"coleta_{transportadora_suffix}_{start_date}_a_{end_date}_{timestamp}{extension}"
 
-            # Solicitar o local para salvar o arquivo CSV
+            # Solicitar o local para salvar o arquivo
             file_path = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv")],
+                defaultextension=extension,
+                filetypes=file_types,
                 initialfile=file_name
             )
             if file_path:
-                with open(file_path, mode='w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    # Melhorar os cabeçalhos do CSV
-                    writer.writerow(["Transportadora", "Código do Pacote", "Data", "Hora", "Status", "Número da Coleta"])
-                    for package in packages:
-                        writer.writerow(package)
-                messagebox.showinfo("Sucesso", f"Lista exportada com sucesso!\nLocal: {file_path}")
+                writer(itertools.chain([first_batch], batches), file_path, with_site=all_sites)
+                message = f"Lista exportada com sucesso!\nLocal: {file_path}"
+                if all_sites and self.app.shards.failed:
+                    message += "\n\nSites indisponíveis, fora da exportação: " + ", ".join(self.app.shards.failed)
+                messagebox.showinfo("Sucesso", message)
                 self.parent_app.update_treeview()  # Atualizar a view se necessário
                 self.parent_app.package_entry.focus_set()
                 self.parent_app.package_entry.selection_range(0, tk.END)
         except Exception as e:
             logging.error("Erro ao exportar a lista: %s", e)
             messagebox.showerror("Erro", f"Erro ao exportar a lista: {str(e)}")
+        finally:
+            # Encerra a leitura dos outros sites se a exportação foi cancelada no meio
+            if batches is not None:
+                batches.close()
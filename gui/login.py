@@ -2,17 +2,23 @@
 
 import tkinter as tk
 from tkinter import messagebox
-import bcrypt
-from database import get_database_connection
+import logging
+import queue
+import threading
+from auth import authenticate
 from utils import play_sound, center_window
-from config import ALERT_SOUND_PATH
+from config import ALERT_SOUND_PATH, DB_PATH
+
+# Intervalo de verificação do resultado da autenticação em segundo plano
+AUTH_POLL_MS = 20
 
 class LoginWindow:
     """
     Classe responsável pela janela de login da aplicação.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, db_path=DB_PATH):
         self.parent = parent
+        self.db_path = db_path
         self.top = tk.Toplevel(parent)
         self.top.title("Login")
         self.top.geometry("400x300")
@@ -44,17 +50,25 @@ class LoginWindow:
         self.password_entry.grid(row=1, column=1, pady=10)
 
         # Botão de login
-        tk.Button(self.top, text="Login", command=self.authenticate, font=button_font, width=10).pack(pady=20)
+        self.login_button = tk.Button(self.top, text="Login", command=self.authenticate, font=button_font, width=10)
+        self.login_button.pack(pady=(20, 5))
+        self.status_label = tk.Label(self.top, text="", font=("Helvetica", 11), fg="gray")
+        self.status_label.pack()
+        self.password_entry.bind("<Return>", self.authenticate)
 
         self.user = None
+        self.results = queue.Queue()
 
         # Centralizar a janela de login
         center_window(self.top)
 
-    def authenticate(self):
+    def authenticate(self, event=None):
         """
-        Autentica o usuário com base no banco de dados.
+        Inicia a autenticação em segundo plano; a janela continua respondendo durante o bcrypt.
         """
+        if str(self.login_button['state']) == tk.DISABLED:
+            return
+
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
 
@@ -62,20 +76,44 @@ class LoginWindow:
             messagebox.showwarning("Aviso", "Por favor, preencha todos os campos.")
             return
 
+        self.login_button.config(state=tk.DISABLED)
+        self.status_label.config(text="Verificando...")
+        threading.Thread(
+            target=self._authenticate_worker, args=(username, password), name="login", daemon=True
+        ).start()
+        self.top.after(AUTH_POLL_MS, self._poll_result)
+
+    def _authenticate_worker(self, username, password):
         try:
-            conn, cursor = get_database_connection()
-            cursor.execute("SELECT id, username, password, role FROM users WHERE username=?", (username,))
-            user = cursor.fetchone()
-
-            if user and bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
-                self.user = {'id': user[0], 'username': user[1], 'role': user[3]}
-                self.top.destroy()
-                self.parent.deiconify()  # Mostrar a janela principal
-            else:
-                # Tocar um som de erro de forma assíncrona
-                play_sound('error')
-                # Mostrar mensagem de erro mais chamativa
-                messagebox.showerror("Erro", "Usuário ou senha inválidos")
+            self.results.put((authenticate(username, password, self.db_path), None))
         except Exception as e:
-            logging.error("Erro durante autenticação: %s", e)
+            self.results.put((None, e))
+
+    def _poll_result(self):
+        """
+        Aplica na thread da interface o resultado da autenticação.
+        """
+        try:
+            user, error = self.results.get_nowait()
+        except queue.Empty:
+            self.top.after(AUTH_POLL_MS, self._poll_result)
+            return
+
+        if user:
+            self.user = user
+            self.top.destroy()
+            self.parent.deiconify()  # Mostrar a janela principal
+            return
+
+        self.login_button.config(state=tk.NORMAL)
+        self.status_label.config(text="")
+        if error is not None:
+            logging.error("Erro durante autenticação: %s", error)
             messagebox.showerror("Erro", "Ocorreu um erro durante a autenticação. Verifique os logs para mais detalhes.")
+        else:
+            # Tocar um som de erro de forma assíncrona
+            play_sound('error')
+            # Mostrar mensagem de erro mais chamativa
+            messagebox.showerror("Erro", "Usuário ou senha inválidos")
+            self.password_entry.delete(0, tk.END)
+            self.password_entry.focus_set()
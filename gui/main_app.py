@@ -1,27 +1,59 @@
 import tkinter as tk
-from tkinter import messagebox, Toplevel
+from tkinter import messagebox, simpledialog, Toplevel
 from tkinter import ttk
 import datetime
 import logging
-
-from config import TRANSPORTADORA_PADRAO, STATUS_PENDING, STATUS_COLLECTED, PACKAGE_CODE_REGEX
-from utils import detect_transportadora, play_sound, center_window
+import sqlite3
+import time
+
+from config import (
+    TRANSPORTADORA_PADRAO, STATUS_PENDING, PACKAGE_CODE_REGEX, DB_PATH, TEST_DB_PATH,
+    JOURNAL_ENABLED, JOURNAL_STATUS_REFRESH_MS, MANIFEST_DIR, TEST_MANIFEST_DIR, PROFILE_DEFAULT_SECONDS,
+    PROFILE_MAX_SECONDS, MAINTENANCE_ENABLED, ROW_FILTER_BUDGET_MS, OUTBOX_ENABLED
+)
+from utils import play_sound, center_window
+from package_codes import detect_transportadora
 from database import get_database_connection
+from coletas import close_open_coletas, reopen_last_coleta
+from repository import PackageRepository, PackageRecord
+from row_cache import PendingRowsCache
+from row_index import CodeIndex
+from journal import ScanJournal
+from duplicates import DuplicatePolicy
+from registered_codes import RegisteredCodesFilter, default_filter_path
+from manifest import ManifestBuilder, open_manifest
+from sandbox import TrainingSandbox
+from profiler import PerformanceCapture
+from maintenance import MaintenanceScheduler
+from shards import ShardSet
+from outbox import OutboxDispatcher
+from scan_events import (
+    ScanEventLog, OUTCOME_OK, OUTCOME_DUPLICATE, OUTCOME_INVALID, OUTCOME_NOTA_FISCAL,
+    OUTCOME_WRONG_CARRIER, OUTCOME_UNRECOGNIZED, OUTCOME_NO_CARRIER, OUTCOME_ERROR
+)
 
 # Importar janelas secundárias
 from gui.view_total_packages import ViewTotalPackagesWindow
 from gui.user_management import UserManagementWindow
 from gui.export import ExportWindow
 from gui.verify_package import VerifyPackageWindow
+from gui.operator_report import OperatorReportWindow
+from gui.login import LoginWindow
+from gui.dashboard import DashboardWindow
+from gui.sandbox_setup import SandboxSetupWindow
+from gui.scan_remove import ScanRemoveWindow
+from events import bus, EVENT_SCAN, EVENT_REMOVE, EVENT_CLOSE, EVENT_REOPEN
 
 class PackageCounterApp:
     """
     Classe principal da aplicação de contagem de pacotes.
     """
-    def __init__(self, root, current_user, conn=None, title="Contador de Pacotes - Ponto 3D", override_role=None, db_type='main'):
+    def __init__(self, root, current_user, conn=None, title="Contador de Pacotes - Ponto 3D", override_role=None, db_type='main',
+                 sandbox=None):
         self.root = root
         self.current_user = current_user
         self.db_type = db_type  # 'main' ou 'test'
+        self.sandbox = sandbox  # Banco de teste em memória (sandbox.py), apenas no modo de teste
 
         if override_role is not None:
             self.current_user['role'] = override_role
@@ -30,6 +62,51 @@ class PackageCounterApp:
         self.cursor = self.conn.cursor()
         self.root.title(title)
 
+        if self.sandbox is not None:
+            self.db_path = self.sandbox.uri
+        else:
+            self.db_path = TEST_DB_PATH if self.db_type == 'test' else DB_PATH
+        self.manifest_dir = TEST_MANIFEST_DIR if self.db_type == 'test' else MANIFEST_DIR
+
+        self.packages = PackageRepository(self.conn)
+
+        # Linhas do dia por transportadora: trocar de transportadora não reconsulta o banco
+        self.row_cache = PendingRowsCache(self.packages)
+        # Item da lista da tela principal -> PackageRecord exibido
+        self.treeview_records = {}
+        # Itens da lista na ordem de exibição e índice dos seus códigos, para o filtro da lista
+        self.treeview_items = []
+        self.row_index = CodeIndex()
+        # Itens da lista com bipagens do diário local ainda não replicadas ("pendente")
+        self.journal_items = []
+
+        # Registro de todas as tentativas de bipagem, gravado em segundo plano
+        self.scan_log = ScanEventLog(self.db_path)
+
+        # Filtro em memória com os códigos já registrados: responde "nunca registrado" sem
+        # consultar o banco na verificação de pedidos e na checagem de duplicados
+        self.registered_codes = self.create_registered_codes()
+
+        # Manutenção do banco principal (vacuum, estatísticas, verificação) nos períodos sem bipagens
+        self.maintenance = None
+        if MAINTENANCE_ENABLED and self.db_type == 'main':
+            self.maintenance = MaintenanceScheduler(self.db_path).start()
+
+        # Entrega dos eventos da tabela outbox ao ERP e aos portais (apenas no banco principal)
+        self.outbox = None
+        if OUTBOX_ENABLED and self.db_type == 'main':
+            self.outbox = OutboxDispatcher(self.db_path).start()
+
+        # Bancos dos outros sites (config.SITES_FILE), para as consultas e exportações de todos os sites
+        self.shards = ShardSet() if self.db_type == 'main' else None
+
+        # Política de duplicados e diário local de bipagens (apenas no banco principal),
+        # criados junto com a interface de bipagem
+        self.duplicate_policy = None
+        self.journal = None
+        # Posição do diário já replicada na última atualização do aviso de sincronização
+        self.journal_synced_seq = 0
+
         self.configure_main_window()
 
         self.transportadoras = ["SHEIN", "Shopee", "Mercado Livre"]
@@ -53,6 +130,13 @@ class PackageCounterApp:
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def create_registered_codes(self):
+        """
+        Cria e inicia o filtro de códigos registrados. Só o do banco principal é salvo em disco.
+        """
+        persist_path = default_filter_path(self.db_path) if self.db_type == 'main' else None
+        return RegisteredCodesFilter(self.db_path, persist_path=persist_path).start()
+
     def configure_main_window(self):
         """
         Configurações iniciais da janela principal.
@@ -120,6 +204,33 @@ class PackageCounterApp:
         )
         test_scanning_button.pack(pady=10)
 
+        operator_report_button = tk.Button(
+            main_frame,
+            text="Produtividade dos Operadores",
+            command=self.open_operator_report,
+            font=button_font,
+            width=25
+        )
+        operator_report_button.pack(pady=10)
+
+        dashboard_button = tk.Button(
+            main_frame,
+            text="Painel ao Vivo",
+            command=self.open_dashboard,
+            font=button_font,
+            width=25
+        )
+        dashboard_button.pack(pady=10)
+
+        capture_button = tk.Button(
+            main_frame,
+            text="Captura de Desempenho",
+            command=self.start_performance_capture,
+            font=button_font,
+            width=25
+        )
+        capture_button.pack(pady=10)
+
     def create_user_interface(self):
         """
         Cria a interface de usuário para operações normais (não-admin).
@@ -127,8 +238,102 @@ class PackageCounterApp:
         for widget in self.root.winfo_children():
             widget.destroy()
 
+        if self.duplicate_policy is None:
+            self.duplicate_policy = DuplicatePolicy(self.registered_codes)
+        if JOURNAL_ENABLED and self.db_type == 'main' and self.journal is None:
+            self.start_journal()
+
         self.create_widgets()
         self.update_treeview()
+        if self.journal is not None:
+            self.refresh_sync_status()
+
+    def start_journal(self):
+        """
+        Inicia o diário local de bipagens e carrega os códigos do dia para a checagem de duplicados offline.
+        """
+        try:
+            self.journal = ScanJournal(DB_PATH, policy=self.duplicate_policy)
+        except Exception as e:
+            logging.error("Erro ao abrir o diário local de bipagens: %s", e)
+            self.journal = None
+            return
+        self.journal_synced_seq = self.journal.synced_seq
+
+        try:
+            self.journal.seed_seen(self.cursor, datetime.date.today().isoformat())
+        except Exception as e:
+            logging.error("Erro ao carregar os códigos do dia no diário local: %s", e)
+
+    def refresh_sync_status(self):
+        """
+        Atualiza o aviso de sincronização com o banco central e mostra conflitos de replicação.
+        Quando bipagens chegam ao banco central, as linhas "pendente" delas recebem o id (e podem
+        ser removidas) sem recriar a lista; apenas um conflito recarrega a lista inteira.
+        """
+        if not self.sync_status_label.winfo_exists():
+            return
+
+        pending = len(self.journal.pending_records())
+        synced_seq = self.journal.synced_seq
+        replicated = synced_seq != self.journal_synced_seq
+        self.journal_synced_seq = synced_seq
+        if not self.journal.online:
+            self.sync_status_label.config(
+                text=f"SEM CONEXÃO COM O BANCO\n{pending} bipagem(ns) salvas localmente",
+                fg="#f44336"
+            )
+        elif pending:
+            self.sync_status_label.config(text=f"Sincronizando {pending} bipagem(ns)...", fg="#FF9800")
+        else:
+            self.sync_status_label.config(text="", fg="#333333")
+
+        conflicts = self.journal.take_conflicts()
+        if conflicts:
+            play_sound('alert')
+            messagebox.showwarning(
+                "Conflito de Sincronização",
+                "Estes pacotes já estavam registrados no banco central:\n\n" + "\n".join(conflicts[:10])
+            )
+            self.update_treeview()
+        elif replicated and self.journal_items:
+            self.apply_replicated_rows()
+
+        self.root.after(JOURNAL_STATUS_REFRESH_MS, self.refresh_sync_status)
+
+    def apply_replicated_rows(self):
+        """
+        Troca, no lugar, as linhas "pendente" já replicadas pelo registro gravado no banco central.
+        """
+        pending = {
+            (record["codigo"], record["data"], record["hora"], record["bipped_by"])
+            for record in self.journal.pending_records()
+        }
+        remaining = []
+        for item in self.journal_items:
+            pacote = self.treeview_records.get(item)
+            if pacote is None:
+                continue
+            if (pacote.codigo, pacote.data, pacote.hora, pacote.bipped_by) in pending:
+                remaining.append(item)
+                continue
+            try:
+                record = self.packages.find_replicated(
+                    pacote.codigo, pacote.data, pacote.transportadora, pacote.hora, pacote.bipped_by
+                )
+            except sqlite3.Error as e:
+                logging.warning("Erro ao atualizar bipagem replicada na lista: %s", e)
+                record = None
+            if record is None:
+                remaining.append(item)
+                continue
+            self.treeview_records[item] = record
+            self.row_cache.add(record)
+            self.package_treeview.item(
+                item, values=(record.codigo, record.data, record.hora, record.coleta_numero, record.id),
+                tags=(record.transportadora,)
+            )
+        self.journal_items = remaining
 
     def create_widgets(self):
         """
@@ -204,6 +409,35 @@ class PackageCounterApp:
         )
         help_package.grid(row=1, column=2, padx=5)
 
+        # Filtro da lista pelo início ou final do código (ex.: para achar um pacote a remover)
+        filter_label = tk.Label(
+            top_frame,
+            text="Filtrar lista:",
+            font=("Helvetica", 12),
+            bg="#f0f0f0"
+        )
+        filter_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        self.row_filter_var = tk.StringVar()
+        self.row_filter_entry = tk.Entry(
+            top_frame,
+            textvariable=self.row_filter_var,
+            width=40,
+            font=("Helvetica", 12)
+        )
+        self.row_filter_entry.grid(row=2, column=1, padx=10, pady=(0, 10))
+        self.row_filter_entry.bind('<Escape>', lambda e: self.row_filter_var.set(""))
+        self.row_filter_entry.bind('<Return>', self.select_first_filtered_row)
+        self.row_filter_var.trace('w', self.apply_row_filter)
+
+        self.row_filter_count_label = tk.Label(
+            top_frame,
+            text="",
+            font=("Helvetica", 12),
+            bg="#f0f0f0"
+        )
+        self.row_filter_count_label.grid(row=2, column=2, padx=5, pady=(0, 10), sticky="w")
+
         # Frame do Treeview no meio
         treeview_frame = tk.Frame(main_frame, bg="#f0f0f0")
         treeview_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -276,6 +510,17 @@ class PackageCounterApp:
         )
         self.remove_button.grid(row=1, column=0, padx=10, pady=10)
 
+        self.scan_remove_button = tk.Button(
+            button_frame,
+            text="Remover por Bipagem",
+            command=self.open_scan_remove,
+            font=("Helvetica", 12),
+            bg="#FF9800",
+            fg="white",
+            width=20
+        )
+        self.scan_remove_button.grid(row=2, column=0, padx=10, pady=10)
+
         self.reopen_collection_button = tk.Button(
             button_frame,
             text="Reabrir Coleta",
@@ -306,10 +551,33 @@ class PackageCounterApp:
         )
         help_verify_user.grid(row=1, column=3, padx=5)
 
+        if self.db_type == 'main':
+            self.lock_button = tk.Button(
+                button_frame,
+                text="Bloquear",
+                command=self.lock_screen,
+                font=("Helvetica", 12),
+                bg="#607D8B",
+                fg="white",
+                width=10
+            )
+            self.lock_button.grid(row=0, column=3, padx=5, pady=10)
+        elif self.sandbox is not None:
+            self.reset_sandbox_button = tk.Button(
+                button_frame,
+                text="Reiniciar Teste",
+                command=self.reset_sandbox,
+                font=("Helvetica", 12),
+                bg="#607D8B",
+                fg="white",
+                width=12
+            )
+            self.reset_sandbox_button.grid(row=0, column=3, padx=5, pady=10)
+
         # NOVO: frame à direita (coluna 4) para a frase e total
         right_info_frame = tk.Frame(button_frame, bg="#f0f0f0")
-        # rowspan=2 faz ocupar as duas linhas de botões
-        right_info_frame.grid(row=0, column=4, rowspan=2, sticky="nsew", padx=(40, 0))
+        # rowspan=3 faz ocupar as três linhas de botões
+        right_info_frame.grid(row=0, column=4, rowspan=3, sticky="nsew", padx=(40, 0))
 
         self.total_text_label = tk.Label(
             right_info_frame,
@@ -336,6 +604,14 @@ class PackageCounterApp:
         )
         self.transportadora_label_big.pack(anchor="center", pady=(10, 0))
 
+        self.sync_status_label = tk.Label(
+            right_info_frame,
+            text="",
+            font=("Helvetica", 12, "bold"),
+            bg="#f0f0f0"
+        )
+        self.sync_status_label.pack(anchor="center", pady=(10, 0))
+
     def show_verify_help(self):
         """
         Exibe uma mensagem de ajuda sobre a verificação de pedidos baseada no tipo de banco de dados.
@@ -365,6 +641,9 @@ class PackageCounterApp:
         """
         Adiciona um novo pacote ao banco de dados após verificar duplicatas e validar a transportadora.
         """
+        if self.maintenance is not None:
+            self.maintenance.notify_activity()
+
         transportadora = self.selected_transportadora.get()
         package_code = self.package_entry.get().strip()
 
@@ -374,13 +653,17 @@ class PackageCounterApp:
             self.package_entry.focus_set()
             return
 
+        operator = self.current_user['username']
+
         if transportadora == TRANSPORTADORA_PADRAO:
+            self.scan_log.record(OUTCOME_NO_CARRIER, package_code, None, operator)
             messagebox.showerror("Erro", "Selecione uma transportadora antes de bipar o pacote.")
             self.package_entry.delete(0, tk.END)
             self.package_entry.focus_set()
             return
 
         if not PACKAGE_CODE_REGEX.match(package_code):
+            self.scan_log.record(OUTCOME_INVALID, package_code, transportadora, operator)
             play_sound('error')
             messagebox.showerror(
                 "Erro",
@@ -393,6 +676,7 @@ class PackageCounterApp:
         detected_transportadora = detect_transportadora(package_code)
 
         if detected_transportadora == "Nota Fiscal":
+            self.scan_log.record(OUTCOME_NOTA_FISCAL, package_code, transportadora, operator)
             play_sound('error')
             messagebox.showerror(
                 "Erro",
@@ -402,6 +686,7 @@ class PackageCounterApp:
             self.package_entry.focus_set()
             return
         elif detected_transportadora and detected_transportadora != transportadora:
+            self.scan_log.record(OUTCOME_WRONG_CARRIER, package_code, transportadora, operator)
             play_sound('error')
             messagebox.showerror(
                 "Erro",
@@ -411,6 +696,7 @@ class PackageCounterApp:
             self.package_entry.focus_set()
             return
         elif detected_transportadora is None:
+            self.scan_log.record(OUTCOME_UNRECOGNIZED, package_code, transportadora, operator)
             play_sound('error')
             messagebox.showerror(
                 "Erro",
@@ -421,20 +707,27 @@ class PackageCounterApp:
             return
 
         try:
-            self.cursor.execute(
-                "SELECT * FROM packages WHERE codigo_pacote = ? AND data = ? AND transportadora = ?",
-                (package_code, datetime.date.today().isoformat(), transportadora)
-            )
-            if self.cursor.fetchone():
+            existing = self.find_duplicate(transportadora, package_code)
+            if existing:
+                self.scan_log.record(OUTCOME_DUPLICATE, package_code, transportadora, operator)
                 play_sound('alert')
-                messagebox.showerror("Duplicado", "Este pacote já foi registrado hoje para esta transportadora.")
+                messagebox.showerror("Duplicado", self.duplicate_policy.describe(existing))
+                self.package_entry.delete(0, tk.END)
+                self.package_entry.focus_set()
+                return
+
+            if not self.save_package(transportadora, package_code):
+                self.scan_log.record(OUTCOME_ERROR, package_code, transportadora, operator)
                 self.package_entry.delete(0, tk.END)
                 self.package_entry.focus_set()
                 return
 
-            self.save_package(transportadora, package_code)
+            self.scan_log.record(OUTCOME_OK, package_code, transportadora, operator)
             play_sound('success')
 
+            # A nova bipagem fica visível e selecionada: o filtro da lista é limpo
+            if self.row_filter_var.get():
+                self.row_filter_var.set("")
             self.update_treeview()
             self.package_entry.delete(0, tk.END)
             self.package_entry.focus_set()
@@ -446,41 +739,59 @@ class PackageCounterApp:
                 self.package_treeview.focus(last_item)
 
         except Exception as e:
+            self.scan_log.record(OUTCOME_ERROR, package_code, transportadora, operator)
             logging.error("Erro ao adicionar pacote: %s", e)
             messagebox.showerror("Erro", f"Ocorreu um erro ao adicionar o pacote: {str(e)}")
 
-    def save_package(self, transportadora, codigo_pacote):
+    def find_duplicate(self, transportadora, package_code):
         """
-        Salva um novo pacote no banco de dados.
+        Procura um registro anterior que torne o pacote duplicado, conforme a política de duplicados.
+        Retorna (transportadora, data, hora, bipped_by) ou None.
+        Com o diário local ativo, a checagem do dia continua funcionando se o banco central cair.
         """
-        try:
-            data_atual = datetime.date.today().isoformat()
-            hora_atual = datetime.datetime.now().strftime("%H:%M:%S")
-            status = STATUS_PENDING
+        data_atual = datetime.date.today().isoformat()
+        if self.journal is not None:
+            # Bipagens ainda não replicadas não aparecem nas consultas ao banco
+            for record in self.journal.pending_records(transportadora, data_atual):
+                if record["codigo"] == package_code:
+                    return (transportadora, record["data"], record["hora"], record["bipped_by"])
 
-            self.cursor.execute("""
-                SELECT MAX(coleta_number) FROM packages 
-                WHERE transportadora = ? AND data = ? AND status = ?
-            """, (transportadora, data_atual, STATUS_COLLECTED))
-            result = self.cursor.fetchone()
-            max_collected_coleta_number = result[0] if result and result[0] else 0
-            coleta_number = max_collected_coleta_number + 1
+        try:
+            return self.duplicate_policy.find_duplicate(self.cursor, transportadora, package_code, data_atual)
+        except sqlite3.Error as e:
+            if self.journal is None:
+                raise
+            logging.warning("Banco central inacessível, duplicados verificados pelo diário local: %s", e)
+            if self.journal.is_duplicate(data_atual, transportadora, package_code):
+                return (transportadora, data_atual, "", "")
+            return None
 
+    def save_package(self, transportadora, codigo_pacote):
+        """
+        Salva um novo pacote na coleta aberta atual. Retorna True se o pacote foi gravado.
+        Com o diário local ativo, a bipagem é confirmada no disco local e replicada em segundo plano.
+        """
+        try:
             # Registrar quem bipou
             bipped_by = self.current_user['username']
-
-            self.cursor.execute("""
-                INSERT INTO packages (transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (transportadora, codigo_pacote, data_atual, hora_atual, status, coleta_number, bipped_by))
-            self.conn.commit()
+            numero = None
+            if self.journal is not None:
+                self.journal.append(transportadora, codigo_pacote, bipped_by)
+            else:
+                record = self.packages.insert(transportadora, codigo_pacote, bipped_by)
+                numero = record.coleta_numero
+                self.row_cache.add(record)
+            self.duplicate_policy.remember(codigo_pacote)
+            self.publish(EVENT_SCAN, transportadora=transportadora, codigo=codigo_pacote, operator=bipped_by, numero=numero)
+            return True
         except Exception as e:
             logging.error("Erro ao salvar pacote: %s", e)
             messagebox.showerror("Erro", f"Ocorreu um erro ao salvar o pacote: {str(e)}")
+            return False
 
     def close_collection(self):
         """
-        Fecha a coleta atual, atualizando o status dos pacotes para 'collected'.
+        Fecha a coleta atual, mudando o estado da coleta para 'collected'.
         """
         transportadora = self.selected_transportadora.get()
         if transportadora == TRANSPORTADORA_PADRAO:
@@ -489,42 +800,45 @@ class PackageCounterApp:
 
         confirmation = messagebox.askyesno("Confirmação", f"Fechar coleta de hoje para {transportadora}?")
         if confirmation:
+            # Bipagens ainda no diário local precisam chegar ao banco antes do fechamento
+            if self.journal is not None and not self.journal.sync_now():
+                pending = len(self.journal.pending_records())
+                messagebox.showwarning(
+                    "Aviso",
+                    f"Há {pending} bipagem(ns) aguardando sincronização com o banco central.\nTente novamente em instantes."
+                )
+                return
+            data_atual = datetime.date.today().isoformat()
+            # Os manifestos são gerados dentro da transação de fechamento
+            manifests = ManifestBuilder(transportadora, data_atual, self.manifest_dir)
             try:
-                data_atual = datetime.date.today().isoformat()
-                self.cursor.execute("""
-                    SELECT coleta_number FROM packages
-                    WHERE transportadora = ? AND data = ? AND status = ?
-                    LIMIT 1
-                """, (transportadora, data_atual, STATUS_PENDING))
-                result = self.cursor.fetchone()
-                if result:
-                    coleta_number = result[0]
-                else:
+                closed = close_open_coletas(self.conn, transportadora, data_atual, before_commit=manifests)
+                self.row_cache.invalidate(transportadora, data_atual)
+                if not closed:
                     messagebox.showwarning("Aviso", "Não há pacotes pendentes para fechar.")
                     return
+                html_paths = manifests.publish()
 
-                self.cursor.execute("""
-                    UPDATE packages 
-                    SET status = ? 
-                    WHERE transportadora = ? AND data = ? AND status = ? AND coleta_number = ?
-                """, (STATUS_COLLECTED, transportadora, data_atual, STATUS_PENDING, coleta_number))
-
-                rows_updated = self.cursor.rowcount
-                self.conn.commit()
+                self.publish(EVENT_CLOSE, transportadora=transportadora, data=data_atual, coletas=closed)
 
-                if rows_updated > 0:
-                    messagebox.showinfo("Sucesso", f"Coleta {coleta_number} fechada com sucesso.\nPacotes atualizados: {rows_updated}")
-                else:
-                    messagebox.showwarning("Aviso", "Nenhum pacote foi atualizado.")
+                numeros = ", ".join(str(numero) for numero, _ in closed)
+                total = sum(package_count for _, package_count in closed)
+                if messagebox.askyesno(
+                    "Sucesso",
+                    f"Coleta {numeros} fechada com sucesso.\nPacotes atualizados: {total}\n\nDeseja abrir o manifesto para impressão?"
+                ):
+                    for html_path in html_paths:
+                        open_manifest(html_path)
 
                 self.update_treeview()
             except Exception as e:
+                manifests.discard()
                 logging.error("Erro ao fechar a coleta: %s", e)
                 messagebox.showerror("Erro", f"Ocorreu um erro ao fechar a coleta: {str(e)}")
 
     def reopen_collection(self):
         """
-        Reabre a última coleta fechada, atualizando o status dos pacotes para 'pending'.
+        Reabre a última coleta fechada, mudando o estado da coleta para 'pending'.
         """
         transportadora = self.selected_transportadora.get()
         if transportadora == TRANSPORTADORA_PADRAO:
@@ -535,29 +849,18 @@ class PackageCounterApp:
         if confirmation:
             try:
                 data_atual = datetime.date.today().isoformat()
-                self.cursor.execute("""
-                    SELECT MAX(coleta_number) FROM packages
-                    WHERE transportadora = ? AND data = ? AND status = ?
-                """, (transportadora, data_atual, STATUS_COLLECTED))
-                result = self.cursor.fetchone()
-                if result and result[0] is not None:
-                    coleta_number = result[0]
-                else:
+                reopened = reopen_last_coleta(self.conn, transportadora, data_atual)
+                self.row_cache.invalidate(transportadora, data_atual)
+                if reopened is None:
                     messagebox.showwarning("Aviso", "Não há coletas fechadas para reabrir.")
                     return
 
-                self.cursor.execute("""
-                    UPDATE packages 
-                    SET status = ? 
-                    WHERE transportadora = ? AND data = ? AND status = ? AND coleta_number = ?
-                """, (STATUS_PENDING, transportadora, data_atual, STATUS_COLLECTED, coleta_number))
-                rows_updated = self.cursor.rowcount
-                self.conn.commit()
-
-                if rows_updated > 0:
-                    messagebox.showinfo("Sucesso", f"Coleta {coleta_number} reaberta com sucesso.")
-                else:
-                    messagebox.showwarning("Aviso", "Nenhum pacote foi atualizado.")
+                coleta_number, package_count = reopened
+                self.publish(
+                    EVENT_REOPEN, transportadora=transportadora, data=data_atual,
+                    numero=coleta_number, package_count=package_count
+                )
+                messagebox.showinfo("Sucesso", f"Coleta {coleta_number} reaberta com sucesso.")
 
                 self.update_treeview()
             except Exception as e:
@@ -574,45 +877,100 @@ class PackageCounterApp:
         """
         Atualiza o Treeview com os pacotes registrados para a transportadora selecionada no dia atual.
         """
-        for item in self.package_treeview.get_children():
-            self.package_treeview.delete(item)
+        # Inclui os itens escondidos pelo filtro da lista
+        self.package_treeview.delete(*self.treeview_records)
+        self.treeview_records = {}
+        self.treeview_items = []
+        self.row_index = CodeIndex()
+        self.journal_items = []
 
         selected_transportadora = self.selected_transportadora.get()
         if selected_transportadora == TRANSPORTADORA_PADRAO:
             self.big_total_label.config(text="0")
             self.transportadora_label_big.config(text="")
+            self.row_filter_count_label.config(text="")
             return
 
+        data_atual = datetime.date.today().isoformat()
+        packages = []
+        count = 0
         try:
-            data_atual = datetime.date.today().isoformat()
-            self.cursor.execute("""
-                SELECT codigo_pacote, data, hora, coleta_number, id 
-                FROM packages 
-                WHERE data = ? AND transportadora = ? AND status = ?
-            """, (data_atual, selected_transportadora, STATUS_PENDING))
-            packages = self.cursor.fetchall()
-            for pacote in packages:
-                self.package_treeview.insert('', 'end', values=(pacote[0], pacote[1], pacote[2], pacote[3], pacote[4]))
-
-            # Colorir pela transportadora
-            for item in self.package_treeview.get_children():
-                self.package_treeview.item(item, tags=(selected_transportadora,))
-            self.package_treeview.tag_configure(selected_transportadora, background=self.transportadora_colors.get(selected_transportadora, 'white'))
-
-            self.cursor.execute("""
-                SELECT COUNT(*) 
-                FROM packages 
-                WHERE data = ? AND transportadora = ? AND status = ?
-            """, (data_atual, selected_transportadora, STATUS_PENDING))
-            count = self.cursor.fetchone()[0]
-            self.big_total_label.config(text=str(count))
-            self.transportadora_label_big.config(text=f"({selected_transportadora})")
+            packages = list(self.row_cache.get(selected_transportadora, data_atual))
+            count = len(packages)
         except Exception as e:
             logging.error("Erro ao atualizar a lista: %s", e)
-            messagebox.showerror("Erro", f"Ocorreu um erro ao atualizar a lista: {str(e)}")
+            # Com o diário local ativo, a lista continua com as bipagens ainda não replicadas
+            if self.journal is None:
+                messagebox.showerror("Erro", f"Ocorreu um erro ao atualizar a lista: {str(e)}")
+
+        # Bipagens confirmadas no diário local e ainda não replicadas no banco central
+        if self.journal is not None:
+            replicated = {pacote.codigo for pacote in packages}
+            for record in self.journal.pending_records(selected_transportadora, data_atual):
+                if record["codigo"] not in replicated:
+                    packages.append(PackageRecord(
+                        None, record["codigo"], selected_transportadora, record["data"], record["hora"],
+                        STATUS_PENDING, None, record["bipped_by"]
+                    ))
+                    count += 1
+
+        # Colorir pela transportadora
+        tags = (selected_transportadora,)
+        for pacote in packages:
+            values = (pacote.codigo, pacote.data, pacote.hora, pacote.coleta_numero, pacote.id)
+            if pacote.id is None:
+                values = (pacote.codigo, pacote.data, pacote.hora, "pendente", "")
+            item = self.package_treeview.insert('', 'end', values=values, tags=tags)
+            self.treeview_records[item] = pacote
+            self.treeview_items.append(item)
+            if pacote.id is None:
+                self.journal_items.append(item)
+        self.package_treeview.tag_configure(selected_transportadora, background=self.transportadora_colors.get(selected_transportadora, 'white'))
+
+        self.row_index = CodeIndex(pacote.codigo for pacote in packages)
+        if self.row_filter_var.get().strip():
+            self.apply_row_filter()
+
+        self.big_total_label.config(text=str(count))
+        self.transportadora_label_big.config(text=f"({selected_transportadora})")
 
         self.package_entry.focus_set()
 
+    def apply_row_filter(self, *args):
+        """
+        Mostra na lista apenas os pacotes cujo código começa ou termina com o texto do filtro.
+        Roda a cada tecla: o índice em memória responde sem consultar o banco, e os itens não
+        são recriados, apenas escondidos ou mostrados de novo em uma única chamada ao Tk.
+        """
+        start = time.perf_counter()
+        term = self.row_filter_var.get()
+        positions = self.row_index.match(term)
+        items = self.treeview_items
+        if len(positions) == len(items):
+            self.package_treeview.set_children('', *items)
+        else:
+            self.package_treeview.set_children('', *[items[position] for position in positions])
+
+        if term.strip():
+            self.row_filter_count_label.config(text=f"{len(positions)} de {len(items)}")
+        else:
+            self.row_filter_count_label.config(text="")
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > ROW_FILTER_BUDGET_MS:
+            logging.debug("Filtro da lista: %.1f ms para %s linhas.", elapsed_ms, len(items))
+
+    def select_first_filtered_row(self, event=None):
+        """
+        Seleciona o primeiro pacote visível da lista filtrada (para remover em seguida).
+        """
+        children = self.package_treeview.get_children()
+        if children:
+            self.package_treeview.selection_set(children[0])
+            self.package_treeview.focus(children[0])
+            self.package_treeview.see(children[0])
+        return "break"
+
     def update_treeview_on_selection(self, *args):
         """
         Atualiza o Treeview quando a transportadora selecionada muda.
@@ -638,25 +996,70 @@ class PackageCounterApp:
             messagebox.showwarning("Aviso", "Selecione um pacote para remover.")
             return
 
-        item = self.package_treeview.item(selected_item)
-        codigo_pacote = str(item['values'][0])
-        transportadora = self.selected_transportadora.get()
-        coleta_number = item['values'][3]
-        package_id = item['values'][4]
+        record = self.treeview_records[selected_item[0]]
+        if record.id is None:
+            messagebox.showwarning("Aviso", "Este pacote ainda está sendo sincronizado com o banco central.\nTente novamente em instantes.")
+            return
 
         try:
-            data_atual = datetime.date.today().isoformat()
-            self.cursor.execute("""
-                DELETE FROM packages 
-                WHERE id = ? AND transportadora = ? AND codigo_pacote = ? AND data = ? AND status = ? AND coleta_number = ?
-            """, (package_id, transportadora, codigo_pacote, data_atual, STATUS_PENDING, coleta_number))
-            self.conn.commit()
+            if not self.packages.remove(record):
+                messagebox.showwarning("Aviso", "O pacote não está mais em uma coleta aberta.")
+                self.row_cache.invalidate(record.transportadora, record.data)
+                self.update_treeview()
+                return
+            self.row_cache.remove(record.transportadora, record.data, record.id)
+            self.publish(
+                EVENT_REMOVE, transportadora=record.transportadora, codigo=record.codigo,
+                data=record.data, numero=record.coleta_numero
+            )
             self.update_treeview()
             messagebox.showinfo("Sucesso", "Pacote removido com sucesso.")
         except Exception as e:
             logging.error("Erro ao remover pacote: %s", e)
             messagebox.showerror("Erro", f"Ocorreu um erro ao remover o pacote: {str(e)}")
 
+    def open_scan_remove(self):
+        """
+        Abre a janela de remoção por bipagem para a transportadora selecionada.
+        """
+        transportadora = self.selected_transportadora.get()
+        if transportadora == TRANSPORTADORA_PADRAO:
+            messagebox.showerror("Erro", "Selecione uma transportadora para remover pacotes.")
+            return
+        ScanRemoveWindow(self, transportadora)
+
+    def remove_rows(self, records):
+        """
+        Retira da lista e do cache os pacotes removidos em lote, sem recriar os demais itens,
+        e atualiza o total.
+        """
+        by_day = {}
+        for record in records:
+            by_day.setdefault((record.transportadora, record.data), set()).add(record.id)
+        for (transportadora, data), package_ids in by_day.items():
+            self.row_cache.remove_many(transportadora, data, package_ids)
+
+        package_ids = {record.id for record in records}
+        removed = [item for item in self.treeview_items if self.treeview_records[item].id in package_ids]
+        if not removed:
+            return
+        self.package_treeview.delete(*removed)
+        for item in removed:
+            del self.treeview_records[item]
+        self.treeview_items = [item for item in self.treeview_items if item in self.treeview_records]
+        self.row_index = CodeIndex(self.treeview_records[item].codigo for item in self.treeview_items)
+        if self.row_filter_var.get().strip():
+            self.apply_row_filter()
+        self.big_total_label.config(text=str(len(self.treeview_items)))
+
+    def restore_rows(self, records):
+        """
+        Acrescenta ao cache os pacotes devolvidos às coletas (desfazer remoção) e atualiza a lista.
+        """
+        for record in records:
+            self.row_cache.add(record)
+        self.update_treeview()
+
     def show_transportadora_help(self):
         """
         Exibe uma mensagem de ajuda sobre a seleção de transportadora.
@@ -669,10 +1072,99 @@ class PackageCounterApp:
         """
         messagebox.showinfo("Ajuda - Código de Barras", "Insira ou escaneie o código de barras do pacote.")
 
+    def publish(self, kind, **data):
+        """
+        Publica uma operação no barramento de eventos (painel ao vivo). O banco de teste não publica.
+        """
+        if self.db_type == 'main':
+            bus.publish(kind, **data)
+
+    def open_dashboard(self):
+        """
+        Abre o painel ao vivo com os contadores de todas as transportadoras e operadores.
+        """
+        DashboardWindow(self)
+
+    def start_performance_capture(self):
+        """
+        Captura o desempenho desta estação por alguns segundos enquanto os operadores bipam
+        (perfil por amostragem, alocações de memória e tempos de SQL, gravados na pasta de logs).
+        """
+        if PerformanceCapture.running():
+            messagebox.showinfo("Captura de Desempenho", "Já existe uma captura em andamento.")
+            return
+        seconds = simpledialog.askinteger(
+            "Captura de Desempenho",
+            "Duração da captura (segundos):",
+            initialvalue=PROFILE_DEFAULT_SECONDS,
+            minvalue=1,
+            maxvalue=PROFILE_MAX_SECONDS,
+            parent=self.root
+        )
+        if not seconds:
+            return
+        try:
+            capture = PerformanceCapture(seconds).start()
+        except Exception as e:
+            logging.error("Erro ao iniciar a captura de desempenho: %s", e)
+            messagebox.showerror("Erro", "Erro ao iniciar a captura de desempenho. Verifique os logs.")
+            return
+        self.root.after(1000, self.check_performance_capture, capture)
+
+        if messagebox.askyesno(
+            "Captura de Desempenho",
+            f"Captura iniciada por {seconds} s.\n\nBloquear a tela para um operador bipar durante a captura?"
+        ):
+            self.lock_screen()
+
+    def check_performance_capture(self, capture):
+        """
+        Aguarda o fim da captura sem bloquear a interface; o resultado só é mostrado a um administrador.
+        """
+        if not capture.done.is_set():
+            self.root.after(1000, self.check_performance_capture, capture)
+            return
+        if self.current_user['role'] != 'admin':
+            return
+        if capture.error is not None:
+            messagebox.showerror("Erro", "Erro na captura de desempenho. Verifique os logs.")
+        else:
+            messagebox.showinfo("Captura de Desempenho", "Captura concluída:\n\n" + "\n".join(capture.paths))
+
+    def lock_screen(self):
+        """
+        Esconde a tela até um novo login. Quem desbloquear passa a ser o operador das bipagens;
+        o desbloqueio pelo mesmo operador é imediato graças ao cache de desbloqueio (auth.py).
+        """
+        login_window = LoginWindow(self.root, self.db_path)
+        self.root.wait_window(login_window.top)
+        user = login_window.user
+        if not user:
+            # Janela de login fechada sem autenticar: encerra como na abertura do programa
+            self.on_closing()
+            return
+
+        if user['username'] != self.current_user['username'] or user['role'] != self.current_user['role']:
+            self.current_user = user
+            if user['role'] == 'admin':
+                self.create_admin_menu()
+            else:
+                self.create_user_interface()
+        elif hasattr(self, 'package_entry'):
+            self.package_entry.focus_set()
+
     def on_closing(self):
         """
         Fecha a conexão com o banco de dados e destrói a janela principal.
         """
+        self.scan_log.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.maintenance is not None:
+            self.maintenance.close()
+        if self.outbox is not None:
+            self.outbox.close()
+        self.registered_codes.close()
         try:
             self.conn.close()
         except Exception as e:
@@ -685,10 +1177,37 @@ class PackageCounterApp:
         """
         UserManagementWindow(self)
 
+    def open_operator_report(self):
+        """
+        Abre o relatório de produtividade por operador.
+        """
+        OperatorReportWindow(self)
+
     def open_test_scanning(self):
         """
-        Abre uma janela de teste para simular a contagem de pacotes.
+        Abre uma janela de teste para simular a contagem de pacotes, sobre um banco descartável
+        em memória (opcionalmente com carga de treino e os dados reais recentes).
         """
+        setup = SandboxSetupWindow(self.root)
+        self.root.wait_window(setup.top)
+        if setup.result is None:
+            return
+        training_load, sample_days = setup.result
+
+        self.root.config(cursor="watch")
+        self.root.update_idletasks()
+        try:
+            sandbox = TrainingSandbox(
+                self.transportadoras, sample_days=sample_days, training_load=training_load
+            )
+            test_conn, test_cursor = sandbox.connect()
+        except Exception as e:
+            logging.error("Erro ao criar o banco de dados de teste: %s", e)
+            messagebox.showerror("Erro", "Erro ao criar o banco de dados de teste. Verifique os logs.")
+            return
+        finally:
+            self.root.config(cursor="")
+
         test_window = Toplevel(self.root)
         test_window.transient(self.root)
         test_window.grab_set()
@@ -711,29 +1230,46 @@ class PackageCounterApp:
         test_window.geometry(f'{window_width}x{window_height}+{x}+{y}')
         test_window.state('normal')
 
-        try:
-            test_conn, test_cursor = get_database_connection(test=True)
-        except Exception as e:
-            logging.error("Erro ao conectar ao banco de dados de teste: %s", e)
-            messagebox.showerror("Erro", "Erro ao conectar ao banco de dados de teste. Verifique os logs.")
-            test_window.destroy()
-            return
-
         test_app = PackageCounterApp(
             test_window,
             self.current_user.copy(),
             conn=test_conn,
             title="Contador de Pacotes - Ponto 3D - Teste",
             override_role='user',
-            db_type='test'
+            db_type='test',
+            sandbox=sandbox
         )
 
         def on_closing_test():
+            test_app.scan_log.close()
+            test_app.registered_codes.close()
             try:
                 test_conn.close()
+                sandbox.close()
             except Exception as e:
                 logging.error("Erro ao fechar a conexão de teste: %s", e)
             test_window.destroy()
 
         test_window.protocol("WM_DELETE_WINDOW", on_closing_test)
         center_window(test_window)
+
+    def reset_sandbox(self):
+        """
+        Descarta o que foi bipado no teste e volta o banco ao estado inicial (com a carga de treino).
+        """
+        if not messagebox.askyesno("Reiniciar Teste", "Descartar todas as bipagens feitas neste teste?"):
+            return
+        # As tentativas pendentes são gravadas antes, para não voltarem depois da restauração
+        self.scan_log.close()
+        self.registered_codes.close()
+        try:
+            self.sandbox.reset()
+        except Exception as e:
+            logging.error("Erro ao reiniciar o banco de dados de teste: %s", e)
+            messagebox.showerror("Erro", "Erro ao reiniciar o banco de dados de teste. Verifique os logs.")
+        # O filtro de códigos e o cache de linhas acompanham os ids do banco: recriados do zero
+        self.scan_log = ScanEventLog(self.db_path)
+        self.registered_codes = self.create_registered_codes()
+        self.duplicate_policy = None
+        self.row_cache.invalidate()
+        self.create_user_interface()
@@ -0,0 +1,188 @@
+# gui/operator_report.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import datetime
+from tkcalendar import DateEntry
+
+from utils import center_window
+from config import logging
+from analytics import (
+    compute_operator_stats, summary_rows, hourly_rows, gap_headers,
+    write_report_csv, SUMMARY_HEADERS, HOURLY_HEADERS
+)
+
+class OperatorReportWindow:
+    """
+    Classe para a janela de produtividade dos operadores.
+    """
+    def __init__(self, parent_app):
+        self.parent_app = parent_app
+        self.conn = parent_app.conn
+        self.cursor = self.conn.cursor()
+        self.stats = {}
+
+        self.window = tk.Toplevel(self.parent_app.root)
+        self.window.title("Produtividade dos Operadores")
+        self.window.geometry("1000x700")
+        self.window.resizable(True, True)
+        center_window(self.window)
+
+        main_frame = tk.Frame(self.window, bg="#f0f0f0")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        tk.Label(
+            main_frame,
+            text="Produtividade dos Operadores",
+            font=("Helvetica", 18, "bold"),
+            bg="#f0f0f0"
+        ).pack(pady=10)
+
+        # Frame para filtros de período
+        filter_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        filter_frame.pack(fill=tk.X, pady=10)
+
+        tk.Label(
+            filter_frame,
+            text="Data Inicial:",
+            font=("Helvetica", 12, "bold"),
+            bg="#f0f0f0"
+        ).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+
+        self.start_date_entry = DateEntry(
+            filter_frame,
+            font=("Helvetica", 12),
+            width=12,
+            background='darkblue',
+            foreground='white',
+            borderwidth=2,
+            date_pattern='yyyy-mm-dd'
+        )
+        self.start_date_entry.grid(row=0, column=1, padx=5, pady=5)
+
+        tk.Label(
+            filter_frame,
+            text="Data Final:",
+            font=("Helvetica", 12, "bold"),
+            bg="#f0f0f0"
+        ).grid(row=0, column=2, padx=5, pady=5, sticky="w")
+
+        self.end_date_entry = DateEntry(
+            filter_frame,
+            font=("Helvetica", 12),
+            width=12,
+            background='darkblue',
+            foreground='white',
+            borderwidth=2,
+            date_pattern='yyyy-mm-dd'
+        )
+        self.end_date_entry.grid(row=0, column=3, padx=5, pady=5)
+
+        tk.Button(
+            filter_frame,
+            text="Gerar",
+            command=self.generate_report,
+            font=("Helvetica", 12, "bold"),
+            bg="#2196F3",
+            fg="white",
+            width=12
+        ).grid(row=0, column=4, padx=5, pady=5)
+
+        tk.Button(
+            filter_frame,
+            text="Exportar CSV",
+            command=self.export_csv,
+            font=("Helvetica", 12, "bold"),
+            bg="#4CAF50",
+            fg="white",
+            width=12
+        ).grid(row=0, column=5, padx=5, pady=5)
+
+        # Abas com o resumo, o histograma de intervalos e as bipagens por hora
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        self.summary_tree = self.create_tree(notebook, SUMMARY_HEADERS)
+        notebook.add(self.summary_tree.master, text="Resumo")
+
+        self.gaps_tree = self.create_tree(notebook, ["Operador"] + gap_headers())
+        notebook.add(self.gaps_tree.master, text="Intervalos entre Bipagens")
+
+        self.hourly_tree = self.create_tree(notebook, HOURLY_HEADERS)
+        notebook.add(self.hourly_tree.master, text="Por Hora")
+
+    def create_tree(self, parent, headers):
+        """
+        Cria um Treeview com scrollbar dentro de um frame próprio.
+        """
+        frame = tk.Frame(parent, bg="#f0f0f0")
+        columns = [f"c{i}" for i in range(len(headers))]
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for column, header in zip(columns, headers):
+            tree.heading(column, text=header)
+            tree.column(column, width=110, anchor='center')
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.configure(yscroll=scrollbar.set)
+        return tree
+
+    def fill_tree(self, tree, rows):
+        """
+        Substitui o conteúdo do Treeview pelas linhas fornecidas.
+        """
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert('', tk.END, values=row)
+
+    def generate_report(self):
+        """
+        Calcula as métricas do período selecionado e preenche as abas.
+        """
+        start_date = self.start_date_entry.get_date().isoformat()
+        end_date = self.end_date_entry.get_date().isoformat()
+        if start_date > end_date:
+            messagebox.showwarning("Aviso", "A data inicial não pode ser maior que a data final.")
+            return
+
+        try:
+            self.stats = compute_operator_stats(self.cursor, start_date, end_date)
+        except Exception as e:
+            logging.error("Erro ao calcular produtividade: %s", e)
+            messagebox.showerror("Erro", f"Ocorreu um erro ao calcular a produtividade: {str(e)}")
+            return
+
+        self.fill_tree(self.summary_tree, summary_rows(self.stats))
+        self.fill_tree(
+            self.gaps_tree,
+            [[operator] + self.stats[operator].gap_histogram() for operator in sorted(self.stats)]
+        )
+        self.fill_tree(self.hourly_tree, hourly_rows(self.stats))
+
+        if not self.stats:
+            messagebox.showinfo("Informação", "Nenhuma bipagem encontrada no período selecionado.")
+
+    def export_csv(self):
+        """
+        Exporta o relatório gerado para CSV.
+        """
+        if not self.stats:
+            messagebox.showwarning("Aviso", "Gere o relatório antes de exportar.")
+            return
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            initialfile=f"produtividade_operadores_{timestamp}.csv"
+        )
+        if not file_path:
+            return
+
+        try:
+            write_report_csv(file_path, self.stats)
+            messagebox.showinfo("Sucesso", f"Relatório exportado com sucesso!\nLocal: {file_path}")
+        except Exception as e:
+            logging.error("Erro ao exportar relatório de produtividade: %s", e)
+            messagebox.showerror("Erro", f"Erro ao exportar o relatório: {str(e)}")
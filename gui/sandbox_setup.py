@@ -0,0 +1,71 @@
+# gui/sandbox_setup.py
+
+import tkinter as tk
+from tkinter import ttk
+
+from utils import center_window
+from config import SANDBOX_SAMPLE_DAYS, TRAINING_LOAD_OPTIONS
+
+
+class SandboxSetupWindow:
+    """
+    Janela de opções do modo de teste: carga de treino e cópia dos dados reais recentes.
+    Após fechar, `result` é (pacotes de treino, dias de dados reais) ou None se cancelada.
+    """
+    def __init__(self, parent):
+        self.result = None
+
+        self.top = tk.Toplevel(parent)
+        self.top.transient(parent)
+        self.top.grab_set()
+        self.top.title("Menu de Bipagem de Testes")
+        self.top.geometry("460x300")
+
+        main_frame = tk.Frame(self.top, bg="#f0f0f0", padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(main_frame, text="Banco de Teste em Memória", font=("Helvetica", 16, "bold"), bg="#f0f0f0").pack(pady=(0, 5))
+        tk.Label(
+            main_frame,
+            text="Nada é gravado no banco principal. Os dados de teste são descartados ao fechar.",
+            font=("Helvetica", 10),
+            bg="#f0f0f0",
+            wraplength=400
+        ).pack(pady=(0, 10))
+
+        tk.Label(main_frame, text="Carga de treino (pacotes):", font=("Helvetica", 12), bg="#f0f0f0").pack(pady=5)
+        self.load_var = tk.StringVar(value=f"{TRAINING_LOAD_OPTIONS[0]:,}".replace(",", "."))
+        ttk.Combobox(
+            main_frame,
+            textvariable=self.load_var,
+            values=[f"{option:,}".replace(",", ".") for option in TRAINING_LOAD_OPTIONS],
+            font=("Helvetica", 12),
+            state="readonly",
+            width=12
+        ).pack(pady=5)
+
+        self.sample_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            main_frame,
+            text=f"Copiar os pacotes reais dos últimos {SANDBOX_SAMPLE_DAYS} dias",
+            variable=self.sample_var,
+            font=("Helvetica", 12),
+            bg="#f0f0f0"
+        ).pack(pady=10)
+
+        button_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        button_frame.pack(pady=10)
+        tk.Button(
+            button_frame, text="Iniciar", command=self.confirm, font=("Helvetica", 12),
+            bg="#4CAF50", fg="white", width=12
+        ).grid(row=0, column=0, padx=10)
+        tk.Button(
+            button_frame, text="Cancelar", command=self.top.destroy, font=("Helvetica", 12), width=12
+        ).grid(row=0, column=1, padx=10)
+
+        center_window(self.top)
+
+    def confirm(self):
+        training_load = int(self.load_var.get().replace(".", ""))
+        self.result = (training_load, SANDBOX_SAMPLE_DAYS if self.sample_var.get() else 0)
+        self.top.destroy()
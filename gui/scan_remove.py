@@ -0,0 +1,291 @@
+# gui/scan_remove.py
+
+import collections
+import datetime
+import tkinter as tk
+from tkinter import messagebox
+
+from config import REMOVAL_BATCH_SIZE, REMOVAL_UNDO_BATCHES, logging
+from utils import center_window, play_sound
+from events import EVENT_SCAN, EVENT_REMOVE
+
+class ScanRemoveWindow:
+    """
+    Janela de remoção por bipagem: cada código bipado é localizado pelo índice da lista da tela
+    principal (ou, se não estiver nela, pelo índice do banco) e entra na fila de remoção. A fila é
+    confirmada em uma única transação, pelo botão ou ao chegar a REMOVAL_BATCH_SIZE pacotes, e a
+    lista e o total da tela principal são atualizados sem recarregar os demais pacotes.
+    "Desfazer" tira da fila o último código bipado ou, com a fila vazia, devolve às coletas o
+    último lote confirmado.
+    """
+    def __init__(self, parent_app, transportadora):
+        self.parent_app = parent_app
+        self.packages = parent_app.packages
+        self.transportadora = transportadora
+        self.staged = []        # PackageRecord na fila, na ordem de bipagem
+        self.staged_ids = set()
+        self.undo_batches = collections.deque(maxlen=REMOVAL_UNDO_BATCHES)
+        self.removed_count = 0
+
+        self.window = tk.Toplevel(self.parent_app.root)
+        self.window.title(f"Remover por Bipagem - {transportadora}")
+        self.window.geometry("500x600")
+        self.window.resizable(False, False)
+        center_window(self.window)
+
+        main_frame = tk.Frame(self.window, bg="#f0f0f0")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        tk.Label(
+            main_frame,
+            text=f"Remover por Bipagem ({transportadora})",
+            font=("Helvetica", 16, "bold"),
+            bg="#f0f0f0"
+        ).pack(pady=10)
+
+        tk.Label(
+            main_frame,
+            text="Bipe os pacotes a remover:",
+            font=("Helvetica", 12),
+            bg="#f0f0f0"
+        ).pack(pady=5)
+        self.code_entry = tk.Entry(
+            main_frame,
+            font=("Helvetica", 14),
+            width=30,
+            bg="#FFE0B2"
+        )
+        self.code_entry.pack(pady=5)
+        self.code_entry.bind('<Return>', self.stage_code)
+        self.code_entry.focus_set()
+
+        self.status_label = tk.Label(
+            main_frame,
+            text="",
+            font=("Helvetica", 12, "bold"),
+            bg="#f0f0f0",
+            wraplength=440
+        )
+        self.status_label.pack(pady=5)
+
+        self.staged_listbox = tk.Listbox(
+            main_frame,
+            font=("Helvetica", 11),
+            width=45,
+            height=12
+        )
+        self.staged_listbox.pack(pady=5)
+
+        self.count_label = tk.Label(
+            main_frame,
+            text="",
+            font=("Helvetica", 12),
+            bg="#f0f0f0"
+        )
+        self.count_label.pack(pady=5)
+
+        button_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        button_frame.pack(pady=10)
+
+        tk.Button(
+            button_frame,
+            text="Confirmar Remoção",
+            command=self.confirm_removal,
+            font=("Helvetica", 12, "bold"),
+            bg="#FF9800",
+            fg="white",
+            width=16
+        ).grid(row=0, column=0, padx=5)
+
+        tk.Button(
+            button_frame,
+            text="Desfazer",
+            command=self.undo,
+            font=("Helvetica", 12),
+            bg="#607D8B",
+            fg="white",
+            width=10
+        ).grid(row=0, column=1, padx=5)
+
+        tk.Button(
+            button_frame,
+            text="Fechar",
+            command=self.on_closing,
+            font=("Helvetica", 12),
+            width=10
+        ).grid(row=0, column=2, padx=5)
+
+        self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.update_counts()
+
+    def show_status(self, text, color="#333333"):
+        self.status_label.config(text=text, fg=color)
+
+    def update_counts(self):
+        self.count_label.config(text=f"Na fila: {len(self.staged)}    Removidos: {self.removed_count}")
+
+    def find_record(self, codigo):
+        """
+        Pacote a remover para o código: o mais recente ainda fora da fila entre os da lista da tela
+        principal (índice em memória) ou, se não estiver nela, o da coleta aberta no banco (bipado
+        por outra estação depois da última atualização da lista). Retorna (PackageRecord ou None,
+        True se o código só existe em bipagens ainda não sincronizadas).
+        """
+        app = self.parent_app
+        syncing = False
+        if app.selected_transportadora.get() == self.transportadora:
+            for position in reversed(app.row_index.find(codigo)):
+                record = app.treeview_records[app.treeview_items[position]]
+                if record.id is None:
+                    syncing = True
+                elif record.id not in self.staged_ids:
+                    return record, False
+
+        record = self.packages.find_pending(self.transportadora, datetime.date.today().isoformat(), codigo)
+        if record is not None and record.id not in self.staged_ids:
+            return record, False
+        return None, syncing
+
+    def stage_code(self, event=None):
+        """
+        Coloca na fila de remoção o pacote do código bipado.
+        """
+        if self.parent_app.maintenance is not None:
+            self.parent_app.maintenance.notify_activity()
+
+        codigo = self.code_entry.get().strip()
+        self.code_entry.delete(0, tk.END)
+        if not codigo:
+            return "break"
+
+        try:
+            record, syncing = self.find_record(codigo)
+        except Exception as e:
+            logging.error("Erro ao localizar o pacote a remover: %s", e)
+            messagebox.showerror("Erro", f"Ocorreu um erro ao localizar o pacote: {str(e)}")
+            return "break"
+
+        if record is None:
+            play_sound('error')
+            if syncing:
+                self.show_status(f"{codigo}: ainda sendo sincronizado com o banco central.", "#f44336")
+            elif codigo in (staged.codigo for staged in self.staged):
+                self.show_status(f"{codigo}: já está na fila.", "#f44336")
+            else:
+                self.show_status(f"{codigo}: não está em uma coleta aberta de {self.transportadora} hoje.", "#f44336")
+            return "break"
+
+        self.staged.append(record)
+        self.staged_ids.add(record.id)
+        self.staged_listbox.insert(tk.END, f"{record.codigo}  -  Coleta {record.coleta_numero}  -  {record.hora}")
+        self.staged_listbox.see(tk.END)
+        play_sound('success')
+        self.show_status(f"{codigo}: na fila para remoção.", "#4CAF50")
+        self.update_counts()
+
+        if len(self.staged) >= REMOVAL_BATCH_SIZE:
+            self.confirm_removal()
+        return "break"
+
+    def clear_staged(self):
+        self.staged = []
+        self.staged_ids = set()
+        self.staged_listbox.delete(0, tk.END)
+
+    def confirm_removal(self):
+        """
+        Remove os pacotes da fila em uma única transação. Retorna False se houve erro.
+        """
+        if not self.staged:
+            self.code_entry.focus_set()
+            return True
+
+        records = self.staged
+        try:
+            removed = self.packages.remove_many(records)
+        except Exception as e:
+            logging.error("Erro ao remover pacotes: %s", e)
+            messagebox.showerror("Erro", f"Ocorreu um erro ao remover os pacotes: {str(e)}")
+            return False
+
+        self.clear_staged()
+        if removed:
+            self.undo_batches.append(removed)
+            self.parent_app.remove_rows(removed)
+            for record in removed:
+                self.parent_app.publish(
+                    EVENT_REMOVE, transportadora=record.transportadora, codigo=record.codigo,
+                    data=record.data, numero=record.coleta_numero
+                )
+        self.removed_count += len(removed)
+        self.update_counts()
+
+        skipped = len(records) - len(removed)
+        if skipped:
+            self.show_status(
+                f"{len(removed)} pacote(s) removido(s). {skipped} já não estava(m) em uma coleta aberta.", "#f44336"
+            )
+        else:
+            self.show_status(f"{len(removed)} pacote(s) removido(s).", "#4CAF50")
+        self.code_entry.focus_set()
+        return True
+
+    def undo(self):
+        """
+        Tira da fila o último código bipado ou, com a fila vazia, devolve às coletas o último lote
+        removido.
+        """
+        if self.staged:
+            record = self.staged.pop()
+            self.staged_ids.discard(record.id)
+            self.staged_listbox.delete(tk.END)
+            self.show_status(f"{record.codigo}: retirado da fila.")
+            self.update_counts()
+        elif self.undo_batches:
+            batch = self.undo_batches[-1]
+            if not messagebox.askyesno(
+                "Confirmação", f"Devolver às coletas os {len(batch)} pacote(s) da última remoção?", parent=self.window
+            ):
+                self.code_entry.focus_set()
+                return
+            try:
+                restored = self.packages.restore(batch)
+            except Exception as e:
+                logging.error("Erro ao desfazer a remoção: %s", e)
+                messagebox.showerror("Erro", f"Ocorreu um erro ao desfazer a remoção: {str(e)}")
+                return
+            self.undo_batches.pop()
+            self.parent_app.restore_rows(restored)
+            for record in restored:
+                self.parent_app.publish(
+                    EVENT_SCAN, transportadora=record.transportadora, codigo=record.codigo,
+                    operator=record.bipped_by, numero=record.coleta_numero
+                )
+            self.removed_count -= len(restored)
+            self.update_counts()
+
+            skipped = len(batch) - len(restored)
+            if skipped:
+                self.show_status(
+                    f"{len(restored)} pacote(s) devolvido(s). {skipped} não voltaram: a coleta já foi fechada.",
+                    "#f44336"
+                )
+            else:
+                self.show_status(f"{len(restored)} pacote(s) devolvido(s) às coletas.", "#4CAF50")
+        else:
+            self.show_status("Nada para desfazer.")
+        self.code_entry.focus_set()
+
+    def on_closing(self):
+        """
+        Ao fechar com pacotes na fila, pergunta se a remoção deles deve ser confirmada.
+        """
+        if self.staged:
+            answer = messagebox.askyesnocancel(
+                "Confirmação", f"Remover os {len(self.staged)} pacote(s) na fila antes de fechar?", parent=self.window
+            )
+            if answer is None:
+                return
+            if answer and not self.confirm_removal():
+                return
+        self.window.destroy()
@@ -3,13 +3,14 @@
 import tkinter as tk
 from tkinter import messagebox, Toplevel
 from tkinter import ttk
-import bcrypt
 import sqlite3
 import threading
 import logging
 
 from utils import play_sound, center_window
+from auth import hash_password, unlock_cache
 from config import STATUS_PENDING, STATUS_COLLECTED
+from queries import USERS_LIST, USER_INSERT, USER_UPDATE_WITH_PASSWORD, USER_UPDATE, USER_DELETE
 
 class UserManagementWindow:
     """
@@ -80,7 +81,7 @@ class UserManagementWindow:
 
         try:
             # Buscar usuários no banco de dados
-            self.app.cursor.execute("SELECT username, role FROM users")
+            self.app.cursor.execute(USERS_LIST)
             users = self.app.cursor.fetchall()
             for username, role in users:
                 self.user_treeview.insert('', 'end', values=(username, role))
@@ -135,11 +136,8 @@ class UserManagementWindow:
 
             try:
                 # Hash da senha antes de salvar
-                hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-                self.app.cursor.execute(
-                    "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                    (username, hashed_password.decode('utf-8'), role)
-                )
+                hashed_password = hash_password(password)
+                self.app.cursor.execute(USER_INSERT, (username, hashed_password, role))
                 self.app.conn.commit()
                 messagebox.showinfo("Sucesso", "Usuário adicionado com sucesso.")
                 self.load_users()
@@ -215,17 +213,16 @@ class UserManagementWindow:
             try:
                 if new_password:
                     # Hash da nova senha
-                    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+                    hashed_password = hash_password(new_password)
                     self.app.cursor.execute(
-                        "UPDATE users SET username = ?, password = ?, role = ? WHERE username = ?",
-                        (new_username, hashed_password.decode('utf-8'), new_role, username)
+                        USER_UPDATE_WITH_PASSWORD, (new_username, hashed_password, new_role, username)
                     )
                 else:
-                    self.app.cursor.execute(
-                        "UPDATE users SET username = ?, role = ? WHERE username = ?",
-                        (new_username, new_role, username)
-                    )
+                    self.app.cursor.execute(USER_UPDATE, (new_username, new_role, username))
                 self.app.conn.commit()
+                # Senha, nome ou cargo mudaram: o desbloqueio rápido precisa da nova verificação
+                if unlock_cache is not None:
+                    unlock_cache.invalidate(username)
                 messagebox.showinfo("Sucesso", "Usuário atualizado com sucesso.")
                 self.load_users()
                 edit_user_window.destroy()
@@ -263,8 +260,10 @@ class UserManagementWindow:
         confirmation = messagebox.askyesno("Confirmação", f"Tem certeza de que deseja remover o usuário '{username}'?")
         if confirmation:
             try:
-                self.app.cursor.execute("DELETE FROM users WHERE username = ?", (username,))
+                self.app.cursor.execute(USER_DELETE, (username,))
                 self.app.conn.commit()
+                if unlock_cache is not None:
+                    unlock_cache.invalidate(username)
                 messagebox.showinfo("Sucesso", "Usuário removido com sucesso.")
                 self.load_users()
             except Exception as e:
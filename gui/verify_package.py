@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox
-from config import STATUS_PENDING, STATUS_COLLECTED, logging
+from config import STATUS_PENDING, STATUS_COLLECTED, SEARCH_MIN_LENGTH, SEARCH_DEBOUNCE_MS, SITE_ID, logging
 from utils import center_window
+from search import search_package_codes
+from repository import PackageRepository
 
 class VerifyPackageWindow:
     """
@@ -11,10 +13,14 @@ class VerifyPackageWindow:
         self.parent_app = parent_app
         self.conn = conn
         self.cursor = self.conn.cursor()
+        self.packages = PackageRepository(self.conn)
+        # Com outros sites configurados, códigos não encontrados aqui são procurados nos bancos deles
+        shards = getattr(parent_app, "shards", None)
+        self.shards = shards if shards is not None and len(shards) > 1 else None
 
         self.window = tk.Toplevel(self.parent_app.root)
         self.window.title(title)
-        self.window.geometry("500x450")
+        self.window.geometry("500x600")
         self.window.resizable(False, False)
         center_window(self.window)
 
@@ -41,6 +47,19 @@ class VerifyPackageWindow:
         )
         self.package_code_entry.pack(pady=5)
         self.package_code_entry.focus_set()
+        self.package_code_entry.bind('<KeyRelease>', self.schedule_search)
+
+        # Sugestões de códigos que contêm o trecho digitado (etiqueta rasgada, prefixo, etc.)
+        self.search_job = None
+        self.search_results = []
+        self.results_listbox = tk.Listbox(
+            main_frame,
+            font=("Helvetica", 11),
+            width=45,
+            height=8
+        )
+        self.results_listbox.pack(pady=5)
+        self.results_listbox.bind('<Double-Button-1>', self.select_search_result)
 
         verify_button = tk.Button(
             main_frame,
@@ -55,6 +74,48 @@ class VerifyPackageWindow:
 
         self.window.bind('<Return>', self.verify_package)
 
+    def schedule_search(self, event=None):
+        """
+        Agenda a busca por trecho do código, aguardando uma pausa na digitação.
+        """
+        if event is not None and event.keysym == 'Return':
+            return
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        """
+        Preenche a lista de sugestões com os códigos que contêm o trecho digitado.
+        """
+        self.search_job = None
+        term = self.package_code_entry.get().strip()
+        self.results_listbox.delete(0, tk.END)
+        self.search_results = []
+        if len(term) < SEARCH_MIN_LENGTH:
+            return
+
+        try:
+            self.search_results = search_package_codes(self.cursor, term)
+        except Exception as e:
+            logging.error("Erro ao buscar códigos: %s", e)
+            return
+
+        for codigo_pacote, transportadora, data in self.search_results:
+            self.results_listbox.insert(tk.END, f"{codigo_pacote}  -  {transportadora}  -  {data}")
+
+    def select_search_result(self, event=None):
+        """
+        Usa a sugestão selecionada como código e abre seus detalhes.
+        """
+        selection = self.results_listbox.curselection()
+        if not selection:
+            return
+        codigo_pacote = self.search_results[selection[0]][0]
+        self.package_code_entry.delete(0, tk.END)
+        self.package_code_entry.insert(0, codigo_pacote)
+        self.verify_package()
+
     def verify_package(self, event=None):
         """
         Verifica se o pedido foi registrado e exibe os detalhes.
@@ -65,30 +126,38 @@ class VerifyPackageWindow:
             self.package_code_entry.focus_set()
             return
 
+        codes_filter = getattr(self.parent_app, "registered_codes", None)
+        # O filtro garante que o código nunca foi registrado neste site: não é preciso consultar o banco
+        registered_here = codes_filter is None or codes_filter.might_contain(package_code)
+        if not registered_here and self.shards is None:
+            messagebox.showerror("Erro", f"Nenhum pedido encontrado com o Código {package_code}.")
+            return
+
         try:
-            # NOVO: incluir bipped_by
-            self.cursor.execute("""
-                SELECT codigo_pacote, transportadora, data, hora, status, coleta_number, bipped_by
-                FROM packages
-                WHERE codigo_pacote = ?
-            """, (package_code,))
-            result = self.cursor.fetchone()
-
-            if result:
-                codigo_pacote, transportadora, data, hora, status, coleta_number, bipped_by = result
-                status_text = "Bipado" if status == STATUS_PENDING else "Coleta Fechada"
-                coleta_status = "Aberta" if status == STATUS_PENDING else "Fechada"
+            site = SITE_ID
+            record = self.packages.latest(package_code) if registered_here else None
+            if record is None and self.shards is not None:
+                others = [other for other in self.shards.sites if other != SITE_ID]
+                found = self.shards.latest(package_code, sites=others)
+                if found:
+                    site, record = found
+
+            if record:
+                status_text = "Bipado" if record.status == STATUS_PENDING else "Coleta Fechada"
+                coleta_status = "Aberta" if record.status == STATUS_PENDING else "Fechada"
 
                 detalhes = [
-                    ("Código do Pacote", codigo_pacote),
-                    ("Transportadora", transportadora),
-                    ("Data do Bip", data),
-                    ("Hora do Bip", hora),
+                    ("Código do Pacote", record.codigo),
+                    ("Transportadora", record.transportadora),
+                    ("Data do Bip", record.data),
+                    ("Hora do Bip", record.hora),
                     ("Status do Pedido", status_text),
-                    ("Número da Coleta", coleta_number),
+                    ("Número da Coleta", record.coleta_numero),
                     ("Status da Coleta", coleta_status),
-                    ("Bipado Por", bipped_by if bipped_by else "")
+                    ("Bipado Por", record.bipped_by if record.bipped_by else "")
                 ]
+                if self.shards is not None:
+                    detalhes.append(("Site", site))
 
                 details_window = tk.Toplevel(self.window)
                 details_window.title("Detalhes do Pedido")
@@ -125,6 +194,12 @@ class VerifyPackageWindow:
                         bg="#f0f0f0",
                         anchor="w"
                     ).pack(side=tk.LEFT, padx=(5, 0))
+            elif self.shards is not None and self.shards.failed:
+                messagebox.showerror(
+                    "Erro",
+                    f"Nenhum pedido encontrado com o Código {package_code}.\n"
+                    f"Sites indisponíveis, não verificados: {', '.join(self.shards.failed)}"
+                )
             else:
                 messagebox.showerror("Erro", f"Nenhum pedido encontrado com o Código {package_code}.")
         except Exception as e:
@@ -7,7 +7,9 @@ import logging
 from tkcalendar import DateEntry  # Certifique-se de instalar o tkcalendar com 'pip install tkcalendar'
 
 from utils import center_window
-from config import logging
+from config import SITE_ID, logging
+from repository import PackageRepository
+from manifest import find_manifest, open_manifest
 
 class ViewTotalPackagesWindow:
     """
@@ -17,6 +19,13 @@ class ViewTotalPackagesWindow:
         self.parent_app = parent_app
         self.conn = parent_app.conn
         self.cursor = self.conn.cursor()
+        self.packages = PackageRepository(self.conn)
+        # Item da tabela -> PackageRecord exibido e site do pacote
+        self.records = {}
+        self.record_sites = {}
+        # Com outros sites configurados, a pesquisa pode consultar os bancos de todos eles
+        shards = getattr(parent_app, "shards", None)
+        self.shards = shards if shards is not None and len(shards) > 1 else None
 
         # Configuração da janela
         self.window = tk.Toplevel(self.parent_app.root)
@@ -100,6 +109,41 @@ class ViewTotalPackagesWindow:
         self.transportadora_menu.grid(row=1, column=1, padx=5, pady=5)
         self.transportadora_menu.current(0)  # Selecionar "Todas" por padrão
 
+        # Filtro por trecho do código (usa o índice de busca de códigos)
+        tk.Label(
+            filter_frame,
+            text="Código contém:",
+            font=("Helvetica", 12, "bold"),
+            bg="#f0f0f0"
+        ).grid(row=2, column=0, padx=5, pady=5, sticky="w")
+
+        self.code_entry = tk.Entry(
+            filter_frame,
+            font=("Helvetica", 12),
+            width=15
+        )
+        self.code_entry.grid(row=2, column=1, padx=5, pady=5)
+        self.code_entry.bind('<Return>', lambda e: self.search_packages())
+
+        # Filtro por site (apenas com outros sites configurados)
+        self.selected_site = tk.StringVar(value=SITE_ID)
+        if self.shards is not None:
+            tk.Label(
+                filter_frame,
+                text="Site:",
+                font=("Helvetica", 12, "bold"),
+                bg="#f0f0f0"
+            ).grid(row=3, column=0, padx=5, pady=5, sticky="w")
+
+            ttk.Combobox(
+                filter_frame,
+                textvariable=self.selected_site,
+                values=["Todos"] + self.shards.sites,
+                font=("Helvetica", 12),
+                state="readonly",
+                width=13
+            ).grid(row=3, column=1, padx=5, pady=5)
+
         # Botão de Pesquisa
         search_button = tk.Button(
             filter_frame,
@@ -112,12 +156,26 @@ class ViewTotalPackagesWindow:
         )
         search_button.grid(row=1, column=3, padx=5, pady=5)
 
+        # Reimpressão do manifesto da coleta do pacote selecionado
+        reprint_button = tk.Button(
+            filter_frame,
+            text="Reimprimir Manifesto",
+            command=self.reprint_manifest,
+            font=("Helvetica", 12, "bold"),
+            bg="#607D8B",
+            fg="white",
+            width=18
+        )
+        reprint_button.grid(row=2, column=3, padx=5, pady=5)
+
         # Frame para Treeview e Scrollbar
         treeview_frame = tk.Frame(main_frame, bg="#f0f0f0")
         treeview_frame.pack(fill=tk.BOTH, expand=True, pady=10)
 
         # Configuração do Treeview para exibir coletas
         columns = ("codigo_pacote", "transportadora", "data", "hora", "status", "coleta_number")
+        if self.shards is not None:
+            columns += ("site",)
         self.tree = ttk.Treeview(treeview_frame, columns=columns, show='headings')
 
         # Definir cabeçalhos
@@ -135,6 +193,9 @@ class ViewTotalPackagesWindow:
         self.tree.column("hora", width=80, anchor='center')
         self.tree.column("status", width=150, anchor='center')
         self.tree.column("coleta_number", width=150, anchor='center')
+        if self.shards is not None:
+            self.tree.heading("site", text="Site")
+            self.tree.column("site", width=100, anchor='center')
 
         # Adicionar a Treeview
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -152,20 +213,7 @@ class ViewTotalPackagesWindow:
         Carrega todas as coletas da transportadora selecionada sem filtros.
         """
         try:
-            self.cursor.execute("""
-                SELECT codigo_pacote, transportadora, data, hora, status, coleta_number 
-                FROM packages 
-                ORDER BY data DESC, hora DESC
-            """)
-            records = self.cursor.fetchall()
-
-            # Limpar a Treeview
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-
-            # Inserir registros na Treeview
-            for row in records:
-                self.tree.insert('', tk.END, values=row)
+            self.show_records(self.packages.iter_range())
         except Exception as e:
             logging.error("Erro ao carregar todas as coletas: %s", e)
             messagebox.showerror("Erro", f"Ocorreu um erro ao carregar as coletas: {str(e)}")
@@ -177,34 +225,77 @@ class ViewTotalPackagesWindow:
         start_date = self.start_date_entry.get_date().strftime('%Y-%m-%d')
         end_date = self.end_date_entry.get_date().strftime('%Y-%m-%d')
         transportadora = self.selected_transportadora.get()
+        code_term = self.code_entry.get().strip()
 
-        query = """
-            SELECT codigo_pacote, transportadora, data, hora, status, coleta_number 
-            FROM packages 
-            WHERE data BETWEEN ? AND ?
-        """
-        params = [start_date, end_date]
-
-        if transportadora != "Todas":
-            query += " AND transportadora = ?"
-            params.append(transportadora)
-
-        query += " ORDER BY data DESC, hora DESC"
+        transportadora = None if transportadora == "Todas" else transportadora
+        site = self.selected_site.get()
 
         try:
-            self.cursor.execute(query, tuple(params))
-            records = self.cursor.fetchall()
-
-            # Limpar a Treeview
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-
-            # Inserir registros na Treeview
-            for row in records:
-                self.tree.insert('', tk.END, values=row)
-
-            if not records:
+            if site == SITE_ID:
+                found = self.show_records(self.packages.iter_range(start_date, end_date, transportadora, code_term))
+            else:
+                # Bancos dos sites lidos somente para leitura, intercalados à medida que são exibidos
+                found = self.show_site_records(self.shards.iter_range(
+                    start_date, end_date, transportadora, code_term, sites=None if site == "Todos" else [site]
+                ))
+                if self.shards.failed:
+                    messagebox.showwarning(
+                        "Aviso", "Sites indisponíveis, fora do resultado: " + ", ".join(self.shards.failed)
+                    )
+            if not found:
                 messagebox.showinfo("Informação", "Nenhuma coleta encontrada com os critérios selecionados.")
         except Exception as e:
             logging.error("Erro ao pesquisar coletas: %s", e)
             messagebox.showerror("Erro", f"Ocorreu um erro ao pesquisar as coletas: {str(e)}")
+
+    def show_records(self, records):
+        """
+        Substitui o conteúdo da tabela pelos registros deste site. Retorna a quantidade exibida.
+        """
+        return self.show_site_records((SITE_ID, record) for record in records)
+
+    def show_site_records(self, site_records):
+        """
+        Substitui o conteúdo da tabela pelos pares (site, registro). Retorna a quantidade exibida.
+        """
+        self.tree.delete(*self.tree.get_children())
+        self.records = {}
+        self.record_sites = {}
+        for site, record in site_records:
+            values = (
+                record.codigo, record.transportadora, record.data, record.hora, record.status, record.coleta_numero
+            )
+            if self.shards is not None:
+                values += (site,)
+            item = self.tree.insert('', tk.END, values=values)
+            self.records[item] = record
+            self.record_sites[item] = site
+        return len(self.records)
+
+    def reprint_manifest(self):
+        """
+        Abre para impressão o manifesto gerado no fechamento da coleta do pacote selecionado.
+        """
+        selected_item = self.tree.selection()
+        if not selected_item:
+            messagebox.showwarning("Aviso", "Selecione um pacote da coleta para reimprimir o manifesto.")
+            return
+
+        record = self.records[selected_item[0]]
+        site = self.record_sites[selected_item[0]]
+        if site != SITE_ID:
+            messagebox.showwarning("Aviso", f"O manifesto desta coleta foi gerado no site {site}; reimprima por lá.")
+            return
+        try:
+            html_path = find_manifest(
+                self.cursor, record.transportadora, record.data, record.coleta_numero, self.parent_app.manifest_dir
+            )
+            if html_path is None:
+                messagebox.showwarning(
+                    "Aviso", f"A coleta {record.coleta_numero} de {record.transportadora} ainda não foi fechada."
+                )
+                return
+            open_manifest(html_path)
+        except Exception as e:
+            logging.error("Erro ao reimprimir o manifesto: %s", e)
+            messagebox.showerror("Erro", f"Ocorreu um erro ao abrir o manifesto: {str(e)}")
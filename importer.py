@@ -0,0 +1,61 @@
+# importer.py
+
+from config import IMPORT_BATCH_SIZE
+from duplicates import DuplicatePolicy
+from package_codes import check_code
+from repository import PackageRepository
+from scan_events import OUTCOME_OK, OUTCOME_DUPLICATE
+
+
+class BatchImporter:
+    """
+    Registra códigos vindos de fora da tela de bipagem (arquivo, fotos de etiquetas) com as mesmas
+    validações e a mesma política de duplicados. Os códigos aceitos são gravados em lotes de
+    `batch_size`, uma transação por transportadora; chame `flush` ao final para gravar o restante.
+    Com `dry_run`, apenas valida.
+    """
+    def __init__(self, conn, operator, transportadora=None, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.packages = PackageRepository(conn)
+        self.cursor = conn.cursor()
+        self.policy = DuplicatePolicy()
+        self.operator = operator
+        self.transportadora = transportadora
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.pending = {}   # transportadora -> códigos aceitos ainda não gravados
+        self.seen = set()   # (transportadora, código) aceitos que ainda não estão no banco
+        self.imported = 0
+        self.rejected = 0
+
+    def add(self, codigo):
+        """
+        Valida o código e o enfileira para gravação. Retorna (resultado, transportadora detectada);
+        OUTCOME_OK quando aceito.
+        """
+        outcome, transportadora = check_code(codigo, self.transportadora)
+        if outcome == OUTCOME_OK:
+            key = (transportadora, codigo)
+            # Lotes anteriores já estão no banco; repetições dentro do lote são vistas aqui
+            if key in self.seen or self.policy.find_duplicate(self.cursor, transportadora, codigo):
+                outcome = OUTCOME_DUPLICATE
+        if outcome != OUTCOME_OK:
+            self.rejected += 1
+            return outcome, transportadora
+
+        self.seen.add(key)
+        self.pending.setdefault(transportadora, []).append(codigo)
+        self.imported += 1
+        if sum(len(codigos) for codigos in self.pending.values()) >= self.batch_size:
+            self.flush()
+        return outcome, transportadora
+
+    def flush(self):
+        """
+        Grava os códigos aceitos e ainda pendentes.
+        """
+        for transportadora, codigos in self.pending.items():
+            if not self.dry_run:
+                self.packages.insert_many(transportadora, codigos, self.operator)
+        self.pending = {}
+        if not self.dry_run:
+            self.seen = set()
@@ -0,0 +1,294 @@
+# journal.py
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    JOURNAL_DIR, JOURNAL_FSYNC_SECONDS, JOURNAL_RETRY_SECONDS, JOURNAL_COMPACT_BYTES,
+    STATION_ID, logging
+)
+from coletas import begin_immediate, register_package
+from queries import JOURNAL_EXACT, JOURNAL_SEED_DAY
+
+# Resultado da replicação de um registro do diário
+APPLIED = "applied"
+ALREADY_PRESENT = "already_present"
+CONFLICT = "conflict"
+
+
+def apply_record(conn, record, policy=None):
+    """
+    Replica um registro do diário no banco central de forma idempotente.
+    Se o mesmo registro já está no banco (ex.: replicação interrompida antes de marcar o
+    registro como sincronizado), nada é gravado. Se outro registro torna o código duplicado
+    pela política de duplicados (ex.: outra estação bipou durante a queda), é um conflito.
+    As verificações e a gravação ocorrem na mesma transação de escrita: duas estações replicando
+    ao mesmo tempo (ou uma bipagem concorrente) não gravam o mesmo código duas vezes.
+    """
+    cursor = conn.cursor()
+    try:
+        begin_immediate(conn)
+        key = (record["codigo"], record["data"], record["transportadora"], record["hora"], record["bipped_by"])
+        cursor.execute(JOURNAL_EXACT, key)
+        existing = cursor.fetchone()
+        if existing:
+            conn.rollback()
+            return ALREADY_PRESENT, existing
+
+        if policy is not None:
+            existing = policy.find_duplicate(cursor, record["transportadora"], record["codigo"], record["data"])
+            if existing:
+                conn.rollback()
+                return CONFLICT, existing
+
+        # register_package continua a transação já iniciada e faz o commit
+        now = datetime.datetime.fromisoformat(f"{record['data']}T{record['hora']}")
+        register_package(conn, record["transportadora"], record["codigo"], record["bipped_by"], now=now)
+        return APPLIED, None
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+class ScanJournal:
+    """
+    Diário local (append-only) de bipagens desta estação.
+    A bipagem é confirmada assim que é escrita no arquivo local; uma thread em segundo plano
+    faz o fsync em lotes e replica os registros no banco central, tolerando quedas da rede.
+    `connect` é a função que abre a conexão com o banco central e `policy` a política de duplicados
+    usada para detectar conflitos na replicação.
+    """
+    def __init__(self, db_path, journal_dir=JOURNAL_DIR, station=STATION_ID, connect=None, policy=None):
+        self.db_path = db_path
+        self.station = station
+        self.policy = policy
+        self.connect = connect or (lambda: sqlite3.connect(self.db_path, timeout=10))
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = os.path.join(journal_dir, f"{station}.log")
+        self.synced_path = os.path.join(journal_dir, f"{station}.synced")
+        self.conflicts_path = os.path.join(journal_dir, f"{station}.conflicts")
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.online = True
+        self.dirty = False
+        self.last_error = None
+        self.conflicts = []
+        self.seen = set()       # (data, transportadora, código) bipados por esta estação ou vistos no banco
+        self.pending = []       # registros ainda não replicados, em ordem
+
+        self.synced_seq = self._read_synced_seq()
+        self.seq = self.synced_seq
+        self._load_pending()
+        self.file = open(self.journal_path, "a", encoding="utf-8")
+
+        self.thread = threading.Thread(target=self._run, name="scan-journal", daemon=True)
+        self.thread.start()
+
+    def _read_synced_seq(self):
+        try:
+            with open(self.synced_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_synced_seq(self, seq):
+        tmp_path = self.synced_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.synced_path)
+
+    def _load_pending(self):
+        """
+        Recupera do arquivo os registros que ainda não foram replicados (ex.: após uma queda).
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta de uma gravação interrompida
+                    logging.warning("Diário de bipagens: linha inválida ignorada.")
+                    continue
+                self.seq = max(self.seq, record["seq"])
+                if record["seq"] > self.synced_seq:
+                    self.pending.append(record)
+                    self.seen.add((record["data"], record["transportadora"], record["codigo"]))
+
+    def seed_seen(self, cursor, data):
+        """
+        Carrega no conjunto local os códigos já gravados no banco no dia, para que a checagem
+        de duplicados continue funcionando se o banco central ficar inacessível.
+        """
+        cursor.execute(JOURNAL_SEED_DAY, (data,))
+        with self.lock:
+            self.seen.update(cursor.fetchall())
+
+    def is_duplicate(self, data, transportadora, codigo):
+        with self.lock:
+            return (data, transportadora, codigo) in self.seen
+
+    def append(self, transportadora, codigo, bipped_by):
+        """
+        Escreve a bipagem no diário local e agenda a replicação. Retorna o registro.
+        """
+        now = datetime.datetime.now()
+        with self.lock:
+            self.seq += 1
+            record = {
+                "seq": self.seq,
+                "codigo": codigo,
+                "transportadora": transportadora,
+                "bipped_by": bipped_by,
+                "data": now.date().isoformat(),
+                "hora": now.strftime("%H:%M:%S"),
+                "station": self.station,
+            }
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.dirty = True
+            self.pending.append(record)
+            self.seen.add((record["data"], transportadora, codigo))
+        self.wakeup.set()
+        return record
+
+    def pending_records(self, transportadora=None, data=None):
+        """
+        Registros ainda não replicados, opcionalmente filtrados por transportadora e data.
+        """
+        with self.lock:
+            return [
+                r for r in self.pending
+                if (transportadora is None or r["transportadora"] == transportadora)
+                and (data is None or r["data"] == data)
+            ]
+
+    def sync_now(self, timeout=5):
+        """
+        Pede a replicação imediata e aguarda até `timeout` segundos. Retorna True se não há pendências.
+        """
+        self.wakeup.set()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not self.pending:
+                    return True
+            time.sleep(0.05)
+        with self.lock:
+            return not self.pending
+
+    def close(self, timeout=5):
+        """
+        Tenta replicar as pendências e encerra a thread; o que restar fica no diário para a próxima execução.
+        """
+        # Sem conexão não adianta esperar: as pendências ficam no diário
+        self.sync_now(timeout if self.online else 0)
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join(timeout)
+        with self.lock:
+            self._fsync()
+            self.file.close()
+
+    def _fsync(self):
+        if self.dirty:
+            os.fsync(self.file.fileno())
+            self.dirty = False
+
+    def _run(self):
+        conn = None
+        while not self.stopping:
+            self.wakeup.wait(JOURNAL_FSYNC_SECONDS)
+            self.wakeup.clear()
+
+            with self.lock:
+                try:
+                    self._fsync()
+                except OSError as e:
+                    logging.error("Erro ao sincronizar o diário de bipagens em disco: %s", e)
+                batch = list(self.pending)
+            if not batch:
+                continue
+
+            was_online = self.online
+            try:
+                if conn is None:
+                    conn = self.connect()
+                self._replicate(conn, batch)
+                if not was_online:
+                    logging.info("Banco central acessível novamente; diário de bipagens replicado.")
+                self.last_error = None
+            except Exception as e:
+                if self.online:
+                    logging.error("Banco central inacessível, bipagens mantidas no diário local: %s", e)
+                self.online = False
+                self.last_error = str(e)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                self.wakeup.wait(JOURNAL_RETRY_SECONDS)
+
+        if conn is not None:
+            conn.close()
+
+    def _replicate(self, conn, batch):
+        # A posição sincronizada é gravada uma vez por lote; se o processo cair no meio,
+        # os registros já aplicados são reconhecidos como ALREADY_PRESENT na próxima execução.
+        synced_seq = self.synced_seq
+        try:
+            for record in batch:
+                result, existing = apply_record(conn, record, self.policy)
+                self.online = True
+                if result == CONFLICT:
+                    self._report_conflict(record, existing)
+                with self.lock:
+                    self.pending.remove(record)
+                    self.synced_seq = record["seq"]
+        finally:
+            if self.synced_seq != synced_seq:
+                self._write_synced_seq(self.synced_seq)
+        self._compact()
+
+    def _report_conflict(self, record, existing):
+        transportadora, data, hora, bipped_by = existing
+        message = (
+            f"{record['codigo']}: bipado por {record['bipped_by']} em {record['data']} {record['hora']} "
+            f"({record['station']}), mas já registrado por {bipped_by} em {data} {hora} ({transportadora})"
+        )
+        logging.warning("Conflito na replicação do diário de bipagens: %s", message)
+        with self.lock:
+            self.conflicts.append(message)
+        with open(self.conflicts_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"record": record, "existing": list(existing)}, ensure_ascii=False) + "\n")
+
+    def _compact(self):
+        """
+        Esvazia o arquivo do diário quando tudo já foi replicado e ele passou do tamanho limite.
+        """
+        with self.lock:
+            if self.pending or self.file.tell() < JOURNAL_COMPACT_BYTES:
+                return
+            self._fsync()
+            self.file.close()
+            self.file = open(self.journal_path, "w", encoding="utf-8")
+
+    def take_conflicts(self):
+        """
+        Retorna e limpa os conflitos acumulados desde a última chamada.
+        """
+        with self.lock:
+            conflicts, self.conflicts = self.conflicts, []
+        return conflicts
@@ -0,0 +1,240 @@
+# live_stats.py
+
+import collections
+import datetime
+import sqlite3
+import threading
+
+from config import (
+    STATION_ID, STATUS_PENDING, STATUS_COLLECTED, DASHBOARD_REMOTE_SECONDS, DASHBOARD_RATE_WINDOW_SECONDS,
+    logging
+)
+from events import EVENT_SCAN, EVENT_REMOVE, EVENT_CLOSE, EVENT_REOPEN
+from scan_events import OUTCOME_OK, day_bounds_us
+from queries import (
+    DASHBOARD_COLETAS, DASHBOARD_OPERATORS, DASHBOARD_RECENT_SCANS,
+    FEED_MAX_EVENT_ID, FEED_NEW_EVENTS, FEED_COLETAS
+)
+
+
+class OperatorLive:
+    __slots__ = ("scans", "last_ts", "recent")
+
+    def __init__(self):
+        self.scans = 0
+        self.last_ts = None
+        self.recent = collections.deque()   # horários das bipagens dentro da janela de taxa
+
+
+class DashboardModel:
+    """
+    Contadores do painel ao vivo para um dia: pacotes por coleta de cada transportadora e
+    bipagens por operador. É carregado do banco uma vez (`load`) e depois atualizado
+    incrementalmente pelos eventos (`apply`), sem consultar o banco.
+    Fechar e reabrir são idempotentes, então o mesmo evento vindo da estação local e da
+    leitura das outras estações não é contado duas vezes.
+    """
+    def __init__(self, data=None, rate_window=DASHBOARD_RATE_WINDOW_SECONDS):
+        self.data = data or datetime.date.today().isoformat()
+        self.rate_window = rate_window
+        self.carriers = {}      # transportadora -> {numero: [status, package_count]}
+        self.operators = {}     # operador -> OperatorLive
+        self.recent = collections.deque()
+
+    def load(self, cursor, journal_records=()):
+        """
+        Carrega o estado do dia a partir do banco e das bipagens ainda no diário local.
+        """
+        self.carriers = {}
+        self.operators = {}
+        self.recent = collections.deque()
+
+        cursor.execute(DASHBOARD_COLETAS, (self.data,))
+        for transportadora, numero, status, package_count in cursor.fetchall():
+            self.carriers.setdefault(transportadora, {})[numero] = [status, package_count]
+
+        cursor.execute(DASHBOARD_OPERATORS, (self.data,))
+        for operator, scans, last_hora in cursor.fetchall():
+            live = self.operators.setdefault(operator, OperatorLive())
+            live.scans = scans
+            live.last_ts = self._timestamp(last_hora)
+
+        # A taxa recente vem das tentativas aceitas registradas em scan_events
+        start_us, end_us = day_bounds_us(self.data, self.data)
+        window_start_us = max(start_us, int((datetime.datetime.now().timestamp() - self.rate_window) * 1e6))
+        cursor.execute(DASHBOARD_RECENT_SCANS, (window_start_us, end_us, OUTCOME_OK))
+        for ts_us, operator in cursor.fetchall():
+            ts = ts_us / 1e6
+            self.recent.append(ts)
+            self.operators.setdefault(operator, OperatorLive()).recent.append(ts)
+
+        for record in journal_records:
+            if record["data"] == self.data:
+                self._scan(record["transportadora"], None, record["bipped_by"], self._timestamp(record["hora"]), False)
+
+    def _timestamp(self, hora):
+        if not hora:
+            return None
+        return datetime.datetime.fromisoformat(f"{self.data}T{hora}").timestamp()
+
+    def _current_coleta(self, transportadora):
+        coletas = self.carriers.setdefault(transportadora, {})
+        pending = [numero for numero, (status, _) in coletas.items() if status == STATUS_PENDING]
+        if pending:
+            return coletas[max(pending)]
+        # Mesma regra de coletas.get_or_open_coleta: abre a próxima coleta do dia
+        numero = max(coletas, default=0) + 1
+        coletas[numero] = [STATUS_PENDING, 0]
+        return coletas[numero]
+
+    def _scan(self, transportadora, numero, operator, ts, count_rate=True):
+        coletas = self.carriers.setdefault(transportadora, {})
+        coleta = coletas.get(numero) if numero is not None else None
+        if coleta is None:
+            coleta = self._current_coleta(transportadora)
+        coleta[1] += 1
+
+        live = self.operators.setdefault(operator, OperatorLive())
+        live.scans += 1
+        if ts is not None:
+            live.last_ts = max(live.last_ts or ts, ts)
+            if count_rate:
+                live.recent.append(ts)
+                self.recent.append(ts)
+
+    def apply(self, event):
+        """
+        Aplica um evento do barramento. Retorna o conjunto de chaves alteradas,
+        ("carrier", transportadora) ou ("operator", operador), para redesenho parcial.
+        """
+        data = event.data
+        transportadora = data.get("transportadora")
+
+        if event.kind == EVENT_SCAN:
+            if datetime.date.fromtimestamp(event.ts).isoformat() != self.data:
+                return set()
+            self._scan(transportadora, data.get("numero"), data.get("operator"), event.ts)
+            return {("carrier", transportadora), ("operator", data.get("operator"))}
+
+        if data.get("data", self.data) != self.data:
+            return set()
+        coletas = self.carriers.setdefault(transportadora, {})
+
+        if event.kind == EVENT_REMOVE:
+            coleta = coletas.get(data.get("numero"))
+            if coleta is not None and coleta[1] > 0:
+                coleta[1] -= 1
+        elif event.kind == EVENT_CLOSE:
+            for numero, package_count in data["coletas"]:
+                coletas[numero] = [STATUS_COLLECTED, package_count]
+        elif event.kind == EVENT_REOPEN:
+            coletas[data["numero"]] = [STATUS_PENDING, data["package_count"]]
+        else:
+            return set()
+        return {("carrier", transportadora)}
+
+    def carrier_summary(self, transportadora):
+        """
+        (pacotes em coletas abertas, pacotes coletados, número da coleta aberta atual ou None)
+        """
+        coletas = self.carriers.get(transportadora, {})
+        pending = sum(count for status, count in coletas.values() if status == STATUS_PENDING)
+        collected = sum(count for status, count in coletas.values() if status == STATUS_COLLECTED)
+        open_numbers = [numero for numero, (status, _) in coletas.items() if status == STATUS_PENDING]
+        return pending, collected, max(open_numbers) if open_numbers else None
+
+    def _trim(self, recent, now):
+        while recent and recent[0] < now - self.rate_window:
+            recent.popleft()
+
+    def scans_per_minute(self, operator=None, now=None):
+        """
+        Bipagens por minuto na janela de taxa, de um operador ou da operação toda.
+        """
+        now = now if now is not None else datetime.datetime.now().timestamp()
+        recent = self.recent if operator is None else self.operators[operator].recent
+        self._trim(recent, now)
+        return len(recent) * 60 / self.rate_window
+
+
+class RemoteFeed:
+    """
+    Publica no barramento as operações feitas por outras estações no banco compartilhado:
+    bipagens aceitas (lidas de scan_events) e fechamentos/reaberturas de coletas do dia.
+    O banco só é lido quando PRAGMA data_version indica gravação de outra conexão.
+    """
+    def __init__(self, db_path, bus, station=STATION_ID, interval=DASHBOARD_REMOTE_SECONDS):
+        self.db_path = db_path
+        self.bus = bus
+        self.station = station
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="dashboard-feed", daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(2)
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+        except Exception as e:
+            logging.error("Painel ao vivo: erro ao abrir o banco: %s", e)
+            return
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(FEED_MAX_EVENT_ID)
+            last_id = cursor.fetchone()[0]
+            data = datetime.date.today().isoformat()
+            coletas = self._coletas(cursor, data)
+            data_version = None
+
+            while not self.stopping.wait(self.interval):
+                cursor.execute("PRAGMA data_version")
+                current = cursor.fetchone()[0]
+                if current == data_version:
+                    continue
+                data_version = current
+
+                cursor.execute(FEED_NEW_EVENTS, (last_id, OUTCOME_OK))
+                for event_id, ts_us, codigo, transportadora, operator, station in cursor.fetchall():
+                    last_id = event_id
+                    if station != self.station:
+                        self.bus.publish(
+                            EVENT_SCAN, station=station, ts=ts_us / 1e6,
+                            transportadora=transportadora, codigo=codigo, operator=operator, numero=None
+                        )
+
+                today = datetime.date.today().isoformat()
+                if today != data:
+                    data, coletas = today, {}
+                current_coletas = self._coletas(cursor, data)
+                self._publish_transitions(data, coletas, current_coletas)
+                coletas = current_coletas
+        except Exception as e:
+            logging.error("Painel ao vivo: erro ao ler as outras estações: %s", e)
+        finally:
+            conn.close()
+
+    def _coletas(self, cursor, data):
+        cursor.execute(FEED_COLETAS, (data,))
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def _publish_transitions(self, data, before, after):
+        for coleta_id, (transportadora, numero, status, package_count) in after.items():
+            previous = before.get(coleta_id)
+            if previous is None or previous[2] == status:
+                continue
+            if status == STATUS_COLLECTED:
+                self.bus.publish(EVENT_CLOSE, station=None, transportadora=transportadora, data=data,
+                                 coletas=[(numero, package_count)])
+            else:
+                self.bus.publish(EVENT_REOPEN, station=None, transportadora=transportadora, data=data,
+                                 numero=numero, package_count=package_count)
@@ -0,0 +1,359 @@
+# maintenance.py
+
+import datetime
+import sqlite3
+import threading
+import time
+
+from config import (
+    STATION_ID, MAINTENANCE_IDLE_SECONDS, MAINTENANCE_POLL_SECONDS, MAINTENANCE_STEP_SECONDS,
+    MAINTENANCE_JOB_SECONDS, MAINTENANCE_RETRY_SECONDS, MAINTENANCE_VACUUM_PAGES,
+    MAINTENANCE_CONVERT_FREE_RATIO, MAINTENANCE_ANALYSIS_LIMIT, MAINTENANCE_INTERVALS, logging
+)
+from queries import (
+    MAINTENANCE_LAST_SCAN, MAINTENANCE_RUNS, MAINTENANCE_CLAIM, MAINTENANCE_FINISH, MAINTENANCE_TABLES
+)
+from scan_events import now_us
+
+JOB_VACUUM = "incremental_vacuum"
+JOB_OPTIMIZE = "optimize"
+JOB_CHECKPOINT = "wal_checkpoint"
+JOB_INTEGRITY = "quick_check"
+
+# PRAGMA auto_vacuum
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Instruções da máquina virtual do SQLite entre verificações do prazo e de bipagens
+_PROGRESS_INSTRUCTIONS = 10_000
+
+
+class MaintenanceInterrupted(Exception):
+    """
+    A tarefa foi interrompida por uma bipagem ou pelo fim do tempo disponível.
+    """
+
+
+def _timestamp():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def database_metrics(cursor):
+    """
+    Tamanho do banco e páginas livres (espaço deixado por remoções, reaproveitável ou
+    devolvível ao sistema pelo vacuum).
+    """
+    page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+    page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    return {
+        "size_bytes": page_size * page_count,
+        "page_count": page_count,
+        "free_pages": free_pages,
+        "free_ratio": free_pages / page_count if page_count else 0.0,
+    }
+
+
+def format_metrics(metrics):
+    text = (f"banco {metrics['size_bytes'] / 2**20:.1f} MiB, {metrics['page_count']} páginas, "
+            f"{metrics['free_ratio']:.1%} livres")
+    if metrics.get("fragmentation") is not None:
+        text += f", {metrics['fragmentation']:.1%} fora de ordem"
+    return text
+
+
+class _Budget:
+    """
+    Limites de tempo de uma tarefa: cada etapa (uma instrução SQL, que segura o banco) termina até
+    `step_seconds` e a tarefa inteira até `job_seconds`; `should_yield()` verdadeiro interrompe na hora.
+    Sem limites (None), a tarefa roda até o fim (linha de comando). `metrics` recebe métricas
+    extras medidas pela tarefa.
+    """
+    def __init__(self, conn, step_seconds, job_seconds, should_yield):
+        self.conn = conn
+        self.step_seconds = step_seconds
+        self.should_yield = should_yield or (lambda: False)
+        self.job_deadline = time.monotonic() + job_seconds if job_seconds else None
+        self.deadline = None
+        self.metrics = {}
+
+    def _expired(self):
+        return self.should_yield() or (self.deadline is not None and time.monotonic() > self.deadline)
+
+    def run(self, sql):
+        """
+        Executa uma etapa e retorna todas as linhas, ou levanta MaintenanceInterrupted.
+        """
+        if self.should_yield():
+            raise MaintenanceInterrupted("bipagem em andamento")
+        self.deadline = self.job_deadline
+        if self.step_seconds:
+            step_deadline = time.monotonic() + self.step_seconds
+            self.deadline = min(self.deadline or step_deadline, step_deadline)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise MaintenanceInterrupted("tempo esgotado")
+        self.conn.set_progress_handler(self._expired, _PROGRESS_INSTRUCTIONS)
+        try:
+            return self.conn.execute(sql).fetchall()
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                raise MaintenanceInterrupted(
+                    "bipagem em andamento" if self.should_yield() else "tempo esgotado"
+                ) from e
+            raise
+        finally:
+            self.conn.set_progress_handler(None, 0)
+            self.deadline = None
+
+
+def incremental_vacuum(conn, budget, convert=False):
+    """
+    Devolve as páginas livres ao sistema em etapas de MAINTENANCE_VACUUM_PAGES páginas. Um banco sem
+    auto_vacuum incremental é convertido (VACUUM completo) quando as páginas livres passam de
+    MAINTENANCE_CONVERT_FREE_RATIO ou com `convert`; em um banco grande a conversão não cabe no tempo
+    de uma etapa e fica para `python -m contador maintenance --convert`, fora do expediente.
+    """
+    cursor = conn.cursor()
+    mode = cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != AUTO_VACUUM_INCREMENTAL:
+        metrics = database_metrics(cursor)
+        if not convert and metrics["free_ratio"] < MAINTENANCE_CONVERT_FREE_RATIO:
+            return f"auto_vacuum não incremental, {metrics['free_pages']} páginas livres (abaixo do limite de conversão)"
+        budget.run(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        try:
+            budget.run("VACUUM")
+        except MaintenanceInterrupted as e:
+            raise MaintenanceInterrupted(f"{e}; converta com python -m contador maintenance --convert") from e
+        return f"banco convertido para auto_vacuum incremental ({metrics['free_pages']} páginas livres devolvidas)"
+
+    initial = free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    while free_pages:
+        try:
+            budget.run(f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})")
+        except MaintenanceInterrupted as e:
+            raise MaintenanceInterrupted(f"{e}, {initial - free_pages} de {initial} páginas devolvidas") from e
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    return f"{initial} páginas devolvidas"
+
+
+def optimize(conn, budget):
+    """
+    Atualiza as estatísticas do planejador de consultas. A primeira vez roda ANALYZE; depois
+    PRAGMA optimize, que só reanalisa as tabelas que mudaram. analysis_limit limita o trabalho.
+    """
+    budget.run(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if has_stats:
+        budget.run("PRAGMA optimize")
+        return "PRAGMA optimize"
+    budget.run("ANALYZE")
+    return "ANALYZE (primeira execução)"
+
+
+def wal_checkpoint(conn, budget):
+    """
+    Copia o WAL para o banco e trunca o arquivo -wal. Sem efeito no modo de journal padrão.
+    """
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if mode.lower() != "wal":
+        return f"journal_mode={mode}, sem WAL"
+    busy, log_pages, checkpointed = budget.run("PRAGMA wal_checkpoint(TRUNCATE)")[0]
+    if busy:
+        raise MaintenanceInterrupted("WAL em uso por outra conexão")
+    return f"{checkpointed} de {log_pages} páginas do WAL copiadas"
+
+
+def fragmentation(conn, budget):
+    """
+    Fração das páginas de tabelas e índices que não seguem a página anterior no arquivo (leituras em
+    ordem viram saltos no disco), pela tabela virtual dbstat. None se o SQLite não tiver dbstat.
+    """
+    try:
+        rows = budget.run("SELECT name, pageno FROM dbstat")
+    except sqlite3.OperationalError:
+        return None
+    out_of_order = 0
+    previous_name = previous_page = None
+    for name, pageno in rows:
+        if name == previous_name and pageno != previous_page + 1:
+            out_of_order += 1
+        previous_name, previous_page = name, pageno
+    return out_of_order / len(rows) if rows else 0.0
+
+
+def quick_check(conn, budget):
+    """
+    PRAGMA quick_check tabela por tabela (cada tabela com seus índices é uma etapa) e medida da
+    fragmentação. Problemas encontrados são registrados como erro no log.
+    """
+    tables = [name for (name,) in conn.execute(MAINTENANCE_TABLES)]
+    problems = []
+    for table in tables:
+        result = budget.run(f'PRAGMA quick_check("{table}")')
+        problems.extend(row[0] for row in result if row[0] != "ok")
+    budget.metrics["fragmentation"] = fragmentation(conn, budget)
+    if problems:
+        logging.error("Manutenção: quick_check encontrou problemas no banco: %s", "; ".join(problems[:20]))
+        return f"{len(problems)} problema(s): " + "; ".join(problems[:5])
+    return f"ok ({len(tables)} tabelas)"
+
+
+JOBS = {
+    JOB_VACUUM: incremental_vacuum,
+    JOB_OPTIMIZE: optimize,
+    JOB_CHECKPOINT: wal_checkpoint,
+    JOB_INTEGRITY: quick_check,
+}
+
+
+def run_job(conn, job, step_seconds=MAINTENANCE_STEP_SECONDS, job_seconds=MAINTENANCE_JOB_SECONDS,
+            should_yield=None, **options):
+    """
+    Executa uma tarefa de manutenção e registra no log o resultado, o tempo e as métricas do banco.
+    Retorna (concluída, resultado).
+    """
+    if conn.in_transaction:
+        conn.commit()
+    budget = _Budget(conn, step_seconds, job_seconds, should_yield)
+    start = time.perf_counter()
+    try:
+        result = JOBS[job](conn, budget, **options)
+        completed = True
+    except MaintenanceInterrupted as e:
+        result = f"interrompida: {e}"
+        completed = False
+    except sqlite3.Error as e:
+        logging.error("Erro na manutenção %s: %s", job, e)
+        result = f"erro: {e}"
+        completed = False
+    metrics = database_metrics(conn.cursor())
+    metrics.update(budget.metrics)
+    logging.info(
+        "Manutenção %s: %s em %.1f s; %s", job, result, time.perf_counter() - start, format_metrics(metrics)
+    )
+    return completed, result
+
+
+def record_finished(conn, job, result, station=STATION_ID):
+    """
+    Registra a conclusão de uma tarefa em maintenance_runs.
+    """
+    conn.execute(MAINTENANCE_CLAIM, (job, _timestamp(), station))
+    conn.execute(MAINTENANCE_FINISH, (_timestamp(), result, job))
+    conn.commit()
+
+
+def due_jobs(conn, now=None):
+    """
+    Tarefas cujo intervalo (MAINTENANCE_INTERVALS) passou e que não foram iniciadas há pouco
+    por esta ou por outra estação.
+    """
+    now = now or datetime.datetime.now()
+    runs = {job: (started, finished) for job, started, finished in conn.execute(MAINTENANCE_RUNS)}
+    due = []
+    for job, interval in MAINTENANCE_INTERVALS.items():
+        started, finished = runs.get(job, (None, None))
+        if finished and now - datetime.datetime.fromisoformat(finished) < datetime.timedelta(seconds=interval):
+            continue
+        if started and now - datetime.datetime.fromisoformat(started) < datetime.timedelta(seconds=MAINTENANCE_RETRY_SECONDS):
+            continue
+        due.append(job)
+    return due
+
+
+class MaintenanceScheduler:
+    """
+    Roda as tarefas de manutenção do banco (incremental_vacuum, optimize, wal_checkpoint, quick_check)
+    em segundo plano, com conexão própria, nos períodos ociosos: sem bipagens nesta estação
+    (`notify_activity`) nem em outras (tabela scan_events) há MAINTENANCE_IDLE_SECONDS.
+
+    Cada etapa segura o banco por no máximo MAINTENANCE_STEP_SECONDS, menos que a espera das outras
+    estações por um banco ocupado; uma bipagem nesta estação interrompe a etapa em andamento na hora.
+    Tarefas interrompidas são retomadas no próximo período ocioso. A tabela maintenance_runs evita que
+    duas estações rodem a mesma tarefa.
+    """
+    def __init__(self, db_path, station=STATION_ID, idle_seconds=MAINTENANCE_IDLE_SECONDS,
+                 poll_seconds=MAINTENANCE_POLL_SECONDS):
+        self.db_path = db_path
+        self.station = station
+        self.idle_seconds = idle_seconds
+        self.poll_seconds = poll_seconds
+        self.last_activity = time.monotonic()
+        self.activity = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def notify_activity(self):
+        """
+        Chamado a cada bipagem: adia a manutenção e interrompe a etapa em andamento.
+        """
+        self.last_activity = time.monotonic()
+        self.activity.set()
+
+    def close(self, timeout=5):
+        self.stop_event.set()
+        self.activity.set()
+        self.thread.join(timeout)
+
+    def _should_yield(self):
+        return self.activity.is_set()
+
+    def _idle(self, conn):
+        if time.monotonic() - self.last_activity < self.idle_seconds:
+            return False
+        last_scan = conn.execute(MAINTENANCE_LAST_SCAN).fetchone()[0]
+        return last_scan is None or now_us() - last_scan >= self.idle_seconds * 1_000_000
+
+    def _claim(self, conn, job):
+        """
+        Reserva a tarefa em uma transação. Retorna False se outra estação a reservou antes.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if job not in due_jobs(conn):
+                conn.rollback()
+                return False
+            conn.execute(MAINTENANCE_CLAIM, (job, _timestamp(), self.station))
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+    def run_idle_window(self, conn):
+        """
+        Roda as tarefas pendentes enquanto não houver bipagens.
+        """
+        self.activity.clear()
+        for job in due_jobs(conn):
+            if self.activity.is_set() or self.stop_event.is_set():
+                return
+            if not self._claim(conn, job):
+                continue
+            completed, result = run_job(conn, job, should_yield=self._should_yield)
+            if completed:
+                record_finished(conn, job, result, self.station)
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, uri=True)
+        except sqlite3.Error as e:
+            logging.error("Manutenção do banco desativada: %s", e)
+            return
+        try:
+            while not self.stop_event.wait(self.poll_seconds):
+                try:
+                    if self._idle(conn):
+                        self.run_idle_window(conn)
+                except sqlite3.Error as e:
+                    # Banco ocupado ou inacessível: tenta de novo no próximo ciclo
+                    logging.warning("Manutenção do banco adiada: %s", e)
+                    if conn.in_transaction:
+                        conn.rollback()
+        finally:
+            conn.close()
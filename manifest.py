@@ -0,0 +1,187 @@
+# manifest.py
+
+import collections
+import csv
+import hashlib
+import html
+import os
+import webbrowser
+
+from config import MANIFEST_DIR, STATUS_COLLECTED, logging
+from exporters import EXPORT_COLUMNS, CSV_COLUMN_COUNT, iter_batches
+from queries import MANIFEST_PACKAGES, COLETA_BY_NUMERO
+
+MANIFEST_EXTENSIONS = (".csv", ".html", ".sha256")
+
+
+def manifest_base(transportadora, data, numero, closed_at, manifest_dir=MANIFEST_DIR):
+    """
+    Caminho (sem extensão) dos arquivos de manifesto de uma coleta. O horário de fechamento faz
+    parte do nome, então uma coleta reaberta e fechada de novo gera outro manifesto.
+    """
+    stamp = closed_at.replace("-", "").replace(":", "").replace(" ", "_")
+    name = f"{transportadora.replace(' ', '_')}_coleta{numero}_{stamp}"
+    return os.path.join(manifest_dir, data, name)
+
+
+class _HashingFile:
+    """
+    Repassa as escritas ao arquivo e calcula o SHA-256 do conteúdo na mesma passagem.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+
+    def write(self, text):
+        self.digest.update(text.encode("utf-8"))
+        return self.file.write(text)
+
+
+def write_manifest(cursor, coleta_id, transportadora, data, numero, closed_at,
+                   manifest_dir=MANIFEST_DIR, suffix=""):
+    """
+    Gera os arquivos de manifesto de uma coleta em uma única leitura dos seus pacotes:
+    CSV no layout da exportação, resumo HTML para impressão (com contagem por hora e por
+    operador) e o SHA-256 do CSV. `suffix` é acrescentado aos nomes (ex.: ".tmp").
+    Retorna a lista de caminhos gravados, na ordem de MANIFEST_EXTENSIONS.
+    """
+    base = manifest_base(transportadora, data, numero, closed_at, manifest_dir)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    csv_path, html_path, sha_path = (base + ext + suffix for ext in MANIFEST_EXTENSIONS)
+
+    per_hour = collections.Counter()
+    per_operator = collections.Counter()
+    total = 0
+    cursor.execute(MANIFEST_PACKAGES, (coleta_id,))
+    with open(csv_path, "w", newline="", encoding="utf-8") as file:
+        hashing = _HashingFile(file)
+        writer = csv.writer(hashing)
+        writer.writerow([header for _, header, _ in EXPORT_COLUMNS[:CSV_COLUMN_COUNT]])
+        for rows in iter_batches(cursor):
+            for codigo, hora, bipped_by in rows:
+                per_hour[hora[:2]] += 1
+                per_operator[bipped_by or ""] += 1
+            writer.writerows(
+                (transportadora, codigo, data, hora, STATUS_COLLECTED, numero) for codigo, hora, _ in rows
+            )
+            total += len(rows)
+    checksum = hashing.digest.hexdigest()
+
+    with open(sha_path, "w", encoding="utf-8") as file:
+        file.write(f"{checksum}  {os.path.basename(base)}.csv\n")
+
+    with open(html_path, "w", encoding="utf-8") as file:
+        file.write(_render_html(transportadora, data, numero, closed_at, total, checksum, per_hour, per_operator))
+
+    return [csv_path, html_path, sha_path]
+
+
+def _render_html(transportadora, data, numero, closed_at, total, checksum, per_hour, per_operator):
+    esc = html.escape
+    hour_rows = "".join(
+        f"<tr><td>{hour}:00</td><td>{count}</td></tr>" for hour, count in sorted(per_hour.items())
+    )
+    operator_rows = "".join(
+        f"<tr><td>{esc(operator) or '-'}</td><td>{count}</td></tr>"
+        for operator, count in sorted(per_operator.items())
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Manifesto - {esc(transportadora)} - Coleta {numero} - {data}</title>
+<style>
+  body {{ font-family: Helvetica, Arial, sans-serif; margin: 2em; }}
+  h1 {{ margin-bottom: 0.2em; }}
+  table {{ border-collapse: collapse; margin: 1em 0; min-width: 40%; }}
+  td, th {{ border: 1px solid #999; padding: 4px 10px; text-align: left; }}
+  .total {{ font-size: 2em; font-weight: bold; }}
+  .checksum {{ font-family: monospace; font-size: 0.8em; word-break: break-all; }}
+  .signature {{ margin-top: 4em; border-top: 1px solid #000; width: 50%; padding-top: 4px; }}
+  @media print {{ body {{ margin: 0; }} }}
+</style>
+</head>
+<body>
+<h1>Manifesto de Coleta - Ponto 3D</h1>
+<p>Transportadora: <strong>{esc(transportadora)}</strong><br>
+Data: {data}<br>
+Coleta número: {numero}<br>
+Fechada em: {closed_at}</p>
+<p class="total">Total de pacotes: {total}</p>
+<h2>Pacotes por hora</h2>
+<table><tr><th>Hora</th><th>Pacotes</th></tr>{hour_rows}</table>
+<h2>Pacotes por operador</h2>
+<table><tr><th>Operador</th><th>Pacotes</th></tr>{operator_rows}</table>
+<p class="checksum">SHA-256 da lista (CSV): {checksum}</p>
+<div class="signature">Assinatura do motorista</div>
+<div class="signature">Assinatura do responsável</div>
+</body>
+</html>
+"""
+
+
+class ManifestBuilder:
+    """
+    Gera os manifestos dentro da transação de fechamento (use como `before_commit` de
+    coletas.close_open_coletas). Os arquivos são gravados com sufixo .tmp e só recebem o
+    nome final em `publish`, depois do commit; se o fechamento falhar, `discard` os apaga.
+    """
+    def __init__(self, transportadora, data, manifest_dir=MANIFEST_DIR):
+        self.transportadora = transportadora
+        self.data = data
+        self.manifest_dir = manifest_dir
+        self.temporary = []
+
+    def __call__(self, cursor, coletas, closed_at):
+        for coleta_id, numero, _ in coletas:
+            self.temporary.extend(write_manifest(
+                cursor, coleta_id, self.transportadora, self.data, numero, closed_at,
+                self.manifest_dir, suffix=".tmp"
+            ))
+
+    def publish(self):
+        """
+        Dá o nome final aos arquivos. Retorna os caminhos dos resumos HTML.
+        """
+        html_paths = []
+        for tmp_path in self.temporary:
+            path = tmp_path[:-len(".tmp")]
+            os.replace(tmp_path, path)
+            if path.endswith(".html"):
+                html_paths.append(path)
+        self.temporary = []
+        return html_paths
+
+    def discard(self):
+        for tmp_path in self.temporary:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self.temporary = []
+
+
+def find_manifest(cursor, transportadora, data, numero, manifest_dir=MANIFEST_DIR):
+    """
+    Caminho do resumo HTML de uma coleta fechada, para reimpressão. Usa o manifesto em cache;
+    só lê os pacotes de novo se ele não existir (ex.: coleta fechada em outra estação).
+    Retorna None se a coleta não existe ou não está fechada.
+    """
+    cursor.execute(COLETA_BY_NUMERO, (transportadora, data, numero))
+    row = cursor.fetchone()
+    if not row or row[1] != STATUS_COLLECTED or not row[2]:
+        return None
+    coleta_id, _, closed_at = row
+
+    html_path = manifest_base(transportadora, data, numero, closed_at, manifest_dir) + ".html"
+    if not os.path.exists(html_path):
+        logging.info("Manifesto da coleta %s de %s (%s) não encontrado em cache; gerando.", numero, transportadora, data)
+        html_path = write_manifest(cursor, coleta_id, transportadora, data, numero, closed_at, manifest_dir)[1]
+    return html_path
+
+
+def open_manifest(html_path):
+    """
+    Abre o resumo no navegador padrão, de onde pode ser impresso.
+    """
+    webbrowser.open("file://" + os.path.abspath(html_path).replace(os.sep, "/"))
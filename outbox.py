@@ -0,0 +1,255 @@
+# outbox.py
+
+import datetime
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.request
+
+from config import (
+    STATION_ID, SITE_ID, OUTBOX_ENABLED, OUTBOX_URL, OUTBOX_FILE, OUTBOX_BATCH_SIZE, OUTBOX_POLL_SECONDS,
+    OUTBOX_HTTP_TIMEOUT_SECONDS, OUTBOX_RETRY_BASE_SECONDS, OUTBOX_RETRY_MAX_SECONDS, OUTBOX_LEASE_SECONDS,
+    logging
+)
+from queries import (
+    OUTBOX_INSERT, OUTBOX_BATCH, OUTBOX_DELETE, OUTBOX_FAILED, OUTBOX_STATUS, OUTBOX_LEASE_GET,
+    OUTBOX_LEASE_SET, OUTBOX_LEASE_RELEASE
+)
+
+
+class DeliveryError(Exception):
+    """
+    O destino não aceitou o lote; ele é entregue de novo após a espera.
+    """
+
+
+def record_events(cursor, kind, payloads, station=STATION_ID):
+    """
+    Grava eventos na tabela outbox com o cursor da operação, antes do commit dela: o evento
+    existe se e somente se a operação foi gravada. Cada payload é um dicionário serializável em
+    JSON. Não faz nada com OUTBOX_ENABLED desligado.
+    """
+    if not OUTBOX_ENABLED or not payloads:
+        return
+    created_at = datetime.datetime.now().isoformat(timespec="milliseconds")
+    cursor.executemany(OUTBOX_INSERT, [
+        (kind, json.dumps(payload, ensure_ascii=False), created_at, station) for payload in payloads
+    ])
+
+
+def outbox_status(conn):
+    """
+    (eventos pendentes, gravação do mais antigo, maior número de tentativas) da tabela outbox.
+    """
+    return conn.execute(OUTBOX_STATUS).fetchone()
+
+
+def _event(row, site=SITE_ID):
+    """
+    Evento entregue ao destino. `key` é a chave de idempotência: única por site e nunca
+    reaproveitada (AUTOINCREMENT), igual em todas as tentativas de entrega do mesmo evento.
+    """
+    event_id, kind, payload, created_at, station = row
+    event = {"key": f"{site}:{event_id}", "kind": kind, "created_at": created_at, "station": station}
+    event.update(json.loads(payload))
+    return event
+
+
+class HttpSink:
+    """
+    Entrega cada lote em um POST JSON {"events": [...]}; qualquer resposta fora de 2xx é uma falha.
+    """
+    def __init__(self, url, timeout=OUTBOX_HTTP_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+
+    def __str__(self):
+        return self.url
+
+    def send(self, events):
+        body = json.dumps({"events": events}, ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(
+            self.url, data=body, method="POST", headers={"Content-Type": "application/json; charset=utf-8"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as e:  # inclui URLError, HTTPError e tempo esgotado
+            raise DeliveryError(str(e)) from e
+
+
+class FileSink:
+    """
+    Acrescenta cada evento como uma linha JSON em um arquivo (lido por outro sistema).
+    Em uma nova tentativa, eventos já gravados podem se repetir: use `key` para descartá-los.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return self.path
+
+    def send(self, events):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            raise DeliveryError(str(e)) from e
+
+
+def default_sink(url=OUTBOX_URL, path=OUTBOX_FILE):
+    """
+    Destino configurado: o endpoint HTTP, se houver, ou o arquivo.
+    """
+    return HttpSink(url) if url else FileSink(path)
+
+
+def retry_delay(attempts, base=OUTBOX_RETRY_BASE_SECONDS, maximum=OUTBOX_RETRY_MAX_SECONDS):
+    """
+    Espera antes da próxima tentativa: dobra a cada falha seguida, até `maximum`, com variação
+    aleatória para as estações não insistirem juntas.
+    """
+    delay = min(maximum, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class OutboxDispatcher:
+    """
+    Entrega em segundo plano, com conexão própria, os eventos da tabela outbox ao destino (HttpSink
+    ou FileSink), em lotes de até `batch_size` na ordem em que foram gravados. Um lote entregue é
+    apagado; um lote recusado fica na tabela (com o número de tentativas e o erro) e é reenviado
+    após uma espera crescente (`retry_delay`). A entrega é "ao menos uma vez": o destino descarta
+    repetições pela chave `key` de cada evento.
+
+    Apenas a estação que detém a reserva em outbox_lease entrega, para que os eventos de todas as
+    estações cheguem em ordem; se ela fechar ou cair, outra assume após OUTBOX_LEASE_SECONDS.
+    Enquanto há eventos acumulados os lotes seguem sem espera; depois, a tabela é consultada a
+    cada `poll_seconds`.
+    """
+    def __init__(self, db_path, sink=None, station=STATION_ID, batch_size=OUTBOX_BATCH_SIZE,
+                 poll_seconds=OUTBOX_POLL_SECONDS, lease_seconds=OUTBOX_LEASE_SECONDS):
+        self.db_path = db_path
+        self.sink = sink or default_sink()
+        self.station = station
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.lease_until = 0
+        self.attempts = 0   # Falhas seguidas do lote atual
+        self.delivered = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self, timeout=5):
+        self.stop_event.set()
+        self.thread.join(timeout)
+
+    def _acquire_lease(self, conn):
+        """
+        Reserva (ou renova) a entrega para esta estação. Retorna False se outra estação a detém.
+        Só grava no banco quando a reserva está na metade do prazo.
+        """
+        now = time.time()
+        if self.lease_until - now > self.lease_seconds / 2:
+            return True
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(OUTBOX_LEASE_GET).fetchone()
+            if row is not None and row[0] != self.station and row[1] > now:
+                conn.rollback()
+                self.lease_until = 0
+                return False
+            self.lease_until = now + self.lease_seconds
+            conn.execute(OUTBOX_LEASE_SET, (self.station, self.lease_until))
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+    def release_lease(self, conn):
+        conn.execute(OUTBOX_LEASE_RELEASE, (self.station,))
+        conn.commit()
+        self.lease_until = 0
+
+    def deliver_batch(self, conn):
+        """
+        Entrega o próximo lote. Retorna a quantidade de eventos entregues (0: tabela vazia).
+        DeliveryError se o destino recusar; o lote fica na tabela com a tentativa registrada.
+        """
+        rows = conn.execute(OUTBOX_BATCH, (self.batch_size,)).fetchall()
+        if not rows:
+            return 0
+        first, last = rows[0][0], rows[-1][0]
+        try:
+            self.sink.send([_event(row) for row in rows])
+        except DeliveryError as e:
+            conn.execute(OUTBOX_FAILED, (str(e), first, last))
+            conn.commit()
+            raise
+        conn.execute(OUTBOX_DELETE, (first, last))
+        conn.commit()
+        self.delivered += len(rows)
+        return len(rows)
+
+    def drain(self, conn):
+        """
+        Entrega todos os eventos pendentes, sem novas tentativas (linha de comando).
+        Retorna a quantidade entregue, ou False se outra estação está entregando.
+        """
+        if not self._acquire_lease(conn):
+            return False
+        try:
+            total = 0
+            while True:
+                count = self.deliver_batch(conn)
+                total += count
+                if count < self.batch_size:
+                    return total
+        finally:
+            self.release_lease(conn)
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, uri=True)
+        except sqlite3.Error as e:
+            logging.error("Entrega de eventos (outbox) desativada: %s", e)
+            return
+        try:
+            delay = 0
+            while not self.stop_event.wait(delay):
+                delay = self.poll_seconds
+                try:
+                    if not self._acquire_lease(conn):
+                        continue
+                    if self.deliver_batch(conn) == self.batch_size:
+                        delay = 0   # Ainda há eventos acumulados
+                    if self.attempts:
+                        logging.info("Entrega de eventos para %s retomada após %s falhas.", self.sink, self.attempts)
+                        self.attempts = 0
+                except DeliveryError as e:
+                    self.attempts += 1
+                    delay = retry_delay(self.attempts)
+                    logging.warning("Entrega de eventos para %s falhou (tentativa %s, nova em %.1f s): %s",
+                                    self.sink, self.attempts, delay, e)
+                except sqlite3.Error as e:
+                    # Banco ocupado ou inacessível: tenta de novo no próximo ciclo
+                    logging.warning("Entrega de eventos adiada: %s", e)
+                    if conn.in_transaction:
+                        conn.rollback()
+            try:
+                self.release_lease(conn)
+            except sqlite3.Error as e:
+                logging.warning("Reserva da entrega de eventos não liberada: %s", e)
+        finally:
+            conn.close()
@@ -0,0 +1,41 @@
+# package_codes.py
+
+from config import PACKAGE_CODE_REGEX
+from scan_events import (
+    OUTCOME_OK, OUTCOME_INVALID, OUTCOME_NOTA_FISCAL, OUTCOME_WRONG_CARRIER, OUTCOME_UNRECOGNIZED
+)
+
+
+def detect_transportadora(codigo):
+    """
+    Detecta a transportadora com base no código fornecido.
+    """
+    codigo = codigo.strip()
+    if PACKAGE_CODE_REGEX.match(codigo):
+        if codigo.startswith(("GC", "AJ")) and len(codigo) == 18 and codigo[2:].isdigit():
+            return "SHEIN"
+        elif codigo.startswith("BR") and len(codigo) == 15 and codigo[2:].isalnum():
+            return "Shopee"
+        elif codigo.startswith("44") and len(codigo) == 11 and codigo.isdigit():
+            return "Mercado Livre"
+        elif codigo.isdigit() and len(codigo) >= 15:
+            return "Nota Fiscal"
+    return None
+
+
+def check_code(codigo, transportadora=None):
+    """
+    Aplica ao código as mesmas validações da tela de bipagem.
+    Retorna (resultado, transportadora detectada), com resultado OUTCOME_OK se o código pode
+    ser registrado. Sem `transportadora`, aceita a transportadora detectada pelo código.
+    """
+    if not PACKAGE_CODE_REGEX.match(codigo):
+        return OUTCOME_INVALID, None
+    detected = detect_transportadora(codigo)
+    if detected == "Nota Fiscal":
+        return OUTCOME_NOTA_FISCAL, detected
+    if detected is None:
+        return OUTCOME_UNRECOGNIZED, None
+    if transportadora is not None and detected != transportadora:
+        return OUTCOME_WRONG_CARRIER, detected
+    return OUTCOME_OK, detected
@@ -0,0 +1,146 @@
+# photo_ingest.py
+
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+from config import PHOTO_WORKERS, PHOTO_MAX_PIXELS, logging
+from package_codes import check_code
+from scan_events import OUTCOME_OK, OUTCOME_INVALID, OUTCOME_UNRECOGNIZED, OUTCOME_NOTA_FISCAL, OUTCOME_LABELS
+
+# Pillow e um leitor de códigos de barras local são opcionais: só a importação de fotos depende deles.
+# zxing-cpp traz a biblioteca nativa no próprio pacote; pyzbar depende da biblioteca zbar do sistema.
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    pyzbar = None
+
+DECODER_AVAILABLE = Image is not None and (zxingcpp is not None or pyzbar is not None)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# Códigos que não são de pacote (ex.: chave da Nota Fiscal, códigos internos da etiqueta): ignorados
+# quando a mesma foto tem um código de pacote
+_NOT_PACKAGE_OUTCOMES = (OUTCOME_INVALID, OUTCOME_UNRECOGNIZED, OUTCOME_NOTA_FISCAL)
+
+NO_BARCODE = "Nenhum código de barras encontrado"
+
+
+def list_images(folder):
+    """
+    Imagens da pasta (sem subpastas), em ordem de nome.
+    """
+    return sorted(
+        entry.path for entry in os.scandir(folder)
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def _barcodes(image):
+    if zxingcpp is not None:
+        texts = [result.text for result in zxingcpp.read_barcodes(image)]
+    else:
+        texts = [symbol.data.decode("ascii", "replace") for symbol in pyzbar.decode(image)]
+    codes = []
+    for text in texts:
+        codigo = text.strip()
+        if codigo and codigo not in codes:
+            codes.append(codigo)
+    return codes
+
+
+def decode_image(path):
+    """
+    Lê os códigos de barras de uma foto. Roda nos processos do pool: retorna (caminho, códigos, erro)
+    em vez de levantar exceções. A foto é girada conforme o EXIF do celular e lida em tons de cinza;
+    fotos grandes são lidas primeiro reduzidas e, se nada for encontrado, no tamanho original.
+    """
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image).convert("L")
+        if image.width * image.height > PHOTO_MAX_PIXELS:
+            scale = (PHOTO_MAX_PIXELS / (image.width * image.height)) ** 0.5
+            codes = _barcodes(image.resize((int(image.width * scale), int(image.height * scale))))
+            if codes:
+                return path, codes, None
+        return path, _barcodes(image), None
+    except Exception as e:
+        return path, [], str(e) or type(e).__name__
+
+
+class PhotoIngest:
+    """
+    Importa os códigos de uma pasta de fotos de etiquetas (leitor de código de barras quebrado).
+    As fotos são decodificadas em paralelo por um pool de processos (um por núcleo) e os códigos passam,
+    na ordem das fotos, pelo `importer` (importer.BatchImporter): mesmas validações e política de
+    duplicados da tela de bipagem, gravação em lotes.
+
+    `run` gera o relatório de rejeições, uma linha (arquivo, código, motivo) por foto sem código
+    aproveitável ou por código recusado. Em uma foto com vários códigos, os que não são de pacote
+    são ignorados se houver algum código de pacote.
+    """
+    def __init__(self, importer, workers=PHOTO_WORKERS):
+        self.importer = importer
+        self.workers = workers or os.cpu_count() or 1
+        self.images = 0
+        self.unreadable = 0  # Fotos sem nenhum código de pacote
+        self.elapsed = 0.0
+
+    @property
+    def images_per_second(self):
+        return self.images / self.elapsed if self.elapsed else 0.0
+
+    def run(self, paths, progress=None):
+        """
+        Processa as fotos e gera as rejeições. `progress(imagens, total)`, se informado, é chamado
+        a cada foto processada.
+        """
+        start = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+            chunksize = max(1, min(8, len(paths) // (self.workers * 4)))
+            for path, codes, error in executor.map(decode_image, paths, chunksize=chunksize):
+                self.images += 1
+                self.elapsed = time.perf_counter() - start
+                yield from self._process(os.path.basename(path), codes, error)
+                if progress is not None:
+                    progress(self.images, len(paths))
+        self.importer.flush()
+        self.elapsed = time.perf_counter() - start
+        logging.info(
+            "Importação de fotos: %s imagens em %.1f s (%.1f imagens/s), %s sem código de pacote, "
+            "%s códigos aceitos, %s recusados.", self.images, self.elapsed, self.images_per_second,
+            self.unreadable, self.importer.imported, self.importer.rejected
+        )
+
+    def _process(self, name, codes, error):
+        if error is not None:
+            self.unreadable += 1
+            yield name, "", f"Erro ao ler a imagem: {error}"
+            return
+        if not codes:
+            self.unreadable += 1
+            yield name, "", NO_BARCODE
+            return
+
+        outcomes = [(codigo, check_code(codigo, self.importer.transportadora)[0]) for codigo in codes]
+        candidates = [codigo for codigo, outcome in outcomes if outcome not in _NOT_PACKAGE_OUTCOMES]
+        if not candidates:
+            self.unreadable += 1
+            codigo, outcome = outcomes[0]
+            yield name, codigo, OUTCOME_LABELS[outcome]
+            return
+
+        for codigo in candidates:
+            outcome, _ = self.importer.add(codigo)
+            if outcome != OUTCOME_OK:
+                yield name, codigo, OUTCOME_LABELS[outcome]
@@ -0,0 +1,201 @@
+# profiler.py
+
+import collections
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+
+from config import (
+    LOG_DIR, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_TRACEMALLOC_FRAMES, PROFILE_TOP_ALLOCATIONS, logging
+)
+from queries import QUERIES
+
+# Captura em andamento; as conexões só medem as instruções enquanto houver uma
+_active = None
+
+_query_names = {" ".join(query.sql.split()): name for name, query in QUERIES.items()}
+
+
+def _statement_name(sql):
+    """
+    Nome da instrução no registro (queries.py) ou o início do texto SQL.
+    """
+    text = " ".join(sql.split())
+    return _query_names.get(text) or text[:90]
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor que mede o tempo de cada execute durante uma captura de desempenho. Fora da captura
+    o custo é uma verificação de variável global.
+    """
+    def execute(self, sql, parameters=()):
+        capture = _active
+        if capture is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            capture.record_statement(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        capture = _active
+        if capture is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            capture.record_statement(sql, time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """
+    Conexão (use como `factory` de sqlite3.connect) cujos cursores são TimedCursor.
+    """
+    def cursor(self, factory=None):
+        return super().cursor(factory or TimedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{name}".replace(";", ",").replace(" ", "_")
+
+
+def _own_traces_removed(snapshot):
+    """
+    Remove do snapshot as alocações feitas pela própria captura e pelo tracemalloc.
+    """
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ])
+
+
+class PerformanceCapture:
+    """
+    Captura de desempenho do processo por `seconds` segundos, sem interromper a bipagem:
+    - perfil por amostragem: uma thread lê a pilha de todas as threads a cada
+      PROFILE_SAMPLE_INTERVAL_MS e grava as pilhas no formato "folded" (flamegraph.pl, speedscope);
+    - tracemalloc: os PROFILE_TOP_ALLOCATIONS locais que mais alocaram memória durante a captura;
+    - tempos das instruções SQL das conexões abertas por database.get_database_connection.
+    Os arquivos são gravados em LOG_DIR ao final, pela própria thread de amostragem; `done` é
+    sinalizado quando estão prontos e `paths` traz seus caminhos.
+    """
+    def __init__(self, seconds, interval_ms=PROFILE_SAMPLE_INTERVAL_MS, out_dir=LOG_DIR):
+        self.seconds = seconds
+        self.interval = interval_ms / 1000
+        self.out_dir = out_dir
+        self.stacks = collections.Counter()
+        self.statements = collections.defaultdict(list)
+        self.statements_lock = threading.Lock()
+        self.samples = 0
+        self.done = threading.Event()
+        self.paths = []
+        self.error = None
+        self.thread = None
+
+    @staticmethod
+    def running():
+        return _active is not None
+
+    def start(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("Já existe uma captura de desempenho em andamento.")
+        _active = self
+        self.started_at = datetime.datetime.now()
+        tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        self.baseline = _own_traces_removed(tracemalloc.take_snapshot())
+        self.thread = threading.Thread(target=self._run, name="performance-capture", daemon=True)
+        self.thread.start()
+        logging.info("Captura de desempenho iniciada por %s s.", self.seconds)
+        return self
+
+    def record_statement(self, sql, elapsed):
+        with self.statements_lock:
+            self.statements[_statement_name(sql)].append(elapsed)
+
+    def _run(self):
+        global _active
+        own = threading.get_ident()
+        deadline = time.perf_counter() + self.seconds
+        try:
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+
+            snapshot = _own_traces_removed(tracemalloc.take_snapshot())
+        except Exception as e:
+            logging.error("Erro na captura de desempenho: %s", e)
+            self.error = e
+            snapshot = None
+        finally:
+            tracemalloc.stop()
+            _active = None
+
+        try:
+            if snapshot is not None:
+                self.paths = self._write(snapshot)
+                logging.info("Captura de desempenho gravada: %s", ", ".join(self.paths))
+        except OSError as e:
+            logging.error("Erro ao gravar a captura de desempenho: %s", e)
+            self.error = e
+        self.done.set()
+
+    def _write(self, snapshot):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, "perf_" + self.started_at.strftime("%Y%m%d_%H%M%S"))
+
+        folded_path = base + ".folded"
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        alloc_path = base + "_alloc.txt"
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write(f"Alocações durante a captura ({self.seconds} s), por local de origem\n\n")
+            for stat in snapshot.compare_to(self.baseline, "traceback")[:PROFILE_TOP_ALLOCATIONS]:
+                if stat.size_diff <= 0:
+                    continue
+                f.write(f"{stat.size_diff / 1024:,.1f} KiB em {stat.count_diff:+,} blocos\n")
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(f"    {line}\n")
+                f.write("\n")
+
+        sql_path = base + "_sql.txt"
+        with self.statements_lock:
+            statements = {name: sorted(times) for name, times in self.statements.items()}
+        with open(sql_path, "w", encoding="utf-8") as f:
+            f.write(f"Instruções SQL durante a captura ({self.seconds} s); tempo do execute até a primeira linha\n\n")
+            f.write(f"{'instrução':<40} {'execuções':>10} {'total ms':>10} {'média ms':>10} {'p99 ms':>10} {'máx ms':>10}\n")
+            for name, times in sorted(statements.items(), key=lambda item: -sum(item[1])):
+                total = sum(times)
+                p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+                f.write(f"{name:<40} {len(times):>10} {total * 1000:>10.2f} {total / len(times) * 1000:>10.3f} "
+                        f"{p99 * 1000:>10.3f} {times[-1] * 1000:>10.3f}\n")
+
+        return [folded_path, alloc_path, sql_path]
@@ -0,0 +1,502 @@
+# queries.py
+"""
+Registro central das instruções SQL da aplicação.
+
+Cada instrução é uma constante com o texto SQL, usada diretamente em `cursor.execute`, e fica
+registrada em QUERIES com os nomes dos seus parâmetros e se está no caminho crítico (`hot`:
+bipagem, listas e buscas com o operador esperando, atualizações periódicas). Instruções montadas
+em tempo de execução (filtros opcionais, listas IN) têm suas variantes em `dynamic_queries`.
+
+tools/query_plans.py roda EXPLAIN QUERY PLAN em todas elas sobre um banco sintético grande e
+falha se uma instrução do caminho crítico percorrer uma tabela inteira (SCAN) em vez de usar um
+índice (SEARCH). Ao incluir uma instrução nova, registre-a aqui.
+"""
+
+import collections
+
+from config import STATUS_COLLECTED
+
+Query = collections.namedtuple("Query", "name sql params hot")
+
+# Colunas de um pacote na ordem de repository.PackageRecord (p = packages, c = coletas); o status é o da coleta
+PACKAGE_RECORD_COLUMNS = "p.id, p.codigo_pacote, p.transportadora, p.data, p.hora, c.status, c.numero, p.bipped_by"
+
+QUERIES = {}
+
+
+def _register(name, sql, params=(), hot=False):
+    QUERIES[name] = Query(name, sql, tuple(params), hot)
+    return sql
+
+
+# --- coletas.py: ciclo de vida das coletas --------------------------------------------------
+
+COLETA_FIND_OPEN = _register("coleta_find_open", """
+    SELECT id, numero FROM coletas
+    WHERE transportadora = ? AND data = ? AND status = ?
+    ORDER BY numero DESC
+    LIMIT 1
+""", ("transportadora", "data", "status_pending"), hot=True)
+
+COLETA_NEXT_NUMERO = _register("coleta_next_numero", """
+    SELECT COALESCE(MAX(numero), 0) + 1 FROM coletas WHERE transportadora = ? AND data = ?
+""", ("transportadora", "data"), hot=True)
+
+COLETA_INSERT = _register("coleta_insert", """
+    INSERT INTO coletas (transportadora, data, numero, status, opened_at, package_count)
+    VALUES (?, ?, ?, ?, ?, 0)
+""", ("transportadora", "data", "numero_new", "status_pending", "timestamp"), hot=True)
+
+COLETA_ADD_COUNT = _register("coleta_add_count", """
+    UPDATE coletas SET package_count = package_count + ? WHERE id = ?
+""", ("one", "coleta_id"), hot=True)
+
+COLETA_SET_STATUS = _register("coleta_set_status", """
+    UPDATE coletas SET status = ?, closed_at = ? WHERE id = ?
+""", ("status_collected", "timestamp", "coleta_id"), hot=True)
+
+COLETAS_TO_CLOSE = _register("coletas_to_close", """
+    SELECT id, numero, package_count FROM coletas
+    WHERE transportadora = ? AND data = ? AND status = ? AND package_count > 0
+    ORDER BY numero
+""", ("transportadora", "data", "status_pending"), hot=True)
+
+COLETA_LAST_CLOSED = _register("coleta_last_closed", """
+    SELECT id, numero, package_count FROM coletas
+    WHERE transportadora = ? AND data = ? AND status = ?
+    ORDER BY numero DESC
+    LIMIT 1
+""", ("transportadora", "data", "status_collected"), hot=True)
+
+# Coleta aberta de um número do dia, para devolver pacotes removidos por engano (desfazer)
+COLETA_FIND_PENDING_NUMERO = _register("coleta_find_pending_numero", """
+    SELECT id FROM coletas
+    WHERE transportadora = ? AND data = ? AND status = ? AND numero = ?
+""", ("transportadora", "data", "status_pending", "numero"), hot=True)
+
+COLETAS_PENDING_COUNT = _register("coletas_pending_count", """
+    SELECT COALESCE(SUM(package_count), 0) FROM coletas
+    WHERE transportadora = ? AND data = ? AND status = ?
+""", ("transportadora", "data", "status_pending"), hot=True)
+
+PACKAGE_INSERT = _register("package_insert", """
+    INSERT INTO packages (transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+""", ("transportadora", "codigo_new", "data", "hora", "status_pending", "numero", "operator", "coleta_id"), hot=True)
+
+PACKAGE_PENDING_COLETA = _register("package_pending_coleta", """
+    SELECT p.coleta_id, p.transportadora, p.data, c.numero FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.id = ? AND p.codigo_pacote = ? AND c.status = ?
+""", ("package_id", "codigo", "status_pending"), hot=True)
+
+# Pacote de uma coleta aberta pelo código bipado (remoção por bipagem), o mais recente se repetido
+PACKAGE_PENDING_BY_CODE = _register("package_pending_by_code", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS} FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.codigo_pacote = ? AND p.data = ? AND p.transportadora = ? AND c.status = ?
+    ORDER BY p.id DESC
+    LIMIT 1
+""", ("codigo", "data", "transportadora", "status_pending"), hot=True)
+
+# Id do último pacote gravado pela conexão (executemany não informa lastrowid)
+PACKAGE_LAST_ID = _register("package_last_id", """
+    SELECT last_insert_rowid()
+""", hot=True)
+
+PACKAGE_DELETE = _register("package_delete", """
+    DELETE FROM packages WHERE id = ?
+""", ("package_id",), hot=True)
+
+# --- duplicates.py: política de duplicados (a cada bipagem) ---------------------------------
+
+DUPLICATE_SAME_DAY = _register("duplicate_same_day", """
+    SELECT transportadora, data, hora, bipped_by FROM packages
+    WHERE codigo_pacote = ? AND data = ? AND transportadora = ?
+    LIMIT 1
+""", ("codigo", "data", "transportadora"), hot=True)
+
+DUPLICATE_SAME_COLETA = _register("duplicate_same_coleta", """
+    SELECT p.transportadora, p.data, p.hora, p.bipped_by FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.codigo_pacote = ? AND p.data = ? AND c.transportadora = ? AND c.status = ?
+    LIMIT 1
+""", ("codigo", "data", "transportadora", "status_pending"), hot=True)
+
+DUPLICATE_SINCE = _register("duplicate_since", """
+    SELECT transportadora, data, hora, bipped_by FROM packages
+    WHERE codigo_pacote = ? AND data >= ?
+    ORDER BY data DESC, hora DESC
+    LIMIT 1
+""", ("codigo", "start"), hot=True)
+
+DUPLICATE_EVER = _register("duplicate_ever", """
+    SELECT transportadora, data, hora, bipped_by FROM packages
+    WHERE codigo_pacote = ?
+    ORDER BY data DESC, hora DESC
+    LIMIT 1
+""", ("codigo",), hot=True)
+
+# --- row_cache.py e repository.py: lista da tela de bipagem -----------------------------------
+
+PENDING_ROWS = _register("pending_rows", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS}
+    FROM coletas c
+    JOIN packages p ON p.coleta_id = c.id
+    WHERE c.data = ? AND c.transportadora = ? AND c.status = ?
+    ORDER BY p.id
+""", ("data", "transportadora", "status_pending"), hot=True)
+
+PENDING_SIGNATURE = _register("pending_signature", """
+    SELECT c.numero, c.package_count, (SELECT MAX(p.id) FROM packages p WHERE p.coleta_id = c.id)
+    FROM coletas c
+    WHERE c.data = ? AND c.transportadora = ? AND c.status = ? AND c.package_count > 0
+""", ("data", "transportadora", "status_pending"), hot=True)
+
+# --- search.py: busca de códigos por trecho ---------------------------------------------------
+
+SEARCH_INDEX_EXISTS = _register("search_index_exists", """
+    SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'packages_search'
+""")
+
+SEARCH_PREFIX = _register("search_prefix", """
+    SELECT codigo_pacote, transportadora, data
+    FROM packages
+    WHERE codigo_pacote >= ? AND codigo_pacote < ?
+    ORDER BY codigo_pacote
+    LIMIT ?
+""", ("prefix_low", "prefix_high", "limit"), hot=True)
+
+SEARCH_TRIGRAM = _register("search_trigram", """
+    SELECT p.codigo_pacote, p.transportadora, p.data
+    FROM packages p
+    JOIN (
+        SELECT rowid FROM packages_search
+        WHERE packages_search MATCH ?
+        ORDER BY rowid DESC
+        LIMIT ?
+    ) s ON p.id = s.rowid
+    ORDER BY p.id DESC
+""", ("fts_phrase", "limit"), hot=True)
+
+# Alternativa sem o índice FTS5 (SQLite antigo): percorre a tabela por natureza
+SEARCH_LIKE = _register("search_like", """
+    SELECT codigo_pacote, transportadora, data
+    FROM packages
+    WHERE codigo_pacote LIKE ?
+    ORDER BY id DESC
+    LIMIT ?
+""", ("like_term", "limit"))
+
+# --- repository.py: Verificar Pedido e Consultar Coletas Anteriores --------------------------
+
+VERIFY_LATEST = _register("verify_latest", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS}
+    FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.codigo_pacote = ?
+    ORDER BY p.data DESC, p.hora DESC
+    LIMIT 1
+""", ("codigo",), hot=True)
+
+# Abertura de "Consultar Coletas Anteriores": todo o histórico
+HISTORY_ALL = _register("history_all", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS}
+    FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    ORDER BY p.data DESC, p.hora DESC
+""")
+
+# Base da pesquisa; filtros e ordenação são acrescentados por repository.range_query
+HISTORY_RANGE = _register("history_range", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS}
+    FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.data BETWEEN ? AND ?
+""", ("start", "end"), hot=True)
+
+# --- manifest.py ----------------------------------------------------------------------------
+
+MANIFEST_PACKAGES = _register("manifest_packages", """
+    SELECT codigo_pacote, hora, bipped_by FROM packages WHERE coleta_id = ? ORDER BY id
+""", ("coleta_id",), hot=True)
+
+COLETA_BY_NUMERO = _register("coleta_by_numero", """
+    SELECT id, status, closed_at FROM coletas
+    WHERE transportadora = ? AND data = ? AND numero = ?
+""", ("transportadora", "data", "numero"), hot=True)
+
+# --- journal.py: replicação do diário local ---------------------------------------------------
+
+JOURNAL_EXACT = _register("journal_exact", """
+    SELECT transportadora, data, hora, bipped_by FROM packages
+    WHERE codigo_pacote = ? AND data = ? AND transportadora = ? AND hora = ? AND bipped_by IS ?
+""", ("codigo", "data", "transportadora", "hora", "operator"), hot=True)
+
+# Pacote replicado de uma bipagem do diário, para a lista da tela trocar a linha "pendente" pelo registro
+JOURNAL_REPLICATED = _register("journal_replicated", f"""
+    SELECT {PACKAGE_RECORD_COLUMNS} FROM packages p
+    JOIN coletas c ON c.id = p.coleta_id
+    WHERE p.codigo_pacote = ? AND p.data = ? AND p.transportadora = ? AND p.hora = ? AND p.bipped_by IS ?
+""", ("codigo", "data", "transportadora", "hora", "operator"), hot=True)
+
+JOURNAL_SEED_DAY = _register("journal_seed_day", """
+    SELECT data, transportadora, codigo_pacote FROM packages WHERE data = ?
+""", ("data",), hot=True)
+
+# --- registered_codes.py: filtro de códigos já registrados ------------------------------------
+
+PACKAGES_MAX_ID = _register("packages_max_id", """
+    SELECT COALESCE(MAX(id), 0) FROM packages
+""", hot=True)
+
+# Reconstrução completa do filtro, em segundo plano: páginas por faixa de id, cada uma uma leitura
+# curta, para não prender o banco (modo rollback journal) durante a varredura inteira
+PACKAGE_CODES_PAGE = _register("package_codes_page", """
+    SELECT id, codigo_pacote FROM packages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+""", ("recent_id", "max_id", "limit"))
+
+PACKAGE_CODES_AFTER = _register("package_codes_after", """
+    SELECT id, codigo_pacote FROM packages WHERE id > ? ORDER BY id
+""", ("recent_id",), hot=True)
+
+# --- scan_events.py ---------------------------------------------------------------------------
+
+SCAN_EVENTS_INSERT = _register("scan_events_insert", """
+    INSERT INTO scan_events (ts_us, outcome, codigo, transportadora, operator, station)
+    VALUES (?, ?, ?, ?, ?, ?)
+""", ("ts_us", "outcome_ok", "codigo_new", "transportadora", "operator", "station"), hot=True)
+
+SCAN_EVENTS_PURGE = _register("scan_events_purge", """
+    DELETE FROM scan_events WHERE ts_us < ?
+""", ("ts_old_us",))
+
+SCAN_EVENTS_BY_OPERATOR = _register("scan_events_by_operator", """
+    SELECT operator, outcome, COUNT(*)
+    FROM scan_events
+    WHERE ts_us >= ? AND ts_us < ?
+    GROUP BY operator, outcome
+""", ("ts_start_us", "ts_end_us"))
+
+# --- live_stats.py: painel ao vivo ------------------------------------------------------------
+
+DASHBOARD_COLETAS = _register("dashboard_coletas", """
+    SELECT transportadora, numero, status, package_count FROM coletas WHERE data = ?
+""", ("data",), hot=True)
+
+DASHBOARD_OPERATORS = _register("dashboard_operators", """
+    SELECT bipped_by, COUNT(*), MAX(hora) FROM packages
+    WHERE data = ?
+    GROUP BY bipped_by
+""", ("data",), hot=True)
+
+DASHBOARD_RECENT_SCANS = _register("dashboard_recent_scans", """
+    SELECT ts_us, operator FROM scan_events
+    WHERE ts_us >= ? AND ts_us < ? AND outcome = ?
+    ORDER BY ts_us
+""", ("ts_start_us", "ts_end_us", "outcome_ok"), hot=True)
+
+FEED_MAX_EVENT_ID = _register("feed_max_event_id", """
+    SELECT COALESCE(MAX(id), 0) FROM scan_events
+""", hot=True)
+
+FEED_NEW_EVENTS = _register("feed_new_events", """
+    SELECT id, ts_us, codigo, transportadora, operator, station FROM scan_events
+    WHERE id > ? AND outcome = ?
+    ORDER BY id
+""", ("recent_event_id", "outcome_ok"), hot=True)
+
+FEED_COLETAS = _register("feed_coletas", """
+    SELECT id, transportadora, numero, status, package_count FROM coletas WHERE data = ?
+""", ("data",), hot=True)
+
+# --- analytics.py: relatório de produtividade -------------------------------------------------
+
+OPERATOR_REPORT_ROWS = _register("operator_report_rows", """
+    SELECT data, bipped_by, hora, transportadora
+    FROM packages
+    WHERE data BETWEEN ? AND ?
+    ORDER BY data, bipped_by, hora
+""", ("start", "end"))
+
+# --- usuários e login -------------------------------------------------------------------------
+
+USER_BY_USERNAME = _register("user_by_username", """
+    SELECT id, username, password, role FROM users WHERE username=?
+""", ("username",), hot=True)
+
+USER_SET_PASSWORD = _register("user_set_password", """
+    UPDATE users SET password = ? WHERE id = ?
+""", ("password", "user_id"))
+
+USERS_LIST = _register("users_list", """
+    SELECT username, role FROM users
+""")
+
+USER_INSERT = _register("user_insert", """
+    INSERT INTO users (username, password, role) VALUES (?, ?, ?)
+""", ("username_new", "password", "role"))
+
+USER_UPDATE_WITH_PASSWORD = _register("user_update_with_password", """
+    UPDATE users SET username = ?, password = ?, role = ? WHERE username = ?
+""", ("username_new", "password", "role", "username"))
+
+USER_UPDATE = _register("user_update", """
+    UPDATE users SET username = ?, role = ? WHERE username = ?
+""", ("username_new", "role", "username"))
+
+USER_DELETE = _register("user_delete", """
+    DELETE FROM users WHERE username = ?
+""", ("username",))
+
+# --- exportação e linha de comando ------------------------------------------------------------
+
+SNAPSHOT_DATES = _register("snapshot_dates", """
+    SELECT DISTINCT data FROM packages WHERE data < ? ORDER BY data
+""", ("end",))
+
+CLI_OPEN_CARRIERS = _register("cli_open_carriers", """
+    SELECT DISTINCT transportadora FROM coletas WHERE data = ? AND status = ? ORDER BY transportadora
+""", ("data", "status_pending"))
+
+CLI_DAILY_TOTALS = _register("cli_daily_totals", """
+    SELECT data, transportadora, COUNT(*), SUM(package_count),
+           SUM(CASE WHEN status = ? THEN package_count ELSE 0 END),
+           SUM(CASE WHEN status = ? THEN package_count ELSE 0 END)
+    FROM coletas
+    WHERE data BETWEEN ? AND ?
+    GROUP BY data, transportadora
+    ORDER BY data, transportadora
+""", ("status_pending", "status_collected", "start", "end"))
+
+# --- shards.py: consultas de todos os sites ------------------------------------------------
+
+# Conciliação: primeira bipagem de cada código no período, em cada site, ordenada pelo código
+# para a intercalação dos sites
+SHARD_FIRST_SCANS = _register("shard_first_scans", """
+    SELECT codigo_pacote, transportadora, MIN(data || ' ' || hora)
+    FROM packages
+    WHERE data BETWEEN ? AND ?
+    GROUP BY codigo_pacote, transportadora
+    ORDER BY codigo_pacote
+""", ("start", "end"))
+
+# --- sandbox.py: amostra de dados reais para o banco de teste ---------------------------------
+
+SANDBOX_SAMPLE_COLETAS = _register("sandbox_sample_coletas", """
+    SELECT id, transportadora, data, numero, status, opened_at, closed_at, package_count
+    FROM coletas WHERE data >= ?
+""", ("start",))
+
+SANDBOX_SAMPLE_PACKAGES = _register("sandbox_sample_packages", """
+    SELECT id, transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id
+    FROM packages WHERE data >= ?
+""", ("start",))
+
+# --- maintenance.py: manutenção nos períodos ociosos -----------------------------------------
+
+MAINTENANCE_LAST_SCAN = _register("maintenance_last_scan", """
+    SELECT MAX(ts_us) FROM scan_events
+""", hot=True)
+
+# Tabela com uma linha por tarefa
+MAINTENANCE_RUNS = _register("maintenance_runs", """
+    SELECT job, started_at, finished_at FROM maintenance_runs
+""")
+
+MAINTENANCE_CLAIM = _register("maintenance_claim", """
+    INSERT INTO maintenance_runs (job, started_at, station) VALUES (?, ?, ?)
+    ON CONFLICT (job) DO UPDATE SET started_at = excluded.started_at, station = excluded.station
+""", ("job", "timestamp", "station"))
+
+MAINTENANCE_FINISH = _register("maintenance_finish", """
+    UPDATE maintenance_runs SET finished_at = ?, result = ? WHERE job = ?
+""", ("timestamp", "result", "job"))
+
+MAINTENANCE_TABLES = _register("maintenance_tables", """
+    SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name
+""")
+
+# --- outbox.py: eventos para outros sistemas ------------------------------------------------
+
+# Gravado na mesma transação da bipagem, remoção, fechamento ou reabertura
+OUTBOX_INSERT = _register("outbox_insert", """
+    INSERT INTO outbox (kind, payload, created_at, station) VALUES (?, ?, ?, ?)
+""", ("kind", "payload", "timestamp", "station"), hot=True)
+
+# Próximo lote, em ordem de gravação (os eventos entregues são apagados)
+OUTBOX_BATCH = _register("outbox_batch", """
+    SELECT id, kind, payload, created_at, station FROM outbox ORDER BY id LIMIT ?
+""", ("limit",))
+
+OUTBOX_DELETE = _register("outbox_delete", """
+    DELETE FROM outbox WHERE id BETWEEN ? AND ?
+""", ("recent_id", "max_id"))
+
+OUTBOX_FAILED = _register("outbox_failed", """
+    UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id BETWEEN ? AND ?
+""", ("error", "recent_id", "max_id"))
+
+OUTBOX_STATUS = _register("outbox_status", """
+    SELECT COUNT(*), MIN(created_at), MAX(attempts) FROM outbox
+""")
+
+# Uma única estação entrega por vez (linha única, id = 1), para manter a ordem dos eventos
+OUTBOX_LEASE_GET = _register("outbox_lease_get", """
+    SELECT station, until FROM outbox_lease WHERE id = 1
+""")
+
+OUTBOX_LEASE_SET = _register("outbox_lease_set", """
+    INSERT INTO outbox_lease (id, station, until) VALUES (1, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET station = excluded.station, until = excluded.until
+""", ("station", "until"))
+
+OUTBOX_LEASE_RELEASE = _register("outbox_lease_release", """
+    UPDATE outbox_lease SET until = 0 WHERE id = 1 AND station = ?
+""", ("station",))
+
+# --- tools/replay_day.py: padrão de chegada de um dia real -----------------------------------
+
+REPLAY_DAY = _register("replay_day", """
+    SELECT hora, transportadora, codigo_pacote, bipped_by FROM packages
+    WHERE data = ?
+    ORDER BY hora, id
+""", ("data",))
+
+
+def verify_codes_query(count):
+    """
+    Verificação em lote (PackageRepository.get_many): os registros de cada um de `count` códigos.
+    """
+    return f"""
+        SELECT {PACKAGE_RECORD_COLUMNS}
+        FROM packages p
+        JOIN coletas c ON c.id = p.coleta_id
+        WHERE p.codigo_pacote IN ({", ".join("?" * count)})
+        ORDER BY p.data, p.hora
+    """
+
+
+def dynamic_queries(cursor):
+    """
+    Variantes das instruções montadas em tempo de execução, para a verificação de planos.
+    Retorna uma lista de Query; além de nomes, os parâmetros podem trazer valores já fixados
+    pelo montador da instrução (ex.: o termo da busca por código).
+    """
+    from exporters import export_query
+    from repository import range_query
+
+    variants = []
+    for transportadora in (None, "transportadora"):
+        for status in (None, STATUS_COLLECTED):
+            sql, params = export_query("start", "end", transportadora, status)
+            name = "export" + ("_carrier" if transportadora else "") + ("_status" if status else "")
+            variants.append(Query(name, sql, tuple(params), True))
+
+    for name, term in (("history_search_prefix", "GC"), ("history_search_trigram", "12345")):
+        sql, params = range_query(cursor, "start", "end", "transportadora", term)
+        variants.append(Query(name, sql, tuple(params), True))
+
+    variants.append(Query("verify_codes", verify_codes_query(3), ("codigo", "codigo", "codigo"), False))
+    return variants
+
@@ -0,0 +1,238 @@
+# registered_codes.py
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from config import (
+    BLOOM_FALSE_POSITIVE_RATE, REGISTERED_CODES_DIR, REGISTERED_CODES_REFRESH_SECONDS, logging
+)
+from bloom import BloomFilter
+from queries import PACKAGES_MAX_ID, PACKAGE_CODES_PAGE, PACKAGE_CODES_AFTER
+
+# Folga de capacidade do filtro em relação à quantidade de códigos existente
+BLOOM_GROWTH_FACTOR = 2
+BLOOM_MIN_CAPACITY = 100_000
+
+# Pacotes lidos por consulta na reconstrução do filtro
+REBUILD_PAGE_SIZE = 10_000
+
+# O arquivo persistido guarda, antes do filtro, o maior id de pacote incluído
+_MAX_ID = struct.Struct("<Q")
+
+
+def build_bloom(cursor, fp_rate=BLOOM_FALSE_POSITIVE_RATE, on_batch=None, page_size=REBUILD_PAGE_SIZE):
+    """
+    Monta um filtro de Bloom com todos os códigos de `packages` até o maior id atual.
+    A varredura é feita em páginas de `page_size` pacotes por faixa de id, cada uma uma consulta
+    separada: sem WAL, uma única consulta longa manteria o banco bloqueado para as gravações das
+    outras estações até o fim. `on_batch()`, se informado, é chamado entre as páginas.
+    Retorna (filtro, maior id incluído).
+    """
+    cursor.execute(PACKAGES_MAX_ID)
+    max_id = cursor.fetchone()[0]
+    # Os ids acompanham a quantidade de pacotes (remoções apenas deixam folga no filtro)
+    bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, max_id * BLOOM_GROWTH_FACTOR), fp_rate)
+    last_id = 0
+    while True:
+        rows = cursor.execute(PACKAGE_CODES_PAGE, (last_id, max_id, page_size)).fetchall()
+        for _, codigo in rows:
+            bloom.add(codigo)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1][0]
+        if on_batch is not None:
+            on_batch()
+    return bloom, max_id
+
+
+def default_filter_path(db_path):
+    """
+    Caminho do filtro persistido para um banco de dados.
+    """
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(REGISTERED_CODES_DIR, f"{name}.bloom")
+
+
+class RegisteredCodesFilter:
+    """
+    Filtro probabilístico com todos os códigos já registrados em `packages`.
+    Responde "nunca registrado" em memória, sem consultar o SQLite.
+
+    Ao iniciar, carrega a cópia persistida em disco, acrescenta em segundo plano os pacotes gravados
+    depois dela (só então o filtro passa a responder), reconstrói o filtro a partir do banco e o
+    mantém atualizado com os pacotes gravados por outras conexões, consultando o banco a cada REGISTERED_CODES_REFRESH_SECONDS apenas quando
+    PRAGMA data_version indica que houve gravação. Códigos gravados por esta estação entram com `add`.
+    """
+    def __init__(self, db_path, fp_rate=BLOOM_FALSE_POSITIVE_RATE, persist_path=None):
+        self.db_path = db_path
+        self.fp_rate = fp_rate
+        self.persist_path = persist_path
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.bloom = None
+        self.max_id = 0
+        # False enquanto o filtro carregado do disco não inclui os pacotes gravados depois dele
+        self.current = False
+        # Códigos de `add` durante uma reconstrução, acrescentados ao novo filtro antes da troca
+        self.rebuild_adds = None
+        self.thread = None
+
+    @property
+    def ready(self):
+        return self.bloom is not None and self.current
+
+    def start(self):
+        """
+        Carrega o filtro persistido e inicia a reconstrução e a atualização em segundo plano.
+        """
+        self._load()
+        self.thread = threading.Thread(target=self._run, name="registered-codes", daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        """
+        Encerra a atualização e persiste o filtro atual.
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(5)
+        self.save()
+
+    def might_contain(self, codigo):
+        """
+        False: o código certamente nunca foi registrado. True: pode ter sido (ou o filtro não está pronto).
+        """
+        bloom = self.bloom
+        if bloom is None or not self.current:
+            return True
+        return codigo in bloom
+
+    def add(self, codigo):
+        """
+        Acrescenta um código gravado por esta estação, antes mesmo da próxima atualização.
+        """
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(codigo)
+            if self.rebuild_adds is not None:
+                self.rebuild_adds.append(codigo)
+
+    def rebuild(self, cursor):
+        """
+        Reconstrói o filtro a partir do banco (síncrono). Pacotes gravados por outras conexões
+        durante a varredura e códigos acrescentados com `add` entram no novo filtro antes que ele
+        substitua o atual, então nenhum código registrado deixa de ser visto na troca.
+        """
+        refreshed_at = time.monotonic()
+
+        def refresh():
+            # Entre as páginas, o filtro em uso recebe as gravações das outras estações
+            nonlocal refreshed_at
+            if self.ready and time.monotonic() - refreshed_at >= REGISTERED_CODES_REFRESH_SECONDS:
+                self.catch_up(cursor)
+                refreshed_at = time.monotonic()
+
+        with self.lock:
+            self.rebuild_adds = []
+        try:
+            bloom, max_id = build_bloom(cursor, self.fp_rate, on_batch=refresh)
+            cursor.execute(PACKAGE_CODES_AFTER, (max_id,))
+            for package_id, codigo in cursor.fetchall():
+                bloom.add(codigo)
+                max_id = package_id
+            with self.lock:
+                for codigo in self.rebuild_adds:
+                    bloom.add(codigo)
+                self.bloom = bloom
+                self.max_id = max_id
+                self.current = True
+        finally:
+            with self.lock:
+                self.rebuild_adds = None
+        return bloom
+
+    def catch_up(self, cursor):
+        """
+        Acrescenta os pacotes com id maior que o último incluído.
+        """
+        cursor.execute(PACKAGE_CODES_AFTER, (self.max_id,))
+        rows = cursor.fetchall()
+        with self.lock:
+            for package_id, codigo in rows:
+                self.bloom.add(codigo)
+                self.max_id = package_id
+
+    def save(self):
+        """
+        Grava o filtro em disco (arquivo temporário + substituição atômica).
+        """
+        if self.persist_path is None or self.bloom is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
+            tmp_path = self.persist_path + ".tmp"
+            with self.lock:
+                with open(tmp_path, "wb") as f:
+                    f.write(_MAX_ID.pack(self.max_id))
+                    self.bloom.dump(f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logging.error("Erro ao gravar o filtro de códigos registrados: %s", e)
+
+    def _load(self):
+        if self.persist_path is None or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                (max_id,) = _MAX_ID.unpack(f.read(_MAX_ID.size))
+                bloom = BloomFilter.load(f)
+        except (OSError, ValueError, struct.error) as e:
+            logging.warning("Filtro de códigos persistido inválido, será reconstruído: %s", e)
+            return
+        if bloom.fp_rate != self.fp_rate:
+            return
+        with self.lock:
+            self.bloom = bloom
+            self.max_id = max_id
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, uri=True)
+        except Exception as e:
+            logging.error("Erro ao abrir o banco para o filtro de códigos registrados: %s", e)
+            return
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(PACKAGES_MAX_ID)
+            if self.bloom is not None and self.max_id > cursor.fetchone()[0]:
+                # O filtro persistido é de outro banco (ex.: banco restaurado de backup)
+                with self.lock:
+                    self.bloom = None
+                    self.max_id = 0
+            if self.bloom is not None:
+                # Pacotes gravados por outras estações depois que a cópia persistida foi salva
+                self.catch_up(cursor)
+                self.current = True
+
+            # Com a cópia persistida em uso, a reconstrução completa elimina códigos removidos
+            # e redimensiona o filtro se ele estiver saturado
+            self.rebuild(cursor)
+            self.save()
+            logging.info("Filtro de códigos registrados pronto: %s códigos.", self.bloom.count)
+
+            data_version = None
+            while not self.stopping.wait(REGISTERED_CODES_REFRESH_SECONDS):
+                cursor.execute("PRAGMA data_version")
+                current = cursor.fetchone()[0]
+                if current != data_version:
+                    self.catch_up(cursor)
+                    data_version = current
+        except Exception as e:
+            logging.error("Erro ao atualizar o filtro de códigos registrados: %s", e)
+        finally:
+            conn.close()
@@ -0,0 +1,186 @@
+# repository.py
+
+import datetime
+
+from config import STATUS_PENDING
+from coletas import (
+    register_package, register_packages, remove_pending_package, remove_pending_packages, restore_packages
+)
+from search import code_filter_clause
+from queries import (
+    PENDING_ROWS, PACKAGE_PENDING_BY_CODE, JOURNAL_REPLICATED, VERIFY_LATEST, HISTORY_ALL, HISTORY_RANGE,
+    verify_codes_query
+)
+
+# Limite de parâmetros por instrução em versões antigas do SQLite (SQLITE_MAX_VARIABLE_NUMBER)
+MAX_VARIABLES = 999
+
+
+class PackageRecord:
+    """
+    Um pacote lido do banco, com o número e o status da coleta. Usa __slots__: cada registro ocupa
+    menos memória que um dicionário e pouco mais que a tupla da linha, e os campos têm nome em vez
+    de posição. `id` é None para bipagens ainda no diário local (não replicadas).
+    """
+    __slots__ = ("id", "codigo", "transportadora", "data", "hora", "status", "coleta_numero", "bipped_by")
+
+    def __init__(self, id, codigo, transportadora, data, hora, status, coleta_numero, bipped_by=None):
+        self.id = id
+        self.codigo = codigo
+        self.transportadora = transportadora
+        self.data = data
+        self.hora = hora
+        self.status = status
+        self.coleta_numero = coleta_numero
+        self.bipped_by = bipped_by
+
+    def __repr__(self):
+        return (f"PackageRecord(id={self.id!r}, codigo={self.codigo!r}, transportadora={self.transportadora!r}, "
+                f"data={self.data!r}, hora={self.hora!r}, status={self.status!r}, "
+                f"coleta_numero={self.coleta_numero!r}, bipped_by={self.bipped_by!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, PackageRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+def _record_factory(cursor, row):
+    # row_factory do sqlite3: as consultas de pacotes selecionam queries.PACKAGE_RECORD_COLUMNS
+    return PackageRecord(*row)
+
+
+def range_query(cursor, start_date, end_date, transportadora=None, code_term=None):
+    """
+    Retorna (SQL, parâmetros) da pesquisa de pacotes entre duas datas, opcionalmente de uma
+    transportadora e com código contendo `code_term`, dos mais recentes para os mais antigos.
+    """
+    query = HISTORY_RANGE
+    params = [start_date, end_date]
+    if transportadora is not None:
+        query += " AND p.transportadora = ?"
+        params.append(transportadora)
+    if code_term:
+        clause, clause_params = code_filter_clause(cursor, code_term, table_alias="p")
+        query += f" AND {clause}"
+        params.extend(clause_params)
+    query += " ORDER BY p.data DESC, p.hora DESC"
+    return query, params
+
+
+class PackageRepository:
+    """
+    Acesso aos pacotes para as telas e a linha de comando. As leituras devolvem PackageRecord e
+    usam sempre o mesmo texto SQL (queries.py), então o cache de instruções preparadas da conexão
+    do sqlite3 reaproveita a compilação a cada chamada. As gravações passam por coletas.py, que
+    mantém o contador e o ciclo de vida das coletas.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _records(self, sql, params=()):
+        cursor = self.conn.cursor()
+        cursor.row_factory = _record_factory
+        cursor.execute(sql, params)
+        return cursor
+
+    def pending(self, transportadora, data):
+        """
+        Pacotes das coletas abertas da transportadora no dia, na ordem de bipagem.
+        """
+        return self._records(PENDING_ROWS, (data, transportadora, STATUS_PENDING)).fetchall()
+
+    def find_pending(self, transportadora, data, codigo):
+        """
+        Pacote do código em uma coleta aberta da transportadora no dia (o mais recente, se o código
+        se repetir), ou None.
+        """
+        return self._records(PACKAGE_PENDING_BY_CODE, (codigo, data, transportadora, STATUS_PENDING)).fetchone()
+
+    def find_replicated(self, codigo, data, transportadora, hora, bipped_by):
+        """
+        Registro gravado pela replicação de uma bipagem do diário local, ou None.
+        """
+        return self._records(JOURNAL_REPLICATED, (codigo, data, transportadora, hora, bipped_by)).fetchone()
+
+    def latest(self, codigo):
+        """
+        Registro mais recente do código, ou None se nunca foi bipado.
+        """
+        return self._records(VERIFY_LATEST, (codigo,)).fetchone()
+
+    def get_many(self, codigos):
+        """
+        Registro mais recente de cada código, em um dicionário codigo -> PackageRecord
+        (códigos nunca bipados ficam de fora). Consulta em lotes de até MAX_VARIABLES códigos.
+        """
+        unique = list(dict.fromkeys(codigos))
+        latest = {}
+        for start in range(0, len(unique), MAX_VARIABLES):
+            chunk = unique[start:start + MAX_VARIABLES]
+            # Em ordem cronológica, o último registro de cada código prevalece
+            for record in self._records(verify_codes_query(len(chunk)), chunk):
+                latest[record.codigo] = record
+        return latest
+
+    def iter_range(self, start_date=None, end_date=None, transportadora=None, code_term=None):
+        """
+        Percorre os pacotes entre duas datas (sem datas, todo o histórico), dos mais recentes para
+        os mais antigos, lendo do banco à medida que são consumidos.
+        """
+        if start_date is None and end_date is None and transportadora is None and not code_term:
+            return iter(self._records(HISTORY_ALL))
+        sql, params = range_query(
+            self.conn.cursor(), start_date or "0000-01-01", end_date or "9999-12-31", transportadora, code_term
+        )
+        return iter(self._records(sql, params))
+
+    def insert(self, transportadora, codigo, bipped_by, now=None):
+        """
+        Grava um pacote na coleta aberta atual da transportadora e retorna seu PackageRecord.
+        """
+        now = now or datetime.datetime.now()
+        package_id, numero = register_package(self.conn, transportadora, codigo, bipped_by, now=now)
+        return PackageRecord(
+            package_id, codigo, transportadora, now.date().isoformat(), now.strftime("%H:%M:%S"),
+            STATUS_PENDING, numero, bipped_by
+        )
+
+    def insert_many(self, transportadora, codigos, bipped_by, now=None):
+        """
+        Grava vários pacotes na coleta aberta atual, em uma transação. Retorna o número da coleta.
+        """
+        return register_packages(self.conn, transportadora, codigos, bipped_by, now=now)
+
+    def remove(self, record):
+        """
+        Remove o pacote se a coleta dele ainda estiver aberta. Retorna True se foi removido.
+        """
+        return remove_pending_package(self.conn, record.id, record.codigo)
+
+    def remove_many(self, records):
+        """
+        Remove vários pacotes em uma transação. Retorna os registros removidos; os que já não
+        estavam em uma coleta aberta ficam de fora.
+        """
+        records = list({record.id: record for record in records}.values())
+        removed = set(remove_pending_packages(self.conn, [(record.id, record.codigo) for record in records]))
+        return [record for record in records if record.id in removed]
+
+    def restore(self, records):
+        """
+        Devolve pacotes removidos às suas coletas, se ainda estiverem abertas, em uma transação.
+        Retorna os novos registros (com novos ids).
+        """
+        restored = restore_packages(self.conn, [
+            (record.transportadora, record.codigo, record.data, record.hora, record.coleta_numero, record.bipped_by)
+            for record in records
+        ])
+        new_records = []
+        for position, package_id in restored:
+            record = records[position]
+            new_records.append(PackageRecord(
+                package_id, record.codigo, record.transportadora, record.data, record.hora, STATUS_PENDING,
+                record.coleta_numero, record.bipped_by
+            ))
+        return new_records
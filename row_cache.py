@@ -0,0 +1,193 @@
+# row_cache.py
+
+import collections
+import sys
+
+from config import ROW_CACHE_MAX_BYTES, STATUS_PENDING
+from queries import PENDING_SIGNATURE
+from repository import PackageRecord
+
+
+def _row_size(record):
+    return sys.getsizeof(record) + sum(sys.getsizeof(getattr(record, name)) for name in PackageRecord.__slots__)
+
+
+class _Entry:
+    """
+    Linhas em cache de uma transportadora/data e o resumo por coleta usado na validação:
+    numero -> [quantidade de pacotes, maior id].
+    """
+    __slots__ = ("rows", "size", "coletas", "verified")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.size = sum(_row_size(row) for row in rows)
+        self.coletas = {}
+        for row in rows:
+            self._count(row)
+        self.verified = True
+
+    def _count(self, row):
+        summary = self.coletas.setdefault(row.coleta_numero, [0, 0])
+        summary[0] += 1
+        summary[1] = max(summary[1], row.id)
+
+    def append(self, row):
+        self.rows.append(row)
+        self.size += _row_size(row)
+        self._count(row)
+
+    def remove(self, package_id):
+        for index, row in enumerate(self.rows):
+            if row.id == package_id:
+                break
+        else:
+            return False
+        del self.rows[index]
+        self.size -= _row_size(row)
+        numero = row.coleta_numero
+        remaining = [other.id for other in self.rows if other.coleta_numero == numero]
+        if remaining:
+            self.coletas[numero] = [len(remaining), max(remaining)]
+        else:
+            del self.coletas[numero]
+        return True
+
+    def remove_many(self, package_ids):
+        """
+        Retira vários pacotes percorrendo as linhas uma vez. Retorna quantos foram retirados.
+        """
+        kept = [row for row in self.rows if row.id not in package_ids]
+        removed = len(self.rows) - len(kept)
+        if removed:
+            self.rows = kept
+            self.size = sum(_row_size(row) for row in kept)
+            self.coletas = {}
+            for row in kept:
+                self._count(row)
+        return removed
+
+    def signature(self):
+        return sorted((numero, count, max_id) for numero, (count, max_id) in self.coletas.items())
+
+
+class PendingRowsCache:
+    """
+    Cache LRU, limitado em memória, dos pacotes das coletas abertas de cada transportadora no dia,
+    como PackageRecord (ver repository.py).
+
+    As gravações desta conexão são aplicadas com `add`, `remove` e `invalidate`. Gravações de outras
+    conexões (outras estações, replicação do diário local) são detectadas por PRAGMA data_version:
+    quando ele muda, cada transportadora é conferida na próxima leitura com uma consulta pequena à
+    tabela coletas (quantidade e maior id de pacote por coleta aberta) e só é recarregada se diferir.
+    Como os ids de pacote nunca são reutilizados (AUTOINCREMENT), remoção seguida de bipagem também
+    muda o resumo.
+    """
+    def __init__(self, repository, max_bytes=ROW_CACHE_MAX_BYTES):
+        self.repository = repository
+        self.cursor = repository.conn.cursor()
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.data_version = None
+
+    def get(self, transportadora, data):
+        """
+        Retorna a lista de linhas (não modificar) das coletas abertas da transportadora no dia.
+        """
+        self._check_data_version()
+        key = (transportadora, data)
+        entry = self.entries.get(key)
+        if entry is not None and not entry.verified:
+            if self._signature(transportadora, data) == entry.signature():
+                entry.verified = True
+            else:
+                self._drop(key)
+                entry = None
+
+        if entry is None:
+            entry = self._load(transportadora, data)
+        else:
+            self.entries.move_to_end(key)
+        return entry.rows
+
+    def add(self, record):
+        """
+        Acrescenta um pacote gravado por esta conexão, se a transportadora estiver em cache.
+        """
+        entry = self.entries.get((record.transportadora, record.data))
+        if entry is not None:
+            self.size -= entry.size
+            entry.append(record)
+            self.size += entry.size
+            self._evict()
+
+    def remove(self, transportadora, data, package_id):
+        """
+        Retira um pacote removido por esta conexão.
+        """
+        key = (transportadora, data)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.size -= entry.size
+            if not entry.remove(package_id):
+                # Estado inesperado: recarrega na próxima leitura
+                self.entries.pop(key)
+                return
+            self.size += entry.size
+
+    def remove_many(self, transportadora, data, package_ids):
+        """
+        Retira de uma vez vários pacotes removidos por esta conexão (remoção por bipagem).
+        """
+        key = (transportadora, data)
+        entry = self.entries.get(key)
+        if entry is not None:
+            package_ids = set(package_ids)
+            self.size -= entry.size
+            if entry.remove_many(package_ids) != len(package_ids):
+                # Estado inesperado: recarrega na próxima leitura
+                self.entries.pop(key)
+                return
+            self.size += entry.size
+
+    def invalidate(self, transportadora=None, data=None):
+        """
+        Descarta as linhas de uma transportadora/data (ex.: após fechar ou reabrir coletas) ou, sem
+        argumentos, o cache inteiro.
+        """
+        if transportadora is None:
+            self.entries.clear()
+            self.size = 0
+        else:
+            self._drop((transportadora, data))
+
+    def _check_data_version(self):
+        self.cursor.execute("PRAGMA data_version")
+        current = self.cursor.fetchone()[0]
+        if current != self.data_version:
+            self.data_version = current
+            for entry in self.entries.values():
+                entry.verified = False
+
+    def _signature(self, transportadora, data):
+        self.cursor.execute(PENDING_SIGNATURE, (data, transportadora, STATUS_PENDING))
+        return sorted(self.cursor.fetchall())
+
+    def _load(self, transportadora, data):
+        entry = _Entry(self.repository.pending(transportadora, data))
+        self.entries[(transportadora, data)] = entry
+        self.size += entry.size
+        self._evict()
+        return entry
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self):
+        # A entrada mais recente fica mesmo que sozinha passe do limite
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.size -= entry.size
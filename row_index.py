@@ -0,0 +1,54 @@
+# row_index.py
+
+import bisect
+
+
+def _range(keys, positions, term):
+    """
+    Posições das chaves (lista ordenada) que começam com `term`.
+    """
+    low = bisect.bisect_left(keys, term)
+    high = bisect.bisect_left(keys, term[:-1] + chr(ord(term[-1]) + 1), low)
+    return positions[low:high]
+
+
+class CodeIndex:
+    """
+    Índice em memória dos códigos exibidos na lista da tela principal, para o filtro por início
+    ou final do código. Guarda os códigos ordenados e os códigos invertidos ordenados: cada termo
+    é respondido com duas buscas binárias, sem consultar o banco e sem percorrer a lista.
+    As posições são as da ordem de exibição (a ordem dos códigos recebidos). Os códigos e os termos
+    são comparados em maiúsculas.
+    """
+    def __init__(self, codes=()):
+        codes = [code.upper() for code in codes]
+        self.size = len(codes)
+        self.prefix_positions = sorted(range(self.size), key=codes.__getitem__)
+        self.prefix_keys = [codes[i] for i in self.prefix_positions]
+        reversed_codes = [code[::-1] for code in codes]
+        self.suffix_positions = sorted(range(self.size), key=reversed_codes.__getitem__)
+        self.suffix_keys = [reversed_codes[i] for i in self.suffix_positions]
+
+    def __len__(self):
+        return self.size
+
+    def match(self, term):
+        """
+        Posições, na ordem de exibição, dos códigos que começam ou terminam com `term`
+        (sem diferenciar maiúsculas). Sem termo, todas as posições.
+        """
+        term = term.strip().upper()
+        if not term:
+            return range(self.size)
+        found = set(_range(self.prefix_keys, self.prefix_positions, term))
+        found.update(_range(self.suffix_keys, self.suffix_positions, term[::-1]))
+        return sorted(found)
+
+    def find(self, code):
+        """
+        Posições, na ordem de exibição, dos códigos iguais a `code` (remoção por bipagem).
+        """
+        code = code.strip().upper()
+        low = bisect.bisect_left(self.prefix_keys, code)
+        high = bisect.bisect_right(self.prefix_keys, code, low)
+        return sorted(self.prefix_positions[low:high])
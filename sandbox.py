@@ -0,0 +1,128 @@
+# sandbox.py
+
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import urllib.request
+
+from config import DB_PATH, STATUS_PENDING, logging
+from database import get_database_connection
+from coletas import begin_immediate, get_or_open_coleta
+from queries import PACKAGE_INSERT, COLETA_ADD_COUNT, SANDBOX_SAMPLE_COLETAS, SANDBOX_SAMPLE_PACKAGES
+
+TRAINING_OPERATOR = "treino"
+
+_sandbox_ids = itertools.count(1)
+
+
+def _readonly_uri(path):
+    return "file:" + urllib.request.pathname2url(os.path.abspath(path)) + "?mode=ro"
+
+
+def training_code(transportadora, n):
+    """
+    Código sintético no formato da transportadora.
+    """
+    if transportadora == "SHEIN":
+        return f"GC{n:016d}"
+    if transportadora == "Shopee":
+        return f"BR{n % 10**13:013d}"
+    return f"44{n % 10**9:09d}"
+
+
+class TrainingSandbox:
+    """
+    Banco de dados descartável do modo de teste, mantido em memória (VFS memdb do SQLite). O banco
+    tem nome compartilhado: a tela de teste, o registro de bipagens e o filtro de códigos abrem suas
+    próprias conexões com `uri` como se fosse um arquivo, com o bloqueio normal do SQLite, e nada é
+    gravado em disco. O banco existe enquanto a conexão âncora (`conn`) estiver aberta.
+
+    O esquema é criado por initialize_database, igual ao de produção. Opcionalmente, os pacotes e coletas
+    dos últimos `sample_days` dias são copiados do banco principal, e `training_load` pré-carrega pacotes
+    sintéticos nas coletas abertas do dia. O estado inicial fica guardado em uma cópia em memória e `reset` o restaura com a
+    API de backup, sem refazer a carga.
+    """
+    def __init__(self, transportadoras, source_path=DB_PATH, sample_days=0, training_load=0):
+        self.uri = f"file:/contador_teste_{os.getpid()}_{next(_sandbox_ids)}?vfs=memdb"
+        self.conn, cursor = get_database_connection(db_path=self.uri)
+        try:
+            if sample_days and source_path and os.path.exists(source_path):
+                self._copy_from(cursor, source_path, sample_days)
+            if training_load:
+                self._load_training(transportadoras, training_load)
+            self.pristine = sqlite3.connect(":memory:")
+            self.conn.backup(self.pristine)
+        except Exception:
+            self.conn.close()
+            raise
+
+    def connect(self):
+        """
+        Nova conexão ao banco de teste. Retorna (conexão, cursor).
+        """
+        return get_database_connection(db_path=self.uri)
+
+    def reset(self):
+        """
+        Restaura o estado inicial. As outras conexões continuam válidas e passam a ver o banco restaurado;
+        caches baseados em ids (filtro de códigos, cache de linhas) devem ser recriados por quem os usa.
+        """
+        self.pristine.backup(self.conn)
+        logging.info("Banco de teste reiniciado.")
+
+    def close(self):
+        self.pristine.close()
+        self.conn.close()
+
+    def _copy_from(self, cursor, source_path, sample_days):
+        # Conexão separada: um ATTACH herdaria o VFS em memória do banco de teste
+        source = sqlite3.connect(_readonly_uri(source_path), uri=True)
+        try:
+            begin_immediate(self.conn)
+            since = (datetime.date.today() - datetime.timedelta(days=sample_days - 1)).isoformat()
+            cursor.executemany("""
+                INSERT INTO coletas (id, transportadora, data, numero, status, opened_at, closed_at, package_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, source.execute(SANDBOX_SAMPLE_COLETAS, (since,)))
+            cursor.executemany("""
+                INSERT INTO packages (id, transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, source.execute(SANDBOX_SAMPLE_PACKAGES, (since,)))
+            logging.info("Banco de teste: %s pacotes reais copiados desde %s.", cursor.rowcount, since)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            source.close()
+
+    def _load_training(self, transportadoras, total):
+        """
+        Divide `total` pacotes sintéticos entre as transportadoras, na coleta aberta do dia de cada uma,
+        com horários espaçados até o momento atual.
+        """
+        now = datetime.datetime.now()
+        data = now.date().isoformat()
+        start = datetime.datetime.combine(now.date(), datetime.time(6))
+        step = max((now - start).total_seconds(), 0) / max(total, 1)
+        base = random.randrange(10**8) * 10**8
+        cursor = self.conn.cursor()
+        try:
+            begin_immediate(self.conn)
+            for index, transportadora in enumerate(transportadoras):
+                count = total // len(transportadoras) + (index < total % len(transportadoras))
+                coleta_id, numero = get_or_open_coleta(cursor, transportadora, data, f"{data} 06:00:00")
+                rows = []
+                for i in range(count):
+                    hora = (start + datetime.timedelta(seconds=step * (i * len(transportadoras) + index))).strftime("%H:%M:%S")
+                    rows.append((transportadora, training_code(transportadora, base + i), data, hora,
+                                 STATUS_PENDING, numero, TRAINING_OPERATOR, coleta_id))
+                cursor.executemany(PACKAGE_INSERT, rows)
+                cursor.execute(COLETA_ADD_COUNT, (count, coleta_id))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        logging.info("Banco de teste: carga de treino com %s pacotes.", total)
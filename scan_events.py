@@ -0,0 +1,149 @@
+# scan_events.py
+
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+from config import (
+    STATION_ID, SCAN_EVENT_RETENTION_DAYS, SCAN_EVENT_BATCH_SIZE,
+    SCAN_EVENT_FLUSH_SECONDS, logging
+)
+from queries import SCAN_EVENTS_INSERT, SCAN_EVENTS_PURGE, SCAN_EVENTS_BY_OPERATOR
+
+# Resultados possíveis de uma tentativa de bipagem (gravados como inteiro para economizar espaço)
+OUTCOME_OK = 0
+OUTCOME_DUPLICATE = 1
+OUTCOME_INVALID = 2
+OUTCOME_NOTA_FISCAL = 3
+OUTCOME_WRONG_CARRIER = 4
+OUTCOME_UNRECOGNIZED = 5
+OUTCOME_NO_CARRIER = 6
+OUTCOME_ERROR = 7
+
+OUTCOME_LABELS = {
+    OUTCOME_OK: "Aceito",
+    OUTCOME_DUPLICATE: "Duplicado",
+    OUTCOME_INVALID: "Código inválido",
+    OUTCOME_NOTA_FISCAL: "Nota Fiscal",
+    OUTCOME_WRONG_CARRIER: "Transportadora errada",
+    OUTCOME_UNRECOGNIZED: "Não reconhecido",
+    OUTCOME_NO_CARRIER: "Sem transportadora",
+    OUTCOME_ERROR: "Erro ao salvar",
+}
+
+_STOP = object()
+
+
+def now_us():
+    """
+    Timestamp atual em microssegundos desde a época Unix.
+    """
+    return time.time_ns() // 1000
+
+
+def day_bounds_us(start_date, end_date):
+    """
+    Converte um intervalo de datas ISO (inclusivo) em [início, fim) em microssegundos, no horário local.
+    """
+    start = datetime.datetime.fromisoformat(start_date)
+    end = datetime.datetime.fromisoformat(end_date) + datetime.timedelta(days=1)
+    return int(start.timestamp() * 1_000_000), int(end.timestamp() * 1_000_000)
+
+
+def purge_old_events(cursor, retention_days=SCAN_EVENT_RETENTION_DAYS):
+    """
+    Remove eventos mais antigos que o período de retenção. Retorna a quantidade removida.
+    """
+    cutoff = now_us() - retention_days * 86_400 * 1_000_000
+    cursor.execute(SCAN_EVENTS_PURGE, (cutoff,))
+    return cursor.rowcount
+
+
+class ScanEventLog:
+    """
+    Registro append-only de tentativas de bipagem.
+    `record` apenas enfileira o evento; uma thread em segundo plano grava os eventos em lotes
+    com sua própria conexão, fora do caminho da bipagem.
+    """
+    def __init__(self, db_path, station=STATION_ID):
+        self.db_path = db_path
+        self.station = station
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="scan-event-log", daemon=True)
+        self.thread.start()
+
+    def record(self, outcome, codigo, transportadora, operator):
+        """
+        Enfileira uma tentativa de bipagem com o horário atual em microssegundos.
+        """
+        self.queue.put((now_us(), outcome, codigo, transportadora, operator, self.station))
+
+    def close(self, timeout=5):
+        """
+        Grava os eventos pendentes e encerra a thread de gravação.
+        """
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30, uri=True)
+        except Exception as e:
+            logging.error("Erro ao abrir o registro de bipagens: %s", e)
+            return
+
+        try:
+            removed = purge_old_events(conn.cursor())
+            conn.commit()
+            if removed:
+                logging.info("Registro de bipagens: %s eventos antigos removidos.", removed)
+        except Exception as e:
+            logging.error("Erro ao aplicar a retenção do registro de bipagens: %s", e)
+
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self.queue.get()
+                deadline = time.monotonic() + SCAN_EVENT_FLUSH_SECONDS
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= SCAN_EVENT_BATCH_SIZE:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                pass
+
+            if batch:
+                self._write(conn, batch)
+
+        conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            conn.executemany(SCAN_EVENTS_INSERT, batch)
+            conn.commit()
+        except Exception as e:
+            logging.error("Erro ao gravar %s eventos de bipagem: %s", len(batch), e)
+            conn.rollback()
+
+
+def outcome_counts_by_operator(cursor, start_date, end_date):
+    """
+    Conta as tentativas por operador e resultado no período, com uma única consulta agrupada.
+    Retorna {operador: {outcome: quantidade}}.
+    """
+    start_us, end_us = day_bounds_us(start_date, end_date)
+    cursor.execute(SCAN_EVENTS_BY_OPERATOR, (start_us, end_us))
+    counts = {}
+    for operator, outcome, count in cursor.fetchall():
+        counts.setdefault(operator, {})[outcome] = count
+    return counts
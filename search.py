@@ -0,0 +1,94 @@
+# search.py
+
+import sqlite3
+from config import SEARCH_RESULT_LIMIT, logging
+from queries import SEARCH_INDEX_EXISTS, SEARCH_PREFIX, SEARCH_TRIGRAM, SEARCH_LIKE
+
+# Tamanho mínimo de termo atendido pelo índice de trigramas
+TRIGRAM_LENGTH = 3
+
+
+def search_index_available(cursor):
+    """
+    Indica se o índice FTS5 de códigos existe neste banco de dados.
+    """
+    cursor.execute(SEARCH_INDEX_EXISTS)
+    return cursor.fetchone() is not None
+
+
+def _fts_phrase(term):
+    """
+    Converte o termo em uma frase FTS5, escapando aspas.
+    """
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _prefix_bounds(term):
+    """
+    Retorna o intervalo [term, limite) que cobre todos os códigos iniciados por `term`.
+    """
+    return term, term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def _case_variants(term):
+    """
+    Grafias do termo com cada letra em maiúscula ou minúscula. O intervalo no índice
+    idx_packages_codigo diferencia maiúsculas (o índice de trigramas e o LIKE não), então a busca
+    por prefixo cobre cada grafia; com termos curtos são no máximo quatro.
+    """
+    variants = [""]
+    for char in term:
+        options = sorted({char.upper(), char.lower()})
+        variants = [variant + option for variant in variants for option in options]
+    return variants
+
+
+def search_package_codes(cursor, term, limit=SEARCH_RESULT_LIMIT):
+    """
+    Busca pacotes cujo código contém `term` em todo o histórico.
+    Termos curtos (menos de 3 caracteres) são tratados como prefixo e usam o índice
+    idx_packages_codigo; os demais usam o índice de trigramas. Nos dois casos, sem diferenciar
+    maiúsculas de minúsculas. Retorna tuplas
+    (codigo_pacote, transportadora, data), das mais recentes para as mais antigas.
+    """
+    term = term.strip().upper()
+    if not term:
+        return []
+
+    if len(term) < TRIGRAM_LENGTH:
+        rows = []
+        for variant in _case_variants(term):
+            low, high = _prefix_bounds(variant)
+            cursor.execute(SEARCH_PREFIX, (low, high, limit))
+            rows.extend(cursor.fetchall())
+        return sorted(rows)[:limit]
+
+    if search_index_available(cursor):
+        try:
+            cursor.execute(SEARCH_TRIGRAM, (_fts_phrase(term), limit))
+            return cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            logging.warning("Falha na busca pelo índice de códigos, usando LIKE: %s", e)
+
+    cursor.execute(SEARCH_LIKE, (f"%{term}%", limit))
+    return cursor.fetchall()
+
+
+def code_filter_clause(cursor, term, table_alias=None):
+    """
+    Retorna (fragmento SQL, parâmetros) que restringe uma consulta em `packages`
+    aos códigos que contêm `term`, para ser anexado com AND a um WHERE existente.
+    Use `table_alias` quando `packages` tiver um apelido na consulta (ex.: em JOINs).
+    """
+    prefix = f"{table_alias}." if table_alias else ""
+    term = term.strip().upper()
+    if len(term) < TRIGRAM_LENGTH:
+        ranges = []
+        params = []
+        for variant in _case_variants(term):
+            ranges.append(f"({prefix}codigo_pacote >= ? AND {prefix}codigo_pacote < ?)")
+            params.extend(_prefix_bounds(variant))
+        return "(" + " OR ".join(ranges) + ")", params
+    if search_index_available(cursor):
+        return f"{prefix}id IN (SELECT rowid FROM packages_search WHERE packages_search MATCH ?)", [_fts_phrase(term)]
+    return f"{prefix}codigo_pacote LIKE ?", [f"%{term}%"]
@@ -0,0 +1,281 @@
+# shards.py
+
+import collections
+import heapq
+import itertools
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    DB_PATH, SITE_ID, SITES_FILE, SHARD_WORKERS, SHARD_TIMEOUT_SECONDS, SHARD_QUEUE_BATCHES,
+    EXPORT_FETCH_SIZE, STATUS_PENDING, STATUS_COLLECTED, logging
+)
+from exporters import iter_batches
+from profiler import TimedConnection
+from queries import CLI_DAILY_TOTALS, SHARD_FIRST_SCANS
+from repository import PackageRepository
+
+Shard = collections.namedtuple("Shard", "site path")
+
+# Fim das linhas de um banco na fila da exportação de todos os sites
+_DONE = object()
+
+
+def load_shards(sites_file=SITES_FILE, local_path=DB_PATH, site_id=SITE_ID):
+    """
+    Bancos de todos os sites: o deste site (`local_path`) primeiro, seguido dos listados em
+    `sites_file` ({"nome do site": "caminho do banco"}). Sem o arquivo, apenas o banco local.
+    """
+    shards = [Shard(site_id, local_path)]
+    if not os.path.exists(sites_file):
+        return shards
+    try:
+        with open(sites_file, encoding="utf-8") as f:
+            sites = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error("Erro ao ler a lista de sites %s: %s", sites_file, e)
+        return shards
+
+    local = os.path.abspath(local_path)
+    for site, path in sites.items():
+        # O próprio site pode estar na lista (o mesmo arquivo é distribuído a todos)
+        if site == site_id or os.path.abspath(path) == local:
+            continue
+        shards.append(Shard(site, path))
+    return shards
+
+
+def open_shard(path):
+    """
+    Abre o banco de um site somente para leitura: as consultas de todos os sites nunca gravam
+    no banco de outro site nem criam o arquivo se ele não existir.
+    """
+    uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=SHARD_TIMEOUT_SECONDS, factory=TimedConnection)
+
+
+def _with_site(rows, site):
+    # (codigo, transportadora, primeira bipagem) -> (codigo, site, transportadora, primeira bipagem)
+    for codigo, transportadora, first in rows:
+        yield codigo, site, transportadora, first
+
+
+def _site_records(records, site):
+    for record in records:
+        yield site, record
+
+
+class ShardSet:
+    """
+    Consultas sobre os bancos de todos os sites, sem copiar os dados para um único arquivo. Cada
+    banco é lido por uma thread com a sua própria conexão (o sqlite3 libera o GIL enquanto a
+    consulta roda) e os resultados são combinados em memória. Um banco indisponível (pasta
+    compartilhada fora do ar, arquivo bloqueado) não interrompe a consulta: os demais sites são
+    combinados e o erro fica em `failed` (site -> exceção) até a próxima consulta.
+    """
+    def __init__(self, shards=None, workers=SHARD_WORKERS):
+        self.shards = shards or load_shards()
+        self.workers = workers
+        self.failed = {}
+
+    def __len__(self):
+        return len(self.shards)
+
+    @property
+    def sites(self):
+        return [shard.site for shard in self.shards]
+
+    def _selected(self, sites):
+        return [shard for shard in self.shards if sites is None or shard.site in sites]
+
+    def _shard_failed(self, shard, error):
+        logging.error("Banco do site %s indisponível (%s): %s", shard.site, shard.path, error)
+        self.failed[shard.site] = error
+
+    def map(self, func, sites=None):
+        """
+        Roda `func(conn)` no banco de cada site (todos ou apenas `sites`), em paralelo.
+        Retorna [(site, resultado)] na ordem dos bancos, sem os sites indisponíveis.
+        """
+        self.failed = {}
+        shards = self._selected(sites)
+
+        def run(shard):
+            conn = open_shard(shard.path)
+            try:
+                return func(conn)
+            finally:
+                conn.close()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(shards)))) as executor:
+            futures = [(shard, executor.submit(run, shard)) for shard in shards]
+            for shard, future in futures:
+                try:
+                    results.append((shard.site, future.result()))
+                except sqlite3.Error as e:
+                    self._shard_failed(shard, e)
+        return results
+
+    def latest_many(self, codigos, sites=None):
+        """
+        Registro mais recente de cada código entre todos os sites, em um dicionário
+        codigo -> (site, PackageRecord). Códigos nunca bipados ficam de fora.
+        """
+        codigos = list(codigos)
+        latest = {}
+        for site, records in self.map(lambda conn: PackageRepository(conn).get_many(codigos), sites):
+            for codigo, record in records.items():
+                current = latest.get(codigo)
+                if current is None or (record.data, record.hora) > (current[1].data, current[1].hora):
+                    latest[codigo] = (site, record)
+        return latest
+
+    def latest(self, codigo, sites=None):
+        """
+        (site, PackageRecord) da bipagem mais recente do código entre todos os sites, ou None.
+        """
+        return self.latest_many([codigo], sites).get(codigo)
+
+    def _execute_all(self, shards, execute, connections):
+        """
+        Abre o banco de cada site e roda `execute(conn)`, que devolve um cursor. Retorna
+        [(site, cursor)] sem os sites indisponíveis; as conexões abertas são acrescentadas a
+        `connections`, para serem fechadas depois da leitura.
+        """
+        cursors = []
+        for shard in shards:
+            try:
+                conn = open_shard(shard.path)
+            except sqlite3.Error as e:
+                self._shard_failed(shard, e)
+                continue
+            connections.append(conn)
+            try:
+                cursors.append((shard.site, execute(conn)))
+            except sqlite3.Error as e:
+                self._shard_failed(shard, e)
+        return cursors
+
+    def iter_range(self, start_date=None, end_date=None, transportadora=None, code_term=None, sites=None):
+        """
+        Pacotes de todos os sites entre duas datas, como pares (site, PackageRecord), dos mais
+        recentes para os mais antigos. Cada banco devolve seus pacotes já ordenados e os cursores
+        são intercalados à medida que os pares são consumidos, então a memória não cresce com o
+        volume do período.
+        """
+        self.failed = {}
+        connections = []
+        try:
+            cursors = self._execute_all(
+                self._selected(sites),
+                lambda conn: PackageRepository(conn).iter_range(start_date, end_date, transportadora, code_term),
+                connections
+            )
+            yield from heapq.merge(
+                *[_site_records(records, site) for site, records in cursors],
+                key=lambda pair: (pair[1].data, pair[1].hora), reverse=True
+            )
+        finally:
+            for conn in connections:
+                conn.close()
+
+    def daily_totals(self, start_date, end_date, by_site=False):
+        """
+        Totais diários por transportadora somados entre os sites: linhas (data, transportadora,
+        coletas, pacotes, em aberto, coletados). Com `by_site`, uma linha por site, com o site
+        logo após a transportadora.
+        """
+        params = (STATUS_PENDING, STATUS_COLLECTED, start_date, end_date)
+        results = self.map(lambda conn: conn.execute(CLI_DAILY_TOTALS, params).fetchall())
+        if by_site:
+            rows = [(row[0], row[1], site) + tuple(row[2:]) for site, site_rows in results for row in site_rows]
+            return sorted(rows, key=lambda row: (row[0], row[1], self.sites.index(row[2])))
+
+        totals = {}
+        for _, site_rows in results:
+            for data, transportadora, *counts in site_rows:
+                current = totals.get((data, transportadora), [0] * len(counts))
+                totals[(data, transportadora)] = [a + (b or 0) for a, b in zip(current, counts)]
+        return [key + tuple(counts) for key, counts in sorted(totals.items())]
+
+    def reconcile(self, start_date, end_date):
+        """
+        Conciliação entre os sites: códigos bipados em mais de um site no período (etiqueta
+        duplicada ou pacote transferido sem baixa). Cada banco devolve seus códigos já ordenados
+        e as listas são intercaladas à medida que são lidas, então a memória não cresce com o
+        volume do período. Produz listas [(codigo, site, transportadora, primeira bipagem)],
+        uma por código.
+        """
+        self.failed = {}
+        connections = []
+        try:
+            cursors = self._execute_all(
+                self.shards, lambda conn: conn.execute(SHARD_FIRST_SCANS, (start_date, end_date)), connections
+            )
+            merged = heapq.merge(*[_with_site(rows, site) for site, rows in cursors], key=lambda row: row[0])
+            for _, rows in itertools.groupby(merged, key=lambda row: row[0]):
+                rows = list(rows)
+                if len({row[1] for row in rows}) > 1:
+                    yield rows
+        finally:
+            for conn in connections:
+                conn.close()
+
+    def iter_batches(self, sql, params=(), size=EXPORT_FETCH_SIZE):
+        """
+        Executa a consulta em todos os bancos ao mesmo tempo e produz lotes de até `size` linhas
+        com o site acrescentado ao final de cada linha, na ordem em que ficam prontos (para
+        exporters.write_csv / write_parquet com with_site=True). Cada banco lê no máximo
+        SHARD_QUEUE_BATCHES lotes à frente do consumo, então a memória não cresce com o total.
+        """
+        self.failed = {}
+        shards = self.shards
+        batches = queue.Queue(maxsize=SHARD_QUEUE_BATCHES * len(shards))
+        stop = threading.Event()
+
+        def put(item):
+            # Espera por espaço na fila até o consumidor desistir (gerador fechado)
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read(shard):
+            try:
+                if stop.is_set():
+                    return
+                conn = open_shard(shard.path)
+                try:
+                    suffix = (shard.site,)
+                    for rows in iter_batches(conn.execute(sql, params), size):
+                        if not put([row + suffix for row in rows]):
+                            return
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                self._shard_failed(shard, e)
+            finally:
+                put(_DONE)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(shards)))) as executor:
+            for shard in shards:
+                executor.submit(read, shard)
+            try:
+                remaining = len(shards)
+                while remaining:
+                    item = batches.get()
+                    if item is _DONE:
+                        remaining -= 1
+                    else:
+                        yield item
+            finally:
+                stop.set()
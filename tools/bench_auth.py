@@ -0,0 +1,92 @@
+# tools/bench_auth.py
+"""
+Medições do login: custo do bcrypt, atraso da thread da interface e desbloqueio pelo cache.
+
+Uso:
+    python tools/bench_auth.py [--rounds 10 11 12 13] [--logins 12]
+
+Para cada custo, mede o tempo de uma verificação de senha. Em seguida simula `--logins`
+logins seguidos (troca de turno) com a autenticação em uma thread enquanto a thread principal
+processa "eventos" a cada 10 ms, como o laço do Tk, e informa o maior atraso entre eventos.
+Por fim mede o desbloqueio da tela pelo cache em memória.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
+from auth import UnlockCache, authenticate
+from database import get_database_connection
+
+TICK_SECONDS = 0.01
+
+
+def time_checkpw(rounds, repeat=3):
+    hashed = bcrypt.hashpw(b"senha-de-teste", bcrypt.gensalt(rounds))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        bcrypt.checkpw(b"senha-de-teste", hashed)
+    return (time.perf_counter() - start) / repeat
+
+
+def max_tick_delay(work):
+    """
+    Executa `work` em uma thread e mede o maior atraso de um laço de eventos de 10 ms na thread principal.
+    """
+    thread = threading.Thread(target=work)
+    worst = 0.0
+    thread.start()
+    expected = time.perf_counter() + TICK_SECONDS
+    while thread.is_alive():
+        time.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        worst = max(worst, now - expected)
+        expected = now + TICK_SECONDS
+    thread.join()
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--logins", type=int, default=12)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        print(f"bcrypt custo {rounds}: {time_checkpw(rounds) * 1000:7.1f} ms por verificação")
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_auth_"), "auth.db")
+    get_database_connection(db_path=db_path)[0].close()
+
+    def shift_change():
+        for _ in range(args.logins):
+            assert authenticate(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, db_path, cache=None)
+
+    start = time.perf_counter()
+    delay = max_tick_delay(shift_change)
+    elapsed = time.perf_counter() - start
+    print(f"{args.logins} logins (custo {BCRYPT_ROUNDS}) em segundo plano: {elapsed:.2f}s, "
+          f"maior atraso do laço de eventos {delay * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    shift_change()
+    print(f"Os mesmos logins na thread da interface a bloqueariam por {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    cache = UnlockCache()
+    authenticate(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, db_path, cache=cache)
+    start = time.perf_counter()
+    for _ in range(1000):
+        authenticate(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, db_path, cache=cache)
+    print(f"Desbloqueio pelo cache: {(time.perf_counter() - start) * 1000:.3f} µs por login")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# tools/bench_duplicates.py
+"""
+Benchmark da checagem de duplicados sobre um histórico grande de códigos.
+
+Uso:
+    python tools/bench_duplicates.py --rows 10000000 --probes 100000 [--db caminho.db]
+
+Gera (ou reaproveita) um banco com `--rows` códigos históricos e mede, em microssegundos por
+consulta, a política "ever" só com o índice e com o filtro de Bloom, para códigos nunca vistos
+(o caso comum) e para códigos existentes.
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import initialize_database
+from duplicates import DuplicatePolicy, POLICY_EVER
+from registered_codes import RegisteredCodesFilter
+
+
+def synthetic_code(n):
+    return f"GC{n:016d}"
+
+
+def populate(conn, rows, batch=200_000):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM packages")
+    existing = cursor.fetchone()[0]
+    start_day = datetime.date(2020, 1, 1)
+    n = existing
+    while n < rows:
+        chunk = []
+        for i in range(n, min(rows, n + batch)):
+            day = (start_day + datetime.timedelta(days=i // 5000)).isoformat()
+            chunk.append(("SHEIN", synthetic_code(i * 2), day, "12:00:00", "collected", 1, "bench"))
+        cursor.executemany("""
+            INSERT INTO packages (transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+        conn.commit()
+        n += len(chunk)
+        print(f"  {n:,} códigos gravados", end="\r")
+    print()
+
+
+def time_checks(policy, cursor, codes):
+    start = time.perf_counter()
+    found = 0
+    for codigo in codes:
+        if policy.find_duplicate(cursor, "SHEIN", codigo):
+            found += 1
+    elapsed = time.perf_counter() - start
+    return elapsed / len(codes) * 1e6, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--probes", type=int, default=100_000)
+    parser.add_argument("--db", help="banco a criar/reaproveitar (padrão: arquivo temporário)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"bench_duplicates_{args.rows}.db")
+    conn = sqlite3.connect(db_path)
+    initialize_database(conn, conn.cursor())
+
+    print(f"Banco: {db_path}")
+    start = time.perf_counter()
+    populate(conn, args.rows)
+    print(f"Carga: {time.perf_counter() - start:.1f}s, {os.path.getsize(db_path) / 2**20:.0f} MiB")
+
+    cursor = conn.cursor()
+    # Códigos pares existem no histórico; ímpares nunca foram bipados
+    missing = [synthetic_code(random.randrange(args.rows) * 2 + 1) for _ in range(args.probes)]
+    present = [synthetic_code(random.randrange(args.rows) * 2) for _ in range(args.probes)]
+
+    index_only = DuplicatePolicy(mode=POLICY_EVER, use_bloom=False)
+    us, _ = time_checks(index_only, cursor, missing)
+    print(f"Índice, código nunca visto: {us:.2f} µs/consulta")
+    us, _ = time_checks(index_only, cursor, present)
+    print(f"Índice, código existente:   {us:.2f} µs/consulta")
+
+    start = time.perf_counter()
+    codes_filter = RegisteredCodesFilter(db_path)
+    bloom = codes_filter.rebuild(cursor)
+    print(f"Filtro de Bloom: montado em {time.perf_counter() - start:.1f}s, "
+          f"{len(bloom.bits) / 2**20:.1f} MiB, {bloom.hashes} hashes")
+
+    with_bloom = DuplicatePolicy(codes_filter, mode=POLICY_EVER)
+    us, _ = time_checks(with_bloom, cursor, missing)
+    print(f"Bloom, código nunca visto:  {us:.2f} µs/consulta")
+    fp = sum(1 for codigo in missing if codigo in bloom) / len(missing)
+    print(f"Bloom, taxa de falsos positivos medida: {fp:.4%} (configurada {bloom.fp_rate:.4%})")
+    us, _ = time_checks(with_bloom, cursor, present)
+    print(f"Bloom, código existente:    {us:.2f} µs/consulta")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
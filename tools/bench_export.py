@@ -0,0 +1,118 @@
+# tools/bench_export.py
+"""
+Benchmark da exportação: CSV (formato atual) x Parquet.
+
+Uso:
+    python tools/bench_export.py --rows 2000000 [--db caminho.db] [--row-group 100000]
+
+Gera (ou reaproveita) um banco com `--rows` pacotes distribuídos entre as transportadoras e
+mede o tempo de exportação de todo o período e o tamanho do arquivo em cada formato,
+além do tempo de leitura do Parquet de volta. Requer o pacote pyarrow.
+"""
+
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PARQUET_ROW_GROUP_SIZE, STATUS_COLLECTED
+from database import initialize_database
+from exporters import PARQUET_AVAILABLE, export_query, iter_batches, write_csv, write_parquet
+
+TRANSPORTADORAS = ["SHEIN", "Shopee", "Mercado Livre"]
+OPERADORES = ["ana", "bruno", "carla", "diego", "elisa"]
+PACKAGES_PER_DAY = 5000
+
+
+def populate(conn, rows, batch=200_000):
+    """
+    Grava pacotes com uma coleta fechada por transportadora e dia.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM packages")
+    n = cursor.fetchone()[0]
+    start_day = datetime.date(2020, 1, 1)
+    coletas = {}
+    while n < rows:
+        chunk = []
+        for i in range(n, min(rows, n + batch)):
+            day = (start_day + datetime.timedelta(days=i // PACKAGES_PER_DAY)).isoformat()
+            transportadora = TRANSPORTADORAS[i % len(TRANSPORTADORAS)]
+            key = (transportadora, day)
+            if key not in coletas:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO coletas (transportadora, data, numero, status, opened_at, closed_at, package_count)
+                    VALUES (?, ?, 1, ?, ?, ?, 0)
+                """, (transportadora, day, STATUS_COLLECTED, f"{day} 08:00:00", f"{day} 18:00:00"))
+                cursor.execute("SELECT id FROM coletas WHERE transportadora = ? AND data = ? AND numero = 1", key)
+                coletas[key] = cursor.fetchone()[0]
+            seconds = 8 * 3600 + (i % PACKAGES_PER_DAY) * 7
+            hora = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            chunk.append((transportadora, f"GC{i:016d}", day, hora, STATUS_COLLECTED, 1,
+                          OPERADORES[i % len(OPERADORES)], coletas[key]))
+        cursor.executemany("""
+            INSERT INTO packages (transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+        conn.commit()
+        n += len(chunk)
+        print(f"  {n:,} pacotes gravados", end="\r")
+    print()
+
+
+def timed_export(conn, writer, file_path, **kwargs):
+    cursor = conn.cursor()
+    query, params = export_query("0000-01-01", "9999-12-31")
+    start = time.perf_counter()
+    cursor.execute(query, params)
+    count = writer(iter_batches(cursor), file_path, **kwargs)
+    return time.perf_counter() - start, count, os.path.getsize(file_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--db", help="banco a criar/reaproveitar (padrão: arquivo temporário)")
+    parser.add_argument("--row-group", type=int, default=PARQUET_ROW_GROUP_SIZE)
+    args = parser.parse_args()
+
+    if not PARQUET_AVAILABLE:
+        print("O benchmark requer o pacote pyarrow (pip install pyarrow).", file=sys.stderr)
+        return 1
+
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"bench_export_{args.rows}.db")
+    conn = sqlite3.connect(db_path)
+    initialize_database(conn, conn.cursor())
+    print(f"Banco: {db_path}")
+    populate(conn, args.rows)
+
+    out_dir = tempfile.mkdtemp(prefix="bench_export_")
+    csv_path = os.path.join(out_dir, "packages.csv")
+    parquet_path = os.path.join(out_dir, "packages.parquet")
+
+    seconds, count, size = timed_export(conn, write_csv, csv_path)
+    print(f"CSV:     {seconds:6.1f}s  {size / 2**20:8.1f} MiB  ({count:,} linhas)")
+    csv_size = size
+
+    seconds, count, size = timed_export(conn, write_parquet, parquet_path, row_group_size=args.row_group)
+    print(f"Parquet: {seconds:6.1f}s  {size / 2**20:8.1f} MiB  ({count:,} linhas, "
+          f"{size / csv_size:.1%} do CSV)")
+
+    import pyarrow.parquet as pq
+    start = time.perf_counter()
+    table = pq.read_table(parquet_path)
+    print(f"Leitura do Parquet: {time.perf_counter() - start:.2f}s, {table.num_rows:,} linhas, "
+          f"{pq.ParquetFile(parquet_path).num_row_groups} grupos de linhas")
+    print(f"Arquivos em {out_dir}")
+
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
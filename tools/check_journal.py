@@ -0,0 +1,181 @@
+# tools/check_journal.py
+"""
+Verificação do diário local de bipagens (journal.py) com um banco central de teste que pode ser
+desligado e religado, no lugar da pasta compartilhada.
+
+Uso:
+    python tools/check_journal.py
+
+Em uma pasta temporária: bipa com o banco acessível, desliga o banco, bipa sem conexão e confere
+que as bipagens ficam pendentes no diário e que a checagem de duplicados local as reconhece.
+Enquanto o banco está desligado, grava nele uma cópia exata de uma das bipagens (replicação
+interrompida antes de registrar a posição sincronizada) e a bipagem de outra estação para um dos
+códigos. Ao religar, confere que nada é gravado em dobro, que o código da outra estação é
+informado como conflito e que reabrir o diário não replica nada de novo. Por fim, duas estações
+replicam ao mesmo tempo os mesmos códigos: cada código deve ser gravado uma única vez, com um
+conflito para a outra estação.
+Termina com código 1 se alguma verificação falhar.
+"""
+
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_database_connection
+from coletas import register_package
+from duplicates import DuplicatePolicy, POLICY_SAME_DAY
+from journal import ScanJournal, apply_record, APPLIED, CONFLICT
+
+TRANSPORTADORA = "SHEIN"
+CODE_ONLINE = "GC0000000000000001"
+CODE_INTERRUPTED = "GC0000000000000002"
+CODE_CONFLICT = "GC0000000000000003"
+CONCURRENT_CODES = 200
+
+
+class PausableCentral:
+    """
+    Banco central de teste: com `paused`, abrir uma conexão ou usar uma já aberta falha como uma
+    pasta compartilhada fora do ar.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.paused = False
+
+    def connect(self):
+        self._check()
+        return _PausableConnection(self, sqlite3.connect(self.db_path, timeout=10))
+
+    def _check(self):
+        if self.paused:
+            raise sqlite3.OperationalError("banco central fora do ar (teste)")
+
+
+class _PausableConnection:
+    def __init__(self, central, conn):
+        self.central = central
+        self.conn = conn
+
+    def __getattr__(self, name):
+        if name not in ("rollback", "close", "in_transaction"):
+            self.central._check()
+        return getattr(self.conn, name)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def replicate_concurrently(db_path, policy):
+    """
+    Duas estações replicam os mesmos códigos ao mesmo tempo, código a código.
+    Retorna a contagem de cada resultado de apply_record.
+    """
+    today = datetime.date.today().isoformat()
+    barrier = threading.Barrier(2)
+    results = []
+    lock = threading.Lock()
+
+    def station(name):
+        conn = sqlite3.connect(db_path, timeout=10)
+        try:
+            for n in range(CONCURRENT_CODES):
+                record = {
+                    "codigo": f"GC77{n:014d}", "transportadora": TRANSPORTADORA, "bipped_by": name,
+                    "data": today, "hora": "12:00:00",
+                }
+                barrier.wait()
+                result, _ = apply_record(conn, record, policy)
+                with lock:
+                    results.append(result)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=station, args=(name,)) for name in ("estacao1", "estacao2")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {result: results.count(result) for result in set(results)}
+
+
+def main():
+    failed = 0
+
+    def check(name, ok):
+        nonlocal failed
+        print(f"{'ok    ' if ok else 'FALHOU'} {name}")
+        failed += not ok
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "central.db")
+        journal_dir = os.path.join(tmp, "journal")
+        conn = get_database_connection(db_path=db_path)[0]
+        count = lambda: conn.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+        today = datetime.date.today().isoformat()
+
+        central = PausableCentral(db_path)
+        policy = DuplicatePolicy(mode=POLICY_SAME_DAY, use_bloom=False)
+        journal = ScanJournal(db_path, journal_dir, station="estacao1", connect=central.connect, policy=policy)
+        try:
+            journal.append(TRANSPORTADORA, CODE_ONLINE, "operador1")
+            check("bipagem com o banco acessível replicada", journal.sync_now() and count() == 1)
+
+            central.paused = True
+            interrupted = journal.append(TRANSPORTADORA, CODE_INTERRUPTED, "operador1")
+            journal.append(TRANSPORTADORA, CODE_CONFLICT, "operador1")
+            check("queda do banco detectada", wait_for(lambda: not journal.online))
+            check("bipagens sem conexão pendentes no diário", len(journal.pending_records()) == 2)
+            check("banco central sem as bipagens sem conexão", count() == 1)
+            check("duplicados reconhecidos sem o banco", all(
+                journal.is_duplicate(today, TRANSPORTADORA, codigo) for codigo in (CODE_INTERRUPTED, CODE_CONFLICT)
+            ) and not journal.is_duplicate(today, TRANSPORTADORA, "GC0000000000000099"))
+
+            # Replicação interrompida antes de gravar a posição: o registro já está no banco
+            register_package(
+                conn, TRANSPORTADORA, CODE_INTERRUPTED, interrupted["bipped_by"],
+                now=datetime.datetime.fromisoformat(f"{interrupted['data']}T{interrupted['hora']}")
+            )
+            # Outra estação bipou o mesmo código durante a queda
+            register_package(conn, TRANSPORTADORA, CODE_CONFLICT, "operador2")
+
+            central.paused = False
+            check("diário replicado após a volta do banco", journal.sync_now(10) and journal.online)
+            check("replicação idempotente (nenhum registro em dobro)", count() == 3)
+            conflicts = journal.take_conflicts()
+            check("conflito informado", len(conflicts) == 1 and CODE_CONFLICT in conflicts[0])
+            check("conflito gravado em arquivo", os.path.exists(journal.conflicts_path))
+        finally:
+            central.paused = False
+            journal.close()
+
+        reopened = ScanJournal(db_path, journal_dir, station="estacao1", connect=central.connect, policy=policy)
+        try:
+            check("diário reaberto sem pendências", not reopened.pending_records())
+            time.sleep(0.5)
+            check("reabrir o diário não replica de novo", count() == 3)
+        finally:
+            reopened.close()
+
+        before = count()
+        results = replicate_concurrently(db_path, policy)
+        check("replicação concorrente grava cada código uma vez", count() - before == CONCURRENT_CODES
+              and results == {APPLIED: CONCURRENT_CODES, CONFLICT: CONCURRENT_CODES})
+        conn.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
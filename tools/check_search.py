@@ -0,0 +1,81 @@
+# tools/check_search.py
+"""
+Verificação da busca por trecho do código (search.py) com códigos gravados em maiúsculas e
+minúsculas.
+
+Uso:
+    python tools/check_search.py
+
+Em um banco temporário, grava códigos Shopee com letras minúsculas e maiúsculas e um código antigo
+todo em minúsculas (gravado antes da validação atual) e confere que a busca de "Verificar Pedido"
+e o filtro "Código contém" do histórico encontram os mesmos códigos pelos três caminhos (prefixo
+para termos curtos, índice de trigramas e LIKE, sem o índice), qualquer que seja a grafia do termo.
+Termina com código 1 se alguma verificação falhar.
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_database_connection
+from repository import PackageRepository
+from search import search_package_codes
+
+LOWER = "BRab1234567890x"
+UPPER = "BRAB1234567890Y"
+OTHER = "GC0000000000000001"
+LEGACY = "gc0000000000000002"
+
+# (termo, códigos esperados)
+CASES = [
+    ("br", {LOWER, UPPER}),
+    ("BR", {LOWER, UPPER}),
+    ("Br", {LOWER, UPPER}),
+    ("brab", {LOWER, UPPER}),
+    ("AB12", {LOWER, UPPER}),
+    ("90x", {LOWER}),
+    ("90X", {LOWER}),
+    ("gc", {OTHER, LEGACY}),
+    ("Gc", {OTHER, LEGACY}),
+    ("GC00", {OTHER, LEGACY}),
+]
+
+
+def main():
+    failed = 0
+
+    def check(name, ok):
+        nonlocal failed
+        print(f"{'ok    ' if ok else 'FALHOU'} {name}")
+        failed += not ok
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = get_database_connection(db_path=os.path.join(tmp, "busca.db"))[0]
+        packages = PackageRepository(conn)
+        packages.insert_many("Shopee", [LOWER, UPPER], "operador1")
+        packages.insert_many("SHEIN", [OTHER, LEGACY], "operador1")
+        today = datetime.date.today().isoformat()
+
+        def run_all(label):
+            cursor = conn.cursor()
+            for term, expected in CASES:
+                found = {row[0] for row in search_package_codes(cursor, term)}
+                check(f"{label}: Verificar Pedido, termo {term!r}", found == expected)
+                found = {record.codigo for record in packages.iter_range(today, today, code_term=term)}
+                check(f"{label}: histórico, termo {term!r}", found == expected)
+
+        run_all("com índice de trigramas")
+
+        # SQLite sem FTS5: a busca cai no LIKE
+        conn.execute("DROP TABLE packages_search")
+        run_all("sem índice de trigramas")
+        conn.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
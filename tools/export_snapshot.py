@@ -0,0 +1,48 @@
+# tools/export_snapshot.py
+"""
+Snapshot noturno em Parquet para a equipe de BI.
+
+Uso:
+    python tools/export_snapshot.py [--dir pasta] [--until AAAA-MM-DD] [--rewrite]
+
+Grava em `--dir` (padrão: data/snapshots) uma partição por data (data=AAAA-MM-DD/packages.parquet)
+para cada dia anterior a `--until` (padrão: hoje) que ainda não tem partição. Pode ser agendado
+no Agendador de Tarefas / cron para rodar uma vez por noite. Requer o pacote pyarrow.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SNAPSHOT_DIR
+from database import get_database_connection
+from exporters import PARQUET_AVAILABLE, write_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="pasta das partições")
+    parser.add_argument("--until", help="data (exclusiva) até a qual gravar partições; padrão: hoje")
+    parser.add_argument("--rewrite", action="store_true", help="regrava também as partições existentes")
+    args = parser.parse_args()
+
+    if not PARQUET_AVAILABLE:
+        print("O snapshot em Parquet requer o pacote pyarrow (pip install pyarrow).", file=sys.stderr)
+        return 1
+
+    conn, _ = get_database_connection()
+    try:
+        written = write_snapshot(conn, args.dir, until=args.until, rewrite=args.rewrite)
+    finally:
+        conn.close()
+
+    for data, count in written:
+        print(f"{data}: {count} pacotes")
+    print(f"{len(written)} partições gravadas em {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
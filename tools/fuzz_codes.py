@@ -0,0 +1,183 @@
+# tools/fuzz_codes.py
+"""
+Testes baseados em propriedades da validação de códigos (PACKAGE_CODE_REGEX, detect_transportadora
+e check_code), com a biblioteca hypothesis (pip install hypothesis).
+
+Uso:
+    python tools/fuzz_codes.py [--examples 20000] [--seed 0]
+
+Cada propriedade é testada com `--examples` códigos gerados: formatos válidos de cada
+transportadora, variações próximas (um caractere trocado, a mais ou a menos, espaços) e texto
+qualquer. Um contraexemplo, quando encontrado, é reduzido ao menor código que quebra a propriedade.
+Termina com código 1 se alguma propriedade falhar.
+"""
+
+import argparse
+import os
+import sys
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hypothesis import given, settings, seed as hypothesis_seed, strategies as st, HealthCheck
+
+from config import PACKAGE_CODE_REGEX
+from package_codes import detect_transportadora, check_code
+from scan_events import OUTCOME_OK, OUTCOME_INVALID, OUTCOME_NOTA_FISCAL, OUTCOME_WRONG_CARRIER
+
+TRANSPORTADORAS = ["SHEIN", "Shopee", "Mercado Livre"]
+
+
+
+def text(alphabet, min_size=0, max_size=None):
+    """
+    Texto sobre um alfabeto fixo, gerado como lista de caracteres (a redução de contraexemplos
+    de st.text falha em algumas versões do hypothesis quando os caracteres variam entre estratégias).
+    """
+    return st.lists(st.sampled_from(list(alphabet)), min_size=min_size, max_size=max_size).map("".join)
+
+
+valid_codes = {
+    "SHEIN": st.builds(
+        lambda prefix, digits: prefix + digits,
+        st.sampled_from(["GC", "AJ"]), text("0123456789", 16, 16)
+    ),
+    "Shopee": st.builds(
+        lambda rest: "BR" + rest, text("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", 13, 13)
+    ),
+    "Mercado Livre": st.builds(lambda rest: "44" + rest, text("0123456789", 9, 9)),
+}
+any_valid_code = st.one_of(*valid_codes.values())
+
+# Caracteres que um leitor ou teclado mal configurado pode enviar: ASCII imprimível, espaços e
+# controles, dígitos e letras de outros alfabetos (dígitos arábicos, de largura total, sobrescritos)
+NOISE_CHARS = (
+    [chr(c) for c in range(32, 127)] + list("\t\r\n\x00\u200b\u00a0")
+    + list("٠١٢٣٤٥٦٧٨٩") + list("０１２３４５６７８９") + list("²³¹") + list("ÁÇÑÕßµªº")
+)
+noise_char = st.sampled_from(NOISE_CHARS)
+
+
+@st.composite
+def near_codes(draw):
+    """
+    Um código válido com uma pequena alteração: troca, inserção ou remoção de um caractere.
+    """
+    codigo = draw(any_valid_code)
+    position = draw(st.integers(0, len(codigo)))
+    char = draw(noise_char)
+    change = draw(st.sampled_from(["replace", "insert", "delete"]))
+    if change == "insert":
+        return codigo[:position] + char + codigo[position:]
+    if position == len(codigo):
+        position -= 1
+    if change == "replace":
+        return codigo[:position] + char + codigo[position + 1:]
+    return codigo[:position] + codigo[position + 1:]
+
+
+any_code = st.one_of(
+    any_valid_code,
+    near_codes(),
+    text(NOISE_CHARS, max_size=30),
+    st.builds(lambda prefix, rest: prefix + rest,
+              st.sampled_from(["GC", "AJ", "BR", "44", ""]), text(NOISE_CHARS, 9, 20)),
+)
+
+
+@given(st.sampled_from(TRANSPORTADORAS).flatmap(lambda t: st.tuples(st.just(t), valid_codes[t])))
+def valid_code_is_detected(case):
+    transportadora, codigo = case
+    assert PACKAGE_CODE_REGEX.match(codigo)
+    assert detect_transportadora(codigo) == transportadora
+    assert check_code(codigo) == (OUTCOME_OK, transportadora)
+    assert check_code(codigo, transportadora) == (OUTCOME_OK, transportadora)
+
+
+@given(any_code)
+def detection_implies_regex(codigo):
+    if detect_transportadora(codigo) is not None:
+        assert PACKAGE_CODE_REGEX.match(codigo.strip())
+
+
+@given(any_code)
+def accepted_codes_are_ascii_and_well_formed(codigo):
+    outcome, transportadora = check_code(codigo)
+    if outcome != OUTCOME_OK:
+        return
+    assert codigo.isascii() and codigo.isalnum(), "código aceito com caractere fora do padrão do leitor"
+    if transportadora == "SHEIN":
+        assert codigo[:2] in ("GC", "AJ") and len(codigo) == 18 and codigo[2:].isdigit()
+    elif transportadora == "Shopee":
+        assert codigo.startswith("BR") and len(codigo) == 15
+    else:
+        assert codigo.startswith("44") and len(codigo) == 11 and codigo.isdigit()
+
+
+@given(any_code)
+def at_most_one_carrier(codigo):
+    detected = detect_transportadora(codigo)
+    assert detected in TRANSPORTADORAS + ["Nota Fiscal", None]
+    matches = [
+        codigo[:2] in ("GC", "AJ") and len(codigo) == 18,
+        codigo.startswith("BR") and len(codigo) == 15,
+        codigo.startswith("44") and len(codigo) == 11,
+    ]
+    assert sum(matches) <= 1
+
+
+@given(any_code, st.sampled_from(TRANSPORTADORAS))
+def check_code_agrees_with_detection(codigo, transportadora):
+    outcome, detected = check_code(codigo, transportadora)
+    if outcome == OUTCOME_INVALID:
+        assert not PACKAGE_CODE_REGEX.match(codigo)
+    elif outcome == OUTCOME_NOTA_FISCAL:
+        assert detected == "Nota Fiscal" and codigo.strip().isdigit()
+    elif outcome == OUTCOME_WRONG_CARRIER:
+        assert detected != transportadora
+    elif outcome == OUTCOME_OK:
+        assert detected == transportadora == detect_transportadora(codigo)
+
+
+@given(text("0123456789", 15, 44))
+def long_numbers_are_nota_fiscal(codigo):
+    assert detect_transportadora(codigo) == "Nota Fiscal"
+    assert check_code(codigo)[0] == OUTCOME_NOTA_FISCAL
+
+
+PROPERTIES = [
+    valid_code_is_detected,
+    detection_implies_regex,
+    accepted_codes_are_ascii_and_well_formed,
+    at_most_one_carrier,
+    check_code_agrees_with_detection,
+    long_numbers_are_nota_fiscal,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, help="semente fixa, para reproduzir uma execução")
+    args = parser.parse_args()
+
+    failed = 0
+    for prop in PROPERTIES:
+        test = settings(
+            max_examples=args.examples, deadline=None, database=None,
+            suppress_health_check=[HealthCheck.too_slow, HealthCheck.filter_too_much]
+        )(prop)
+        if args.seed is not None:
+            test = hypothesis_seed(args.seed)(test)
+        try:
+            test()
+            print(f"ok     {prop.__name__}")
+        except Exception:
+            failed += 1
+            print(f"FALHOU {prop.__name__}")
+            traceback.print_exc(limit=0)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+# tools/gui_load.py
+"""
+Teste de carga da tela de bipagem real (Tk), sem monitor.
+
+Uso:
+    python tools/gui_load.py [--scans 3000] [--rate 5] [--seed 20000] [--transportadora SHEIN]
+                             [--report-every 250] [--no-journal] [--windows]
+
+Abre o PackageCounterApp em um display virtual (inicia o Xvfb quando não há DISPLAY) com um
+banco temporário, troca messagebox, filedialog e os sons por versões silenciosas e digita códigos
+no campo de bipagem como um leitor de código de barras (teclas seguidas de Enter), `--rate`
+bipagens por segundo. `--seed` pacotes são gravados antes na coleta aberta para medir coletas grandes.
+
+A cada `--report-every` bipagens mostra o tamanho da coleta, a latência da bipagem (da primeira
+tecla até a tela redesenhada: p50, p95 e máximo) e os travamentos da interface, medidos por um
+relógio do laço de eventos a cada 16 ms. Com `--windows`, abre ao final as janelas "Consultar
+Coletas Anteriores" e Exportar (com exportação em CSV) e mede o tempo de cada uma.
+"""
+
+import argparse
+import datetime
+import itertools
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAME_MS = 16
+STALL_MS = 50
+
+# Prefixo e tamanho dos códigos sintéticos de cada transportadora
+CODE_FORMATS = {
+    "SHEIN": "GC{:016d}",
+    "Shopee": "BR{:013d}",
+    "Mercado Livre": "44{:09d}",
+}
+
+
+def start_virtual_display():
+    """
+    Inicia o Xvfb em um display livre e retorna o processo, ou None se já houver DISPLAY.
+    """
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        sys.exit("Sem DISPLAY e sem Xvfb instalado (ex.: apt install xvfb).")
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        process = subprocess.Popen(
+            [xvfb, f":{number}", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ["DISPLAY"] = f":{number}"
+                return process
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+        process.terminate()
+    sys.exit("Não foi possível iniciar o Xvfb.")
+
+
+class DialogRecorder:
+    """
+    Substitui as caixas de diálogo do Tk: registra cada chamada e responde sem abrir janela.
+    """
+    def __init__(self, save_dir):
+        self.save_dir = save_dir
+        self.calls = []
+
+    def install(self):
+        from tkinter import messagebox, filedialog
+
+        def record(kind, answer):
+            def dialog(title=None, message=None, **options):
+                self.calls.append((kind, title, message))
+                return answer
+            return dialog
+
+        for kind in ("showinfo", "showwarning", "showerror"):
+            setattr(messagebox, kind, record(kind, "ok"))
+        for kind in ("askyesno", "askokcancel"):
+            setattr(messagebox, kind, record(kind, False))
+
+        def asksaveasfilename(initialfile="arquivo", **options):
+            self.calls.append(("asksaveasfilename", None, initialfile))
+            return os.path.join(self.save_dir, initialfile)
+        filedialog.asksaveasfilename = asksaveasfilename
+
+    def take(self, kinds=("showwarning", "showerror")):
+        found = [call for call in self.calls if call[0] in kinds]
+        self.calls = []
+        return found
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ScannerLoad:
+    """
+    Digita os códigos no campo de bipagem pelo laço de eventos do Tk e mede latência e travamentos.
+    """
+    def __init__(self, app, codes, args):
+        self.app = app
+        self.root = app.root
+        self.entry = app.package_entry
+        self.codes = codes
+        self.args = args
+        self.interval_ms = max(1, int(1000 / args.rate))
+        self.done = 0
+        self.started = None
+        self.latencies = []
+        self.stalls = []
+        self.worst_stall = 0.0
+        self.last_tick = None
+        self.typed_mismatch = False
+        self.rows = []
+
+    def run(self):
+        # Executado depois do add_package, que está ligado antes ao mesmo Enter
+        self.entry.bind('<Return>', self.on_scanned, add='+')
+        self.last_tick = time.perf_counter()
+        self.root.after(FRAME_MS, self.tick)
+        self.root.after(self.interval_ms, self.scan_next)
+        self.root.mainloop()
+
+    def tick(self):
+        now = time.perf_counter()
+        late = (now - self.last_tick) * 1000 - FRAME_MS
+        self.worst_stall = max(self.worst_stall, late)
+        if late >= STALL_MS:
+            self.stalls.append(late)
+        self.last_tick = now
+        self.root.after(FRAME_MS, self.tick)
+
+    def type_code(self, codigo):
+        """
+        Gera os eventos de tecla de cada caractere, com Shift nas maiúsculas, como um leitor no modo teclado.
+        Se o display não reproduzir os caracteres, o texto é inserido diretamente (uma vez avisado).
+        """
+        self.entry.focus_force()
+        for char in codigo:
+            self.entry.event_generate('<KeyPress>', keysym=char, state=1 if char.isupper() else 0, when='now')
+        if self.entry.get() != codigo:
+            if not self.typed_mismatch:
+                print("Aviso: o display não converteu as teclas geradas; inserindo o texto diretamente.")
+                self.typed_mismatch = True
+            self.entry.delete(0, 'end')
+            self.entry.insert(0, codigo)
+
+    def scan_next(self):
+        try:
+            codigo = next(self.codes)
+        except StopIteration:
+            self.finish()
+            return
+        self.started = time.perf_counter()
+        self.type_code(codigo)
+        self.entry.event_generate('<Return>', when='now')
+
+    def on_scanned(self, event=None):
+        self.root.update_idletasks()
+        self.latencies.append((time.perf_counter() - self.started) * 1000)
+        self.done += 1
+        if self.done % self.args.report_every == 0:
+            self.report()
+        self.root.after(self.interval_ms, self.scan_next)
+
+    def report(self):
+        problems = DIALOGS.take()
+        size = len(self.app.package_treeview.get_children())
+        row = (
+            self.done, size, statistics.median(self.latencies), percentile(self.latencies, 0.95),
+            max(self.latencies), self.worst_stall, len(self.stalls)
+        )
+        self.rows.append(row)
+        print("{:>8} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>12.1f} {:>8}".format(*row))
+        for kind, title, message in problems[:3]:
+            print(f"    {kind}: {title}: {message}")
+        self.latencies, self.stalls, self.worst_stall = [], [], 0.0
+
+    def finish(self):
+        if self.latencies:
+            self.report()
+        self.root.quit()
+
+
+def time_windows(app):
+    """
+    Mede a abertura de "Consultar Coletas Anteriores" e da exportação em CSV do dia.
+    """
+    from gui.view_total_packages import ViewTotalPackagesWindow
+    from gui.export import ExportWindow
+
+    start = time.perf_counter()
+    window = ViewTotalPackagesWindow(app)
+    app.root.update_idletasks()
+    print(f"Consultar Coletas Anteriores: {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({len(window.tree.get_children())} linhas)")
+    window.window.destroy()
+
+    today = datetime.date.today().isoformat()
+    export = ExportWindow(app)
+    start = time.perf_counter()
+    export.confirm_export("Todas", "Todos", today, today)
+    print(f"Exportação CSV do dia: {(time.perf_counter() - start) * 1000:.0f} ms")
+    for kind, title, message in DIALOGS.take(("showerror",)):
+        print(f"    {kind}: {title}: {message}")
+
+
+DIALOGS = None
+
+
+def main():
+    global DIALOGS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=5.0, help="bipagens por segundo")
+    parser.add_argument("--seed", type=int, default=0, help="pacotes gravados antes na coleta aberta")
+    parser.add_argument("--transportadora", choices=sorted(CODE_FORMATS), default="SHEIN")
+    parser.add_argument("--report-every", type=int, default=250)
+    parser.add_argument("--no-journal", action="store_true", help="grava direto no banco, sem o diário local")
+    parser.add_argument("--windows", action="store_true", help="mede também as janelas de consulta e exportação")
+    args = parser.parse_args()
+
+    display = start_virtual_display()
+    work_dir = tempfile.mkdtemp(prefix="gui_load_")
+    station = f"carga-{os.getpid()}"
+    # Banco, diário e filtro de códigos próprios: nada da estação real é tocado
+    os.environ["CONTADOR_DB_PATH"] = os.path.join(work_dir, "carga.db")
+    os.environ["CONTADOR_STATION"] = station
+
+    import tkinter as tk
+    import gui.main_app
+    from config import JOURNAL_DIR
+    from coletas import register_packages
+    from registered_codes import default_filter_path
+
+    DIALOGS = DialogRecorder(work_dir)
+    DIALOGS.install()
+    gui.main_app.play_sound = lambda sound_type='error': None
+    if args.no_journal:
+        gui.main_app.JOURNAL_ENABLED = False
+
+    code_format = CODE_FORMATS[args.transportadora]
+    numbers = itertools.count(1)
+    if args.seed:
+        conn = gui.main_app.get_database_connection()[0]
+        register_packages(conn, args.transportadora, [code_format.format(next(numbers)) for _ in range(args.seed)], "carga")
+        conn.close()
+
+    root = tk.Tk()
+    app = gui.main_app.PackageCounterApp(root, {"id": 0, "username": "carga", "role": "user"})
+    app.selected_transportadora.set(args.transportadora)
+    root.update()
+
+    codes = (code_format.format(next(numbers)) for _ in range(args.scans))
+    print(f"{args.scans} bipagens de {args.transportadora} a {args.rate:g}/s, coleta inicial com {args.seed} pacotes"
+          f"{' (sem diário local)' if args.no_journal else ''}")
+    print(f"{'bipagens':>8} {'coleta':>8} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9} {'travamento ms':>12} {'>50 ms':>8}")
+    try:
+        ScannerLoad(app, codes, args).run()
+        if args.windows:
+            time_windows(app)
+    finally:
+        app.on_closing()
+        for path in (default_filter_path(os.environ["CONTADOR_DB_PATH"]),
+                     *(os.path.join(JOURNAL_DIR, f"{station}{ext}") for ext in (".log", ".synced", ".conflicts"))):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if display is not None:
+            display.terminate()
+
+
+if __name__ == "__main__":
+    main()
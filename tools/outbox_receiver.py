@@ -0,0 +1,114 @@
+# tools/outbox_receiver.py
+"""
+Receptor local de eventos, no lugar do ERP ou do portal, para testar a entrega da tabela outbox.
+
+Uso:
+    python tools/outbox_receiver.py [--port 8080] [--fail-rate 0.2] [--delay-ms 0] [--output eventos.jsonl]
+
+Recebe os lotes em POST (qualquer caminho, ex.: http://127.0.0.1:8080/eventos) no formato enviado
+por outbox.HttpSink, descarta repetições pela chave `key` de cada evento, como um destino
+idempotente, e mostra a cada segundo os eventos recebidos, os novos, os repetidos e a vazão.
+`--fail-rate` recusa essa fração dos lotes com HTTP 503 (para exercitar as novas tentativas e a
+espera crescente) e `--delay-ms` atrasa cada resposta. Com `--output`, grava os eventos novos em
+JSON Lines. Encerre com Ctrl+C.
+
+Na estação, ligue OUTBOX_ENABLED em config.py e defina CONTADOR_OUTBOX_URL=http://127.0.0.1:8080/eventos,
+ou entregue os eventos pendentes de uma vez com `python -m contador outbox --deliver --url ...`.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Receiver:
+    def __init__(self, fail_rate, delay_ms, output):
+        self.fail_rate = fail_rate
+        self.delay = delay_ms / 1000
+        self.output = output
+        self.lock = threading.Lock()
+        self.keys = set()
+        self.received = 0
+        self.duplicates = 0
+        self.refused = 0
+
+    def accept(self, events):
+        """
+        Registra um lote. Retorna False se o lote foi recusado (falha simulada).
+        """
+        if self.delay:
+            time.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            with self.lock:
+                self.refused += 1
+            return False
+        with self.lock:
+            new = [event for event in events if event["key"] not in self.keys]
+            self.keys.update(event["key"] for event in new)
+            self.received += len(events)
+            self.duplicates += len(events) - len(new)
+            if self.output is not None and new:
+                self.output.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in new))
+                self.output.flush()
+        return True
+
+
+def make_handler(receiver):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                events = json.loads(body)["events"]
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            if receiver.accept(events):
+                self.send_response(204)
+            else:
+                self.send_response(503)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fração dos lotes recusados com HTTP 503")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="atraso de cada resposta")
+    parser.add_argument("--output", help="grava os eventos novos em JSON Lines")
+    args = parser.parse_args()
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    receiver = Receiver(args.fail_rate, args.delay_ms, output)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(receiver))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Recebendo eventos em http://127.0.0.1:{args.port}/ (Ctrl+C para encerrar)")
+
+    last_unique = 0
+    try:
+        while True:
+            time.sleep(1)
+            with receiver.lock:
+                unique = len(receiver.keys)
+                print(f"{receiver.received:>10,} recebidos {unique:>10,} novos {receiver.duplicates:>8,} repetidos "
+                      f"{receiver.refused:>6,} lotes recusados {unique - last_unique:>8,} eventos/s")
+            last_unique = unique
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        if output is not None:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+# tools/query_plans.py
+"""
+Verificação dos planos de execução de todas as instruções SQL registradas em queries.py.
+
+Uso:
+    python tools/query_plans.py [--sizes 10000 100000 500000] [--repeat 5] [--baseline planos.json] [--db caminho.db]
+
+Gera um banco sintético (pacotes de vários dias e transportadoras, coletas, tentativas de bipagem
+e usuários) e, a cada tamanho de `--sizes` (quantidade de pacotes), roda EXPLAIN QUERY PLAN e mede
+o tempo de cada instrução com parâmetros tirados do próprio banco. Instruções de escrita rodam
+dentro de uma transação desfeita em seguida.
+
+Falha (código 1) se alguma instrução do caminho crítico (hot) percorrer uma tabela ou índice
+inteiro (SCAN) em vez de usar um índice (SEARCH). Ordenações em árvore temporária (TEMP B-TREE)
+são apenas indicadas. Com `--baseline`, os planos são comparados com os gravados no arquivo,
+que é criado se ainda não existir; mudanças de plano são listadas.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STATUS_PENDING, STATUS_COLLECTED, SEARCH_RESULT_LIMIT, SCAN_EVENT_RETENTION_DAYS
+from database import initialize_database
+from queries import QUERIES, dynamic_queries
+from scan_events import OUTCOME_OK, OUTCOME_DUPLICATE, day_bounds_us
+
+TRANSPORTADORAS = ["SHEIN", "Shopee", "Mercado Livre"]
+OPERATORS = [f"operador{i}" for i in range(12)]
+PACKAGES_PER_DAY = 3000
+COLETAS_PER_DAY = 3
+FIRST_DAY = datetime.date(2024, 1, 1)
+
+# Planos que começam com SCAN mas não percorrem tabela
+HARMLESS_SCANS = ("SCAN CONSTANT ROW",)
+
+
+def synthetic_code(n):
+    return f"GC{n * 7919 % 10**16:016d}"
+
+
+def populate(conn, rows):
+    """
+    Acrescenta pacotes (e as coletas e tentativas de bipagem correspondentes) até o banco ter `rows`
+    pacotes. Cada dia tem PACKAGES_PER_DAY pacotes divididos entre as transportadoras; as coletas do
+    último dia gerado ficam abertas.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM packages")
+    n = cursor.fetchone()[0]
+    rng = random.Random(n)
+    cursor.execute("BEGIN")
+    cursor.execute("UPDATE coletas SET status = ?, closed_at = data || ' 18:00:00' WHERE status = ?",
+                   (STATUS_COLLECTED, STATUS_PENDING))
+    while n < rows:
+        day_index, offset = divmod(n, PACKAGES_PER_DAY)
+        day = FIRST_DAY + datetime.timedelta(days=day_index)
+        data = day.isoformat()
+        last_day = (day_index + 1) * PACKAGES_PER_DAY >= rows
+        status = STATUS_PENDING if last_day else STATUS_COLLECTED
+        count = min(PACKAGES_PER_DAY - offset, rows - n)
+
+        coleta_ids = {}
+        for transportadora in TRANSPORTADORAS:
+            for numero in range(1, COLETAS_PER_DAY + 1):
+                cursor.execute("""
+                    INSERT OR IGNORE INTO coletas (transportadora, data, numero, status, opened_at, closed_at, package_count)
+                    VALUES (?, ?, ?, ?, ?, ?, 0)
+                """, (transportadora, data, numero, status, f"{data} 08:00:00",
+                      None if last_day else f"{data} 18:00:00"))
+                cursor.execute("SELECT id FROM coletas WHERE transportadora = ? AND data = ? AND numero = ?",
+                               (transportadora, data, numero))
+                coleta_ids[transportadora, numero] = cursor.fetchone()[0]
+
+        packages, events = [], []
+        for i in range(n, n + count):
+            transportadora = TRANSPORTADORAS[i % len(TRANSPORTADORAS)]
+            numero = (i // len(TRANSPORTADORAS)) % COLETAS_PER_DAY + 1
+            seconds = 8 * 3600 + (i % PACKAGES_PER_DAY) * 10
+            hora = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            operator = OPERATORS[rng.randrange(len(OPERATORS))]
+            codigo = synthetic_code(i)
+            packages.append((transportadora, codigo, data, hora, status, numero, operator,
+                             coleta_ids[transportadora, numero]))
+            ts_us = int(datetime.datetime.combine(day, datetime.time()).timestamp() + seconds) * 1_000_000
+            events.append((ts_us, OUTCOME_OK, codigo, transportadora, operator, "estacao1"))
+            if i % 20 == 0:
+                events.append((ts_us + 1, OUTCOME_DUPLICATE, codigo, transportadora, operator, "estacao1"))
+
+        cursor.executemany("""
+            INSERT INTO packages (transportadora, codigo_pacote, data, hora, status, coleta_number, bipped_by, coleta_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, packages)
+        cursor.executemany("""
+            INSERT INTO scan_events (ts_us, outcome, codigo, transportadora, operator, station)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, events)
+        cursor.execute("""
+            UPDATE coletas SET package_count = (SELECT COUNT(*) FROM packages WHERE coleta_id = coletas.id)
+            WHERE data = ?
+        """, (data,))
+        n += count
+
+    cursor.execute("SELECT COUNT(*) FROM users")
+    for i in range(cursor.fetchone()[0], 20):
+        cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                       (f"usuario{i}", "$2b$12$" + "x" * 53, "user"))
+    conn.commit()
+
+
+def sample_values(cursor):
+    """
+    Valores dos parâmetros nomeados em queries.py, tirados do banco sintético.
+    """
+    cursor.execute("""
+        SELECT id, transportadora, data, numero FROM coletas
+        WHERE status = ? AND package_count > 0 ORDER BY id DESC LIMIT 1
+    """, (STATUS_PENDING,))
+    coleta_id, transportadora, data, numero = cursor.fetchone()
+    cursor.execute("SELECT id, codigo_pacote, hora, bipped_by FROM packages WHERE coleta_id = ? ORDER BY id DESC LIMIT 1",
+                   (coleta_id,))
+    package_id, codigo, hora, operator = cursor.fetchone()
+    cursor.execute("SELECT MAX(id) FROM scan_events")
+    max_event_id = cursor.fetchone()[0]
+    start_us, end_us = day_bounds_us(data, data)
+    day = datetime.date.fromisoformat(data)
+    return {
+        "transportadora": transportadora,
+        "data": data,
+        "status_pending": STATUS_PENDING,
+        "status_collected": STATUS_COLLECTED,
+        "numero": numero,
+        "numero_new": numero + COLETAS_PER_DAY,
+        "timestamp": f"{data} 12:00:00",
+        "one": 1,
+        "coleta_id": coleta_id,
+        "codigo": codigo,
+        "codigo_new": "GC9999999999999999",
+        "hora": hora,
+        "operator": operator,
+        "package_id": package_id,
+        "start": (day - datetime.timedelta(days=30)).isoformat(),
+        "end": data,
+        "prefix_low": "GC12",
+        "prefix_high": "GC13",
+        "limit": SEARCH_RESULT_LIMIT,
+        "fts_phrase": '"12345"',
+        "like_term": "%12345%",
+        "max_id": package_id,
+        "recent_id": package_id - 100,
+        "ts_us": end_us - 1,
+        "outcome_ok": OUTCOME_OK,
+        "station": "estacao2",
+        "ts_old_us": int((datetime.datetime.combine(day, datetime.time())
+                          - datetime.timedelta(days=SCAN_EVENT_RETENTION_DAYS)).timestamp() * 1e6),
+        "ts_start_us": start_us,
+        "ts_end_us": end_us,
+        "recent_event_id": max_event_id - 100,
+        "username": "usuario1",
+        "username_new": "usuario_novo",
+        "password": "$2b$12$" + "y" * 53,
+        "role": "user",
+        "user_id": 1,
+    }
+
+
+def bind(query, samples):
+    # Nomes conhecidos viram o valor de exemplo; os demais já são valores fixados pelo montador
+    return tuple(samples.get(name, name) if isinstance(name, str) else name for name in query.params)
+
+
+def query_plan(cursor, query, params):
+    cursor.execute("EXPLAIN QUERY PLAN " + query.sql, params)
+    return [row[3] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    """
+    Retorna (varreduras completas, ordenações temporárias) de um plano.
+    """
+    # Subconsultas materializadas são percorridas inteiras, mas já vêm limitadas
+    subqueries = {detail.split()[1] for detail in plan if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+    scans = [
+        detail for detail in plan
+        if detail.startswith("SCAN ") and not detail.startswith(HARMLESS_SCANS)
+        and "VIRTUAL TABLE" not in detail and detail.split()[1] not in subqueries
+    ]
+    temp = [detail for detail in plan if "TEMP B-TREE" in detail]
+    return scans, temp
+
+
+def time_query(conn, query, params, repeat):
+    """
+    Mediana, em milissegundos, de `repeat` execuções (lendo todas as linhas).
+    Escritas são desfeitas a cada execução.
+    """
+    is_write = query.sql.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE")
+    cursor = conn.cursor()
+    samples = []
+    for _ in range(repeat):
+        if is_write:
+            cursor.execute("BEGIN")
+        start = time.perf_counter()
+        cursor.execute(query.sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+        if is_write:
+            conn.rollback()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000],
+                        help="quantidades de pacotes em que as instruções são verificadas")
+    parser.add_argument("--repeat", type=int, default=5, help="execuções por instrução na medição de tempo")
+    parser.add_argument("--baseline", help="arquivo JSON com os planos de referência (criado se não existir)")
+    parser.add_argument("--db", help="banco sintético a criar/reaproveitar (padrão: arquivo temporário)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"query_plans_{os.getpid()}.db")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cursor = conn.cursor()
+    initialize_database(conn, cursor)
+
+    timings = {}
+    plans = {}
+    failures = []
+    notes = []
+    try:
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            populate(conn, size)
+            print(f"{size:,} pacotes: banco pronto em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            samples = sample_values(cursor)
+            queries = list(QUERIES.values()) + dynamic_queries(cursor)
+            for query in queries:
+                params = bind(query, samples)
+                plan = query_plan(cursor, query, params)
+                plans[query.name] = plan
+                scans, temp = plan_problems(plan)
+                if scans and query.hot:
+                    failures.append((size, query.name, scans))
+                if temp:
+                    notes.append((size, query.name, temp))
+                timings.setdefault(query.name, (query.hot, {}))[1][size] = time_query(conn, query, params, args.repeat)
+    finally:
+        conn.close()
+        if not args.db:
+            os.remove(db_path)
+
+    sizes = sorted(args.sizes)
+    name_width = max(len(name) for name in timings)
+    print(f"{'instrução':<{name_width}}  hot  " + "  ".join(f"{size:>10,}" for size in sizes) + "   (ms)")
+    for name, (hot, by_size) in timings.items():
+        print(f"{name:<{name_width}}  {'sim' if hot else '   '}  "
+              + "  ".join(f"{by_size[size]:>10.3f}" for size in sizes))
+
+    if notes:
+        print("\nOrdenações em árvore temporária (maior tamanho):")
+        for name in sorted({name for size, name, _ in notes if size == sizes[-1]}):
+            details = next(temp for size, n, temp in notes if n == name and size == sizes[-1])
+            print(f"  {name}: {'; '.join(details)}")
+
+    if args.baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+            changed = [name for name in plans if name in baseline and baseline[name] != plans[name]]
+            print(f"\nPlanos alterados em relação a {args.baseline}: {len(changed)}")
+            for name in changed:
+                print(f"  {name}:\n    antes:  {' | '.join(baseline[name])}\n    agora:  {' | '.join(plans[name])}")
+            for name in sorted(set(plans) - set(baseline)):
+                print(f"  {name}: nova instrução")
+        else:
+            with open(args.baseline, "w", encoding="utf-8") as file:
+                json.dump(plans, file, ensure_ascii=False, indent=2, sort_keys=True)
+            print(f"\nPlanos de referência gravados em {args.baseline}.")
+
+    if failures:
+        print("\nFALHA: instruções do caminho crítico com varredura completa:")
+        for size, name, scans in failures:
+            print(f"  [{size:,}] {name}: {'; '.join(scans)}")
+        return 1
+    print("\nNenhuma varredura completa no caminho crítico.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# tools/replay_day.py
+"""
+Simulador de capacidade: repete um dia real de bipagens contra um banco SQLite compartilhado.
+
+Uso:
+    python tools/replay_day.py --data 2024-11-29 [--source caminho.db] [--scale 3] [--speed 10]
+                               [--stations 2] [--from 08:00] [--to 12:00] [--journal]
+                               [--target caminho.db] [--max-wait-ms 1000]
+
+Lê de `--source` (somente leitura; padrão: banco principal) os pacotes do dia, com hora,
+transportadora e operador, e reconstrói o padrão de chegada do turno. Com `--scale` (ex.: 3 para
+uma Black Friday com o triplo do volume) cada bipagem real gera, em média, esse número de bipagens,
+com códigos sintéticos no formato da transportadora. `--speed` acelera o relógio (1 = tempo real,
+0 = sem espera, para medir a capacidade máxima).
+
+Cada estação virtual é um processo separado, como um computador da expedição: os operadores do dia
+são distribuídos entre as `--stations` estações, e cada uma executa as mesmas etapas da tela de
+bipagem (validação do código, checagem de duplicados, gravação na coleta aberta e registro da
+tentativa) contra o mesmo arquivo `--target` (padrão: banco temporário novo). Com `--journal`,
+a gravação passa pelo diário local, como em produção, e a fila de replicação é acompanhada.
+
+Ao final mostra a vazão oferecida e a obtida, o tempo em fila (atraso entre a chegada do pacote e o
+início do atendimento) e p50/p99/máximo de cada etapa, por estação e no total. Termina com código 1
+se o p99 da fila passar de `--max-wait-ms`: a estação não acompanhou o ritmo do dia.
+"""
+
+import argparse
+import collections
+import datetime
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_PATH
+from database import get_database_connection
+from coletas import register_package
+from duplicates import DuplicatePolicy
+from journal import ScanJournal
+from package_codes import check_code
+from queries import REPLAY_DAY
+from sandbox import training_code
+from scan_events import ScanEventLog, OUTCOME_OK, OUTCOME_DUPLICATE, OUTCOME_ERROR
+
+STAGES = ["validação", "duplicado", "gravação", "tentativa"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def seconds_of(hora):
+    hours, minutes, seconds = (int(part) for part in hora.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def load_arrivals(source, data, start, end, scale, stations, rng):
+    """
+    Retorna as chegadas do dia como listas por estação de (segundos desde a primeira chegada,
+    transportadora, código, operador), em ordem de chegada.
+    """
+    conn = sqlite3.connect("file:" + urllib.request.pathname2url(os.path.abspath(source)) + "?mode=ro", uri=True)
+    rows = conn.execute(REPLAY_DAY, (data,)).fetchall()
+    conn.close()
+    rows = [row for row in rows if start <= row[0][:5] < end]
+    if not rows:
+        return None, 0
+
+    operators = {operator: index for index, operator in enumerate(sorted({row[3] or "" for row in rows}))}
+    first = seconds_of(rows[0][0])
+    base = rng.randrange(10**8) * 10**8
+    whole, fraction = divmod(scale, 1)
+    per_station = [[] for _ in range(stations)]
+    synthetic = 0
+    for hora, transportadora, codigo, operator in rows:
+        copies = int(whole) + (rng.random() < fraction)
+        for copy in range(copies):
+            if copy:
+                synthetic += 1
+                codigo = training_code(transportadora, base + synthetic)
+            # A hora é gravada com resolução de segundos: a chegada é espalhada dentro do segundo
+            offset = seconds_of(hora) - first + rng.random()
+            station = (operators[operator or ""] + copy) % stations
+            per_station[station].append((offset, transportadora, codigo, operator or f"operador{station}"))
+    for arrivals in per_station:
+        arrivals.sort()
+    return per_station, seconds_of(rows[-1][0]) - first + 1
+
+
+def run_station(index, db_path, arrivals, speed, journal_dir, ready, go, start_at, results):
+    """
+    Processo de uma estação virtual: atende as chegadas no horário previsto, em ordem, e devolve
+    as medições em `results`.
+    """
+    station = f"simulador{index}"
+    conn, cursor = get_database_connection(db_path=db_path)
+    scan_log = ScanEventLog(db_path, station=station)
+    policy = DuplicatePolicy()
+    journal = None
+    if journal_dir:
+        journal = ScanJournal(db_path, journal_dir=journal_dir, station=station, policy=policy)
+
+    stages = {stage: [] for stage in STAGES}
+    waits, sojourns = [], []
+    outcomes = collections.Counter()
+    max_backlog = 0
+
+    ready.wait()
+    go.wait()
+    t0 = start_at.value
+    for offset, transportadora, codigo, operator in arrivals:
+        due = t0 + (offset / speed if speed else 0)
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.time()
+        waits.append(max(started - due, 0) if speed else 0)
+
+        tick = time.perf_counter()
+        outcome, _ = check_code(codigo, transportadora)
+        stages["validação"].append(time.perf_counter() - tick)
+
+        if outcome == OUTCOME_OK:
+            tick = time.perf_counter()
+            data = datetime.date.today().isoformat()
+            try:
+                existing = (journal is not None and journal.is_duplicate(data, transportadora, codigo)) \
+                    or policy.find_duplicate(cursor, transportadora, codigo)
+            except sqlite3.Error:
+                # Ex.: "database is locked" após o tempo de espera: bipagem perdida na tela real
+                existing = None
+                outcome = OUTCOME_ERROR
+            stages["duplicado"].append(time.perf_counter() - tick)
+            if existing:
+                outcome = OUTCOME_DUPLICATE
+            elif outcome == OUTCOME_OK:
+                tick = time.perf_counter()
+                try:
+                    if journal is not None:
+                        journal.append(transportadora, codigo, operator)
+                        max_backlog = max(max_backlog, len(journal.pending))
+                    else:
+                        register_package(conn, transportadora, codigo, operator)
+                except sqlite3.Error:
+                    outcome = OUTCOME_ERROR
+                stages["gravação"].append(time.perf_counter() - tick)
+
+        tick = time.perf_counter()
+        scan_log.record(outcome, codigo, transportadora, operator)
+        stages["tentativa"].append(time.perf_counter() - tick)
+        outcomes[outcome] += 1
+        sojourns.append(time.time() - (due if speed else started))
+
+    finished = time.time()
+    drain = 0.0
+    if journal is not None:
+        while not journal.sync_now(timeout=1) and time.time() - finished < 120:
+            pass
+        drain = time.time() - finished
+        journal.close()
+    scan_log.close()
+    conn.close()
+    results.put({
+        "station": index,
+        "elapsed": finished - t0,
+        "stages": stages,
+        "waits": waits,
+        "sojourns": sojourns,
+        "outcomes": dict(outcomes),
+        "max_backlog": max_backlog,
+        "drain": drain,
+    })
+
+
+def summary(values):
+    if not values:
+        return "         -          -          -"
+    return f"{percentile(values, 0.5) * 1000:>10.2f} {percentile(values, 0.99) * 1000:>10.2f} {max(values) * 1000:>10.2f}"
+
+
+def peak_rate(per_station, window=60):
+    counts = collections.Counter(int(offset // window) for arrivals in per_station for offset, *_ in arrivals)
+    return max(counts.values()) / window if counts else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="dia a repetir (AAAA-MM-DD)")
+    parser.add_argument("--source", default=DB_PATH, help="banco com o histórico (aberto somente para leitura)")
+    parser.add_argument("--target", help="banco compartilhado das estações virtuais (padrão: temporário)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplicador do volume do dia")
+    parser.add_argument("--speed", type=float, default=1.0, help="aceleração do relógio (0 = sem espera)")
+    parser.add_argument("--stations", type=int, default=1)
+    parser.add_argument("--from", dest="start", default="00:00", help="início do trecho do dia (HH:MM)")
+    parser.add_argument("--to", dest="end", default="24:00", help="fim do trecho do dia (HH:MM)")
+    parser.add_argument("--journal", action="store_true", help="gravar pelo diário local, como em produção")
+    parser.add_argument("--max-wait-ms", type=float, default=1000, help="limite do p99 do tempo em fila")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    per_station, duration = load_arrivals(args.source, args.data, args.start, args.end, args.scale, args.stations, rng)
+    if per_station is None:
+        print(f"Nenhum pacote em {args.data} entre {args.start} e {args.end}.", file=sys.stderr)
+        return 2
+    total = sum(len(arrivals) for arrivals in per_station)
+
+    workdir = tempfile.mkdtemp(prefix="replay_")
+    db_path = args.target or os.path.join(workdir, "replay.db")
+    get_database_connection(db_path=db_path)[0].close()
+    journal_dir = os.path.join(workdir, "journal") if args.journal else None
+
+    print(f"{args.data} {args.start}-{args.end}: {total:,} bipagens (escala {args.scale:g}) em {duration / 3600:.1f} h, "
+          f"pico de {peak_rate(per_station) * 60:.0f}/min; {args.stations} estação(ões), velocidade "
+          f"{'máxima' if not args.speed else f'{args.speed:g}x'}, banco {db_path}")
+
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Barrier(args.stations + 1)
+    go = ctx.Event()
+    start_at = ctx.Value("d", 0.0)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=run_station, args=(index, db_path, arrivals, args.speed, journal_dir, ready, go, start_at, results))
+        for index, arrivals in enumerate(per_station)
+    ]
+    for process in processes:
+        process.start()
+    ready.wait()
+    start_at.value = time.time() + 0.2
+    go.set()
+    reports = []
+    while len(reports) < len(processes):
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            if sum(process.exitcode is not None for process in processes) <= len(reports):
+                continue
+            # A estação pode ter terminado logo depois de enviar o resultado
+            try:
+                reports.append(results.get(timeout=2))
+            except queue.Empty:
+                print("Uma estação virtual terminou com erro; veja a saída acima.", file=sys.stderr)
+                for process in processes:
+                    process.terminate()
+                shutil.rmtree(workdir, ignore_errors=True)
+                return 3
+    reports.sort(key=lambda report: report["station"])
+    for process in processes:
+        process.join()
+
+    elapsed = max(report["elapsed"] for report in reports)
+    offered = f"{total / (duration / args.speed):.1f}/s" if args.speed else "sem limite"
+    print(f"\nVazão oferecida: {offered}   obtida: {total / elapsed:.1f}/s   duração: {elapsed:.1f}s")
+    print(f"\n{'':<22}{'p50 ms':>10} {'p99 ms':>10} {'máx ms':>10}")
+    all_waits = [wait for report in reports for wait in report["waits"]]
+    print(f"{'fila':<22}{summary(all_waits)}")
+    for stage in STAGES:
+        print(f"{stage:<22}{summary([value for report in reports for value in report['stages'][stage]])}")
+    print(f"{'chegada até o fim':<22}{summary([value for report in reports for value in report['sojourns']])}")
+
+    print(f"\n{'estação':<12}{'bipagens':>10}{'aceitas':>9}{'dupl.':>7}{'erros':>7}{'fila p99 ms':>13}"
+          + (f"{'maior fila diário':>19}{'esvaziou em':>13}" if args.journal else ""))
+    for report, arrivals in zip(reports, per_station):
+        outcomes = report["outcomes"]
+        line = (f"{report['station']:<12}{len(arrivals):>10,}{outcomes.get(OUTCOME_OK, 0):>9,}"
+                f"{outcomes.get(OUTCOME_DUPLICATE, 0):>7,}{outcomes.get(OUTCOME_ERROR, 0):>7,}"
+                f"{(percentile(report['waits'], 0.99) * 1000 if report['waits'] else 0):>13.1f}")
+        if args.journal:
+            line += f"{report['max_backlog']:>19,}{report['drain']:>12.1f}s"
+        print(line)
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    wait_p99 = percentile(all_waits, 0.99) * 1000 if all_waits else 0
+    if args.speed and wait_p99 > args.max_wait_ms:
+        print(f"\nNÃO ACOMPANHOU: p99 da fila {wait_p99:.0f} ms (limite {args.max_wait_ms:.0f} ms).")
+        return 1
+    print("\nAs estações acompanharam o ritmo do dia.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
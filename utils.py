@@ -2,25 +2,9 @@ import os
 import logging
 import winsound
 import threading
-from config import ALERT_SOUND_PATH, PACKAGE_CODE_REGEX, CORRECT_SOUND_PATH
+from config import ALERT_SOUND_PATH, CORRECT_SOUND_PATH
 from tkinter import messagebox
 
-def detect_transportadora(codigo):
-    """
-    Detecta a transportadora com base no código fornecido.
-    """
-    codigo = codigo.strip()
-    if PACKAGE_CODE_REGEX.match(codigo):
-        if codigo.startswith(("GC", "AJ")) and len(codigo) == 18 and codigo[2:].isdigit():
-            return "SHEIN"
-        elif codigo.startswith("BR") and len(codigo) == 15 and codigo[2:].isalnum():
-            return "Shopee"
-        elif codigo.startswith("44") and len(codigo) == 11 and codigo.isdigit():
-            return "Mercado Livre"
-        elif codigo.isdigit() and len(codigo) >= 15:
-            return "Nota Fiscal"
-    return None
-
 def play_sound(sound_type='error'):
     """
     Reproduz um som baseado no tipo especificado.